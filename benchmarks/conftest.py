@@ -0,0 +1,84 @@
+import gzip
+import os
+import shutil
+import sys
+
+import pytest
+
+# Make the application modules (``formatter``, ``utils``, ``app``) importable the
+# same way the unit tests do, and make the generator importable as a module.
+_HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(_HERE, "..", "support_mail_maker"))
+sys.path.insert(0, _HERE)
+
+# Ensure logs directory exists before utils module initializes logger
+os.makedirs(os.path.join(os.getcwd(), "logs"), exist_ok=True)
+
+# Benchmark presses must not land in the user's edition archive.
+os.environ.setdefault("SUPPORTMAIL_ARCHIVE", "off")
+
+from generator import EditionGenerator  # noqa: E402
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--bench-full",
+        action="store_true",
+        default=False,
+        help="Also run the 100k-row benchmark tier (slow, several minutes).",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "full: 100k-row tier, only run with --bench-full")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--bench-full"):
+        return
+    skip_full = pytest.mark.skip(reason="100k-row tier; pass --bench-full to run")
+    for item in items:
+        if "full" in item.keywords:
+            item.add_marker(skip_full)
+
+
+class EditionCorpus:
+    """Lazily generated, cached benchmark inputs keyed by row count.
+
+    Generating 100k rows takes a few seconds, so each tier is built once per
+    session and shared by every stage benchmark.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.generator = EditionGenerator()
+        self._csv_paths = {}
+
+    def csv_path(self, rows: int) -> str:
+        if rows not in self._csv_paths:
+            path = os.path.join(self.directory, f"edition_{rows}.csv")
+            self._csv_paths[rows] = self.generator.write_csv(path, rows)
+        return self._csv_paths[rows]
+
+    def csv_gz_path(self, rows: int) -> str:
+        path = self.csv_path(rows) + ".gz"
+        if not os.path.exists(path):
+            with open(self.csv_path(rows), "rb") as source, gzip.open(path, "wb") as target:
+                shutil.copyfileobj(source, target)
+        return path
+
+    def parquet_path(self, rows: int) -> str:
+        pyarrow_csv = pytest.importorskip("pyarrow.csv")
+        parquet = pytest.importorskip("pyarrow.parquet")
+        path = self.csv_path(rows)[:-len(".csv")] + ".parquet"
+        if not os.path.exists(path):
+            parquet.write_table(pyarrow_csv.read_csv(self.csv_path(rows)), path)
+        return path
+
+    def json_text(self, rows: int) -> str:
+        return self.generator.json_text(rows)
+
+
+@pytest.fixture(scope="session")
+def corpus(tmp_path_factory):
+    return EditionCorpus(str(tmp_path_factory.mktemp("bench_corpus")))
@@ -0,0 +1,180 @@
+"""Seeded synthetic edition generator for the benchmark suite.
+
+Produces realistic SupportMail inputs — CSV uploads using the real
+``upload_template.csv`` headers and schema-shaped JSON editions — at any
+size.  Everything is driven by a ``random.Random`` seeded up front, so the
+same ``(seed, rows)`` pair always yields byte-identical output and
+benchmark runs stay comparable across machines and commits.
+
+Usage::
+
+    python benchmarks/generator.py --rows 1000 --format csv --out edition.csv
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import sys
+from datetime import date
+from typing import Any, Dict, Iterator, List
+
+_TEMPLATE_CSV = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "support_mail_maker",
+    "templates",
+    "upload_template.csv",
+)
+
+DEFAULT_SEED = 20260209
+
+# Ticket types as they appear in the ``ticket_type`` column.  Issues dominate
+# a real edition; news items are rare.
+_TYPE_WEIGHTS = (("Issue", 60), ("Win", 15), ("Oops", 15), ("News", 10))
+
+_DOMAINS = (
+    "Authentication", "Items API", "Questions Editor", "Reports", "Billing",
+    "Author Aide", "Data API", "Accessibility", "Performance", "Platform",
+    "Events API", "Annotations", "Scoring", "Localization", "SSO",
+    "Math Rendering", "Audio/Video", "Analytics", "Security", "Onboarding",
+)
+
+_CUSTOMERS = (
+    "Acme Corp", "Beta Inc", "Gamma LLC", "Delta Learning", "Epsilon Ed",
+    "Zeta Assess", "Eta Schools", "Theta Testing", "Iota Academy",
+    "Kappa Publishing", "Lambda Labs", "MegaCorp", "All Customers",
+)
+
+_OWNERS = ("Jane Doe", "John Smith", "Alice", "Bob", "Carol", "Dev Team")
+
+_WORDS = (
+    "customer", "reported", "intermittent", "timeout", "when", "loading",
+    "assessment", "items", "after", "the", "latest", "release", "which",
+    "caused", "students", "to", "lose", "progress", "during", "session",
+    "engineering", "confirmed", "regression", "in", "renderer", "and",
+    "shipped", "hotfix", "workaround", "involves", "clearing", "cache",
+    "scoring", "mismatch", "between", "preview", "report", "API", "rate",
+    "limits", "exceeded", "under", "peak", "load", "accessibility", "audit",
+    "flagged", "contrast", "issues", "on", "math", "keyboard", "navigation",
+)
+
+
+def template_headers() -> List[str]:
+    """Return the column headers of the shipped ``upload_template.csv``."""
+    with open(_TEMPLATE_CSV, newline="", encoding="utf-8") as template:
+        return next(csv.reader(template))
+
+
+class EditionGenerator:
+    """Deterministic factory for synthetic SupportMail edition content.
+
+    Domains follow a Zipf-like distribution (a few domains account for most
+    tickets) and summaries have a long-tailed length so that a handful of
+    rows carry several paragraphs of text, mirroring real exports.
+
+    Args:
+        seed (int, optional): Seed for the internal random generator.
+        include_ratio (float, optional): Fraction of rows flagged for the edition.
+    """
+
+    def __init__(self, seed: int = DEFAULT_SEED, include_ratio: float = 0.8):
+        self.seed = seed
+        self.include_ratio = include_ratio
+        self.headers = template_headers()
+        self._domain_weights = [1.0 / rank for rank in range(1, len(_DOMAINS) + 1)]
+
+    def _rng(self) -> random.Random:
+        return random.Random(self.seed)
+
+    @staticmethod
+    def _summary(rng: random.Random) -> str:
+        # Log-normal sentence count: median ~3 sentences, long tail to ~40.
+        sentences = max(1, min(40, int(rng.lognormvariate(1.1, 0.8))))
+        parts = []
+        for _ in range(sentences):
+            words = rng.choices(_WORDS, k=rng.randint(8, 22))
+            parts.append(" ".join(words).capitalize() + ".")
+        return " ".join(parts)
+
+    def iter_rows(self, rows: int) -> Iterator[Dict[str, str]]:
+        """Yield ``rows`` raw CSV rows keyed by the upload-template headers."""
+        rng = self._rng()
+        types = [t for t, _ in _TYPE_WEIGHTS]
+        type_weights = [w for _, w in _TYPE_WEIGHTS]
+        for index in range(rows):
+            ticket_id = 100000 + index
+            values = {
+                "ticket_type": rng.choices(types, weights=type_weights)[0],
+                "add_to_edition?": "TRUE" if rng.random() < self.include_ratio else "FALSE",
+                "owner": rng.choice(_OWNERS),
+                "customer": rng.choice(_CUSTOMERS),
+                "link": f"https://support.example.com/tickets/{ticket_id}",
+                "Topic/Domain": rng.choices(_DOMAINS, weights=self._domain_weights)[0],
+                "title": " ".join(rng.choices(_WORDS, k=rng.randint(3, 9))).capitalize(),
+                "subject matter/summary": self._summary(rng),
+                "notes": "",
+            }
+            yield {header: values.get(header, "") for header in self.headers}
+
+    def csv_text(self, rows: int) -> str:
+        """Return a full CSV document (header + ``rows`` rows) as a string."""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=self.headers)
+        writer.writeheader()
+        writer.writerows(self.iter_rows(rows))
+        return buffer.getvalue()
+
+    def write_csv(self, path: str, rows: int) -> str:
+        """Write a CSV upload of ``rows`` rows to ``path`` and return the path."""
+        with open(path, "w", newline="", encoding="utf-8") as output:
+            writer = csv.DictWriter(output, fieldnames=self.headers)
+            writer.writeheader()
+            writer.writerows(self.iter_rows(rows))
+        return path
+
+    def json_edition(self, rows: int, publish_date: date = date(2026, 2, 9)) -> Dict[str, Any]:
+        """Return a schema-shaped edition document with the included rows."""
+        sections = {"Issue": "issues", "Win": "wins", "Oops": "oops", "News": "news"}
+        content: Dict[str, Any] = {"issues": [], "oops": [], "wins": [], "news": []}
+        for row in self.iter_rows(rows):
+            if row["add_to_edition?"] != "TRUE":
+                continue
+            content[sections[row["ticket_type"]]].append(
+                {
+                    "title": row["title"],
+                    "domain": row["Topic/Domain"],
+                    "summary": row["subject matter/summary"],
+                    "customer": row["customer"],
+                    "item_type": row["ticket_type"],
+                    "ticket_url": row["link"],
+                }
+            )
+        return {"publish_date": publish_date.isoformat(), "content": content}
+
+    def json_text(self, rows: int) -> str:
+        """Return :meth:`json_edition` serialised as a JSON string."""
+        return json.dumps(self.json_edition(rows))
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--format", choices=("csv", "json"), default="csv")
+    parser.add_argument("--out", default="-", help="Output path, or '-' for stdout")
+    args = parser.parse_args(argv)
+
+    generator = EditionGenerator(seed=args.seed)
+    text = generator.csv_text(args.rows) if args.format == "csv" else generator.json_text(args.rows)
+    if args.out == "-":
+        sys.stdout.write(text)
+    else:
+        with open(args.out, "w", newline="", encoding="utf-8") as output:
+            output.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
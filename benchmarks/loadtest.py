@@ -0,0 +1,251 @@
+"""Concurrent-session load test for the SupportMail press.
+
+Starts the Gradio app on a local port (or targets one already running via
+``--url``), then drives ``--sessions`` simulated editors in parallel through
+the Gradio client API: each one uploads its own CSV, queues a press job,
+follows it to completion and downloads the generated HTML.  Reports p50/p95/p99 latency, throughput and error rate,
+and checks isolation — every session tags its rows with a unique marker, and
+a session whose download contains another session's marker (or is missing
+its own) is counted as a correctness failure.
+
+Usage::
+
+    python benchmarks/loadtest.py --sessions 20 --iterations 5 --rows 200
+"""
+import argparse
+import csv
+import gzip
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+
+from gradio_client import Client, handle_file
+
+from generator import EditionGenerator
+
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+_APP = os.path.join(_REPO_ROOT, "support_mail_maker", "app.py")
+_MARKER = re.compile(r"LT-[0-9a-f]{12}")
+_HREF = re.compile(r'href="([^"]+)"')
+_API_NAME = "/is_ready_to_publish_async"
+_FOLLOW_API_NAME = "/follow_job_async"
+
+# Outputs of the follow endpoint: status, download file, download links, inputs.
+_FILE_OUTPUT, _LINKS_OUTPUT = 1, 2
+
+
+@dataclass
+class PressResult:
+    """Outcome of one upload → press → download round trip."""
+
+    session: int
+    marker: str
+    latency: float
+    ok: bool
+    error: Optional[str] = None
+    foreign_markers: List[str] = field(default_factory=list)
+
+
+def percentile(samples: List[float], pct: int) -> float:
+    """Return the ``pct``-th percentile of ``samples`` (inclusive method)."""
+    if not samples:
+        return float("nan")
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[pct - 1]
+
+
+def write_session_csv(directory: str, session: int, rows: int, seed: int) -> tuple:
+    """Write a CSV whose every included row carries a session-unique marker."""
+    marker = f"LT-{uuid.uuid4().hex[:12]}"
+    generator = EditionGenerator(seed=seed + session, include_ratio=1.0)
+    path = os.path.join(directory, f"session_{session}.csv")
+    with open(path, "w", newline="", encoding="utf-8") as output:
+        writer = csv.DictWriter(output, fieldnames=generator.headers)
+        writer.writeheader()
+        for row in generator.iter_rows(rows):
+            row["title"] = f"{marker} {row['title']}"
+            writer.writerow(row)
+    return path, marker
+
+
+def _output_value(result, index: int):
+    value = result[index] if isinstance(result, (list, tuple)) and len(result) > index else None
+    if isinstance(value, dict) and "__type__" in value:
+        # Handlers return component updates (``gr.File(...)``) rather than bare values.
+        value = value.get("value")
+    return value
+
+
+def _downloaded_paths(result) -> List[str]:
+    """Flatten the download ``gr.File`` output into local paths."""
+    value = _output_value(result, _FILE_OUTPUT)
+    if value is None:
+        return []
+    if isinstance(value, (str, os.PathLike)):
+        return [str(value)]
+    paths = []
+    for entry in value:
+        if isinstance(entry, dict):
+            entry = entry.get("path") or entry.get("value")
+        if entry:
+            paths.append(str(entry))
+    return paths
+
+
+def _download_html(url: str, result) -> Optional[str]:
+    """Fetch the edition HTML, from the in-memory artifact links or a persisted file."""
+    links = _output_value(result, _LINKS_OUTPUT)
+    hrefs = [href for href in _HREF.findall(links or "") if href.endswith(".html")]
+    if hrefs:
+        request = urllib.request.Request(url.rstrip("/") + "/" + hrefs[0], headers={"Accept-Encoding": "gzip"})
+        with urllib.request.urlopen(request, timeout=30) as response:
+            body = response.read()
+            if response.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+        return body.decode("utf-8")
+    html_paths = [p for p in _downloaded_paths(result) if p.endswith(".html")]
+    if not html_paths:
+        return None
+    with open(html_paths[0], encoding="utf-8") as html_file:
+        return html_file.read()
+
+
+def run_session(url: str, session: int, iterations: int, csv_path: str, marker: str,
+                download_dir: str) -> List[PressResult]:
+    """Run one simulated editor for ``iterations`` presses on its own client."""
+    client = Client(url, verbose=False, download_files=os.path.join(download_dir, str(session)))
+    results = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        try:
+            job_id, _status = client.predict(
+                "",
+                handle_file(csv_path),
+                f"<p>{marker} trends</p>",
+                api_name=_API_NAME,
+            )
+            # The follow endpoint streams status; predict returns its final update.
+            output = client.predict(job_id, api_name=_FOLLOW_API_NAME)
+            html = _download_html(url, output)
+            latency = time.perf_counter() - started
+            if html is None:
+                results.append(PressResult(session, marker, latency, False, "no HTML artifact returned"))
+                continue
+            found = set(_MARKER.findall(html))
+            foreign = sorted(found - {marker})
+            if marker not in found:
+                results.append(PressResult(session, marker, latency, False, "own items missing", foreign))
+            elif foreign:
+                results.append(PressResult(session, marker, latency, False, "foreign items present", foreign))
+            else:
+                results.append(PressResult(session, marker, latency, True))
+        except Exception as exc:  # noqa: BLE001 - every failure is a data point
+            results.append(PressResult(session, marker, time.perf_counter() - started, False, repr(exc)))
+    return results
+
+
+def wait_for_server(url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2):
+                return
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.5)
+    raise TimeoutError(f"Server at {url} did not come up within {timeout:.0f}s")
+
+
+def start_server(port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "GRADIO_SERVER_PORT": str(port),
+        "GRADIO_SHARE": "False",
+        "GRADIO_INBROWSER": "False",
+        "GRADIO_ANALYTICS_ENABLED": "False",
+        # Trial presses must not land in anyone's edition archive.
+        "SUPPORTMAIL_ARCHIVE": "off",
+    }
+    return subprocess.Popen(
+        [sys.executable, _APP],
+        cwd=tempfile.mkdtemp(prefix="supportmail_loadtest_"),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def summarise(results: List[PressResult], elapsed: float) -> dict:
+    latencies = sorted(r.latency for r in results if r.ok)
+    errors = [r for r in results if not r.ok]
+    return {
+        "requests": len(results),
+        "succeeded": len(latencies),
+        "error_rate": len(errors) / len(results) if results else 0.0,
+        "isolation_failures": sum(1 for r in errors if r.foreign_markers),
+        "throughput_rps": len(results) / elapsed if elapsed else 0.0,
+        "latency_p50_s": percentile(latencies, 50),
+        "latency_p95_s": percentile(latencies, 95),
+        "latency_p99_s": percentile(latencies, 99),
+        "elapsed_s": elapsed,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent simulated editors")
+    parser.add_argument("--iterations", type=int, default=3, help="Presses per session")
+    parser.add_argument("--rows", type=int, default=100, help="CSV rows per upload")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--port", type=int, default=7599)
+    parser.add_argument("--url", help="Target an already running server instead of starting one")
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--report", help="Write the summary and failures as JSON to this path")
+    args = parser.parse_args(argv)
+
+    url = args.url or f"http://127.0.0.1:{args.port}/"
+    server = None if args.url else start_server(args.port)
+    try:
+        wait_for_server(url, args.startup_timeout)
+        workdir = tempfile.mkdtemp(prefix="supportmail_sessions_")
+        uploads = [write_session_csv(workdir, s, args.rows, args.seed) for s in range(args.sessions)]
+
+        results: List[PressResult] = []
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+            futures = [
+                pool.submit(run_session, url, s, args.iterations, path, marker, workdir)
+                for s, (path, marker) in enumerate(uploads)
+            ]
+            for future in as_completed(futures):
+                results.extend(future.result())
+        summary = summarise(results, time.perf_counter() - started)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    for key, value in summary.items():
+        print(f"{key:>20}: {value:.4f}" if isinstance(value, float) else f"{key:>20}: {value}")
+    failures = [asdict(r) for r in results if not r.ok]
+    for failure in failures[:10]:
+        print(f"  session {failure['session']}: {failure['error']} {failure['foreign_markers'] or ''}")
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as report:
+            json.dump({"summary": summary, "failures": failures}, report, indent=2)
+    return 0 if not failures else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
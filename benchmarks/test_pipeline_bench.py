@@ -0,0 +1,156 @@
+"""Per-stage benchmarks for the press pipeline.
+
+Each stage of a press — ingest, normalize, collate, validate, render,
+CSS inlining, markdownify and write — is timed in isolation at 10, 1k and (with
+``--bench-full``) 100k rows, so a regression can be pinned on the stage
+that caused it.  Run through ``task bench``, which compares against the
+stored baseline and fails when a stage's mean regresses.
+"""
+import asyncio
+import csv
+import io
+from datetime import datetime
+
+import pytest
+from django.template.loader import render_to_string
+from markdownify import markdownify as md
+
+from formatter import Formatter
+from inliner import inline_css
+from ingest import iter_json_rows, iter_upload_rows, normalize_csv_rows
+from utils import valid_JSON_input
+
+SIZES = [10, 1000, pytest.param(100_000, marks=pytest.mark.full)]
+
+
+def _rounds(rows: int) -> int:
+    """Keep total wall time per benchmark roughly constant across tiers."""
+    return max(1, min(50, 20_000 // rows))
+
+
+def _ingest(path: str) -> list:
+    # Plain whole-file read + DictReader: the pre-streaming upload path, kept
+    # as the baseline the encoding-aware reader is measured against.
+    with open(path, "r", encoding="utf-8") as upload:
+        data = upload.read()
+    return list(csv.DictReader(io.StringIO(data)))
+
+
+def _fresh_formatter(rows: list) -> Formatter:
+    formatter = Formatter(publish_date="2026-02-09")
+    formatter.set_raw_content(rows)
+    return formatter
+
+
+def _collated(rows: list) -> Formatter:
+    formatter = _fresh_formatter(rows)
+    asyncio.run(formatter.collate_content())
+    return formatter
+
+
+def _validation_context(formatter: Formatter) -> dict:
+    return {
+        **formatter.context,
+        "publish_date": formatter.context["publish_date"].strftime("%Y-%m-%d"),
+        "edition_month": formatter.context["edition_month"].strftime("%Y-%m-%d"),
+    }
+
+
+@pytest.mark.parametrize("rows", SIZES)
+def test_ingest(benchmark, corpus, rows):
+    path = corpus.csv_path(rows)
+    result = benchmark.pedantic(_ingest, args=(path,), rounds=_rounds(rows))
+    assert len(result) == rows
+
+
+@pytest.mark.parametrize("rows", SIZES)
+def test_ingest_csv_stream(benchmark, corpus, rows):
+    path = corpus.csv_path(rows)
+    result = benchmark.pedantic(lambda: list(iter_upload_rows(path)), rounds=_rounds(rows))
+    assert len(result) == rows
+
+
+@pytest.mark.parametrize("rows", SIZES)
+def test_ingest_csv_gz(benchmark, corpus, rows):
+    path = corpus.csv_gz_path(rows)
+    result = benchmark.pedantic(lambda: list(iter_upload_rows(path)), rounds=_rounds(rows))
+    assert len(result) == rows
+
+
+@pytest.mark.parametrize("rows", SIZES)
+def test_ingest_parquet(benchmark, corpus, rows):
+    path = corpus.parquet_path(rows)
+    result = benchmark.pedantic(lambda: list(iter_upload_rows(path)), rounds=_rounds(rows))
+    assert result and all(row["include"] is True for row in result)
+
+
+@pytest.mark.parametrize("rows", SIZES)
+def test_ingest_json(benchmark, corpus, rows):
+    text = corpus.json_text(rows)
+    result = benchmark.pedantic(lambda: list(iter_json_rows(text)), rounds=_rounds(rows))
+    assert result and all(row["include"] is True for row in result)
+
+
+@pytest.mark.parametrize("rows", SIZES)
+def test_normalize(benchmark, corpus, rows):
+    raw = _ingest(corpus.csv_path(rows))
+    result = benchmark.pedantic(normalize_csv_rows, args=(raw,), rounds=_rounds(rows))
+    assert len(result) == rows
+
+
+@pytest.mark.parametrize("rows", SIZES)
+def test_collate(benchmark, corpus, rows):
+    normalised = normalize_csv_rows(_ingest(corpus.csv_path(rows)))
+
+    def setup():
+        return (_fresh_formatter(normalised).collate_content(),), {}
+
+    assert benchmark.pedantic(asyncio.run, setup=setup, rounds=_rounds(rows)) is True
+
+
+@pytest.mark.parametrize("rows", SIZES)
+def test_validate(benchmark, corpus, rows):
+    formatter = _collated(normalize_csv_rows(_ingest(corpus.csv_path(rows))))
+    context = _validation_context(formatter)
+    assert benchmark.pedantic(valid_JSON_input, args=(context,), rounds=_rounds(rows)) is True
+
+
+@pytest.mark.parametrize("rows", SIZES)
+def test_render(benchmark, corpus, rows):
+    formatter = _collated(normalize_csv_rows(_ingest(corpus.csv_path(rows))))
+    html = benchmark.pedantic(
+        render_to_string,
+        args=("support_mail_template.html", formatter.context),
+        rounds=_rounds(rows),
+    )
+    assert "<html" in html
+
+
+@pytest.mark.parametrize("rows", SIZES)
+def test_inline_css(benchmark, corpus, rows):
+    formatter = _collated(normalize_csv_rows(_ingest(corpus.csv_path(rows))))
+    html = render_to_string("support_mail_template.html", formatter.context)
+    inlined = benchmark.pedantic(inline_css, args=(html,), rounds=_rounds(rows))
+    assert 'class="issue-title" style="' in inlined
+
+
+@pytest.mark.parametrize("rows", SIZES)
+def test_markdownify(benchmark, corpus, rows):
+    formatter = _collated(normalize_csv_rows(_ingest(corpus.csv_path(rows))))
+    html = render_to_string("support_mail_template.html", formatter.context)
+    markdown = benchmark.pedantic(md, args=(html,), rounds=_rounds(rows))
+    assert markdown
+
+
+@pytest.mark.parametrize("rows", SIZES)
+def test_write(benchmark, corpus, rows, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    formatter = _collated(normalize_csv_rows(_ingest(corpus.csv_path(rows))))
+    html = render_to_string("support_mail_template.html", formatter.context)
+    stamp = datetime.now().strftime("%H%M%S")
+
+    def write():
+        return asyncio.run(Formatter.save_to_file(filename=f"bench_{rows}_{stamp}", content=html))
+
+    path = benchmark.pedantic(write, rounds=_rounds(rows))
+    assert path.endswith(".html")
@@ -0,0 +1,61 @@
+"""Django versus Jinja2: render time per edition, and the cost of loading each engine.
+
+The render benchmarks time a full edition through each renderer at 10, 1k
+and (with ``--bench-full``) 100k rows.  The import benchmarks time a fresh
+interpreter importing the renderer and preparing it to render — Django's
+``settings.configure``/``django.setup``, or Jinja2 loading its templates
+from the bytecode cache — which every worker process pays once at start-up.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+from formatter import Formatter
+from ingest import iter_upload_rows
+from renderers import RENDERERS, get_renderer
+
+SIZES = [10, 1000, pytest.param(100_000, marks=pytest.mark.full)]
+
+_APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "support_mail_maker")
+
+
+def _rounds(rows: int) -> int:
+    return max(1, min(50, 20_000 // rows))
+
+
+@pytest.mark.parametrize("engine", RENDERERS)
+@pytest.mark.parametrize("rows", SIZES)
+def test_render_engine(benchmark, corpus, rows, engine):
+    formatter = Formatter(publish_date="2026-02-09", renderer=engine, dedup="off")
+    formatter.set_raw_content(iter_upload_rows(corpus.csv_path(rows)))
+    asyncio.run(formatter.collate_content())
+    renderer = get_renderer(engine)
+    html = benchmark.pedantic(
+        renderer.render, args=("support_mail_template.html", formatter.context), rounds=_rounds(rows)
+    )
+    assert "<html" in html
+
+
+@pytest.mark.parametrize("engine", RENDERERS)
+def test_import_engine(benchmark, engine):
+    script = f"import renderers; renderers.get_renderer({engine!r})"
+    command = [sys.executable, "-c", script]
+    env = {**os.environ, "PYTHONPATH": _APP_DIR}
+    # Warm the bytecode cache so every round measures a worker's steady-state start-up.
+    subprocess.run(command, env=env, check=True)
+    benchmark.pedantic(subprocess.run, args=(command,), kwargs={"env": env, "check": True}, rounds=5)
+
+
+@pytest.mark.parametrize("workers", [0, 4])
+@pytest.mark.parametrize("rows", SIZES)
+def test_render_sections_parallel(benchmark, corpus, rows, workers):
+    formatter = Formatter(publish_date="2026-02-09", render_workers=workers, dedup="off")
+    formatter.set_raw_content(iter_upload_rows(corpus.csv_path(rows)))
+    asyncio.run(formatter.collate_content())
+    # Start the pool outside the timing; it lives as long as the process.
+    "".join(formatter.iter_html())
+    html = benchmark.pedantic(lambda: "".join(formatter.iter_html()), rounds=_rounds(rows))
+    assert "<html" in html
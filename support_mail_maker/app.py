@@ -1,113 +1,32 @@
-
 import asyncio
-from os import environ, getenv
+from os import getenv
 import sys
 from datetime import datetime
-from typing import Union, Dict, Any, Tuple
-import json
+from typing import Dict, Any, Optional, Tuple
+import uuid
 import gradio as gr
+from fastapi import FastAPI
 from loguru import logger
 from formatter import Formatter
+from assets import get_asset_store
+from artifacts import router as artifact_router
+from archive import ITEM_COLUMNS, get_archive
+from jobs import JobStatus, QueueFullError, describe_job, get_job_queue, router as metrics_router
+from editions import press_edition, router as editions_router
+from state import get_state_store
+from ingest import UPLOAD_FILE_TYPES, iter_json_rows, iter_upload_rows
 from utils import log_file, clear_logs
 from gradio_log import Log
-import aiofiles
-import csv
-import io
-
-# ── CSV column-header → internal-key mapping ──────────────────────────────
-# Real-world CSV files arrive with varying header conventions (mixed case,
-# punctuation, abbreviations).  Each internal key maps to a **tuple of
-# accepted aliases** so that any reasonable header variant is recognised.
-# Matching is case-insensitive and strips leading/trailing whitespace.
-CSV_COLUMN_ALIASES: Dict[str, tuple] = {
-    "type": (
-        "section",
-        "type",
-        "ticket_type",
-    ),
-    "topic_domain": (
-        "topic_domain",
-        "topic/domain",
-    ),
-    "title": (
-        "title",
-    ),
-    "customer": (
-        "customer",
-    ),
-    "summary": (
-        "summary",
-        "subject matter/summary",
-    ),
-    "url": (
-        "ticket_link",
-        "link",
-    ),
-    "include": (
-        "add_to_edition",
-        "add_to_edition?",
-        "include",
-    ),
-}
-
-# Pre-compute a fast lookup: lowercased-alias → internal key
-_ALIAS_LOOKUP: Dict[str, str] = {}
-for _internal_key, _aliases in CSV_COLUMN_ALIASES.items():
-    for _alias in _aliases:
-        _ALIAS_LOOKUP[_alias.lower().strip()] = _internal_key
-
-
-# Truthy string values accepted for the ``add_to_edition`` CSV column.
-_TRUTHY_STRINGS = frozenset({"true", "1", "yes", "✅"})
-
-
-def _coerce_bool(value: Any) -> bool:
-    """Convert a CSV cell value to a Python bool.
-
-    Accepts ``True`` / ``False`` booleans as-is, and treats common
-    truthy strings (case-insensitive) — ``"true"``, ``"1"``, ``"yes"``,
-    ``"✅"`` — as ``True``.  Everything else is ``False``.
-    """
-    if isinstance(value, bool):
-        return value
-    if isinstance(value, str):
-        return value.strip().lower() in _TRUTHY_STRINGS
-    return False
-
 
-def normalize_csv_rows(rows: list[dict]) -> list[dict]:
-    """Re-key each CSV row from upload-template headers to internal keys.
+# Nothing heavier than constants is built at import: spawned render workers
+# re-import this module when the app is started with ``python app.py``.  Each
+# press job builds its own Formatter (see prepare_edition).
 
-    Header matching is **case-insensitive** and supports multiple aliases
-    per internal key (see ``CSV_COLUMN_ALIASES``).  Unmapped columns
-    (e.g. ``owner``, ``notes``, ``client_number``) are silently dropped.
-    The ``include`` field is coerced to a Python ``bool`` so that
-    ``collate_content`` can use ``if item.get("include") is True``.
+# How often a followed press job's status is refreshed in the UI, in seconds.
+JOB_POLL_INTERVAL = 0.5
 
-    Args:
-        rows: A list of dicts produced by ``csv.DictReader``.
-
-    Returns:
-        A new list of dicts with normalised keys.
-    """
-    normalised = []
-    for row in rows:
-        new_row: Dict[str, Any] = {key: "" for key in CSV_COLUMN_ALIASES}
-        for csv_header, value in row.items():
-            if csv_header is None:
-                continue
-            internal_key = _ALIAS_LOOKUP.get(csv_header.lower().strip())
-            if internal_key is not None:
-                new_row[internal_key] = value if value is not None else ""
-        # Coerce include from string → bool
-        new_row["include"] = _coerce_bool(new_row.get("include", ""))
-        normalised.append(new_row)
-    return normalised
-
-
-# Initialize current formatter with the current date
-now = datetime.now().strftime("%Y-%m-%d")
-current_edition = Formatter(publish_date=now)
+# How long an editor's unpressed draft is kept in the state store, in seconds.
+DRAFT_TTL = 30 * 24 * 3600
 
 # Placeholder JSON content
 PLACEHOLDER_JSON = """
@@ -123,7 +42,7 @@ PLACEHOLDER_JSON = """
 """
 
 
-def build_interface(formatter):
+def build_interface():
     """Builds the user interface for the application.
 
     This function creates and arranges the various components of the UI,
@@ -134,16 +53,32 @@ def build_interface(formatter):
         gr.Blocks: The Gradio Blocks application instance.
     """
     with gr.Blocks() as application:
-        create_header()
-        inp, inp2, trend_input = create_inputs()
-        process_btn, markdown_option, output_log = create_actions()
-        download_file = create_output()
+        # Identifies this browser's draft in the state store, across reloads and workers.
+        draft_id = gr.BrowserState("", storage_key="supportmail_draft")
+        with gr.Tab("Press"):
+            create_header()
+            inp, inp2, trend_input = create_inputs()
+            process_btn, markdown_option, output_log = create_actions()
+            job_id, job_status = create_job_status()
+            download_file, download_links = create_output()
+        with gr.Tab("Archive"):
+            search_inputs, search_btn, results = create_archive_search()
 
         process_btn.click(
-            fn=is_ready_to_publish_async, inputs=[inp, inp2, trend_input], outputs=[download_file, inp, inp2]
+            fn=is_ready_to_publish_async,
+            inputs=[inp, inp2, trend_input, markdown_option],
+            outputs=[job_id, job_status],
+        ).then(
+            fn=follow_job_async,
+            inputs=job_id,
+            outputs=[job_status, download_file, download_links, inp, inp2],
         )
-        markdown_option.select(fn=on_select, inputs=markdown_option)
+        application.load(fn=restore_draft_async, inputs=draft_id, outputs=[draft_id, inp, trend_input])
+        for draft_input in (inp, trend_input):
+            draft_input.blur(fn=save_draft_async, inputs=[draft_id, inp, trend_input], show_progress="hidden")
         inp2.upload(log_file_name_async, inp2)
+        search_btn.click(fn=search_archive_async, inputs=search_inputs, outputs=results)
+        search_inputs[0].submit(fn=search_archive_async, inputs=search_inputs, outputs=results)
 
     return application
 
@@ -175,7 +110,7 @@ def create_inputs():
             interactive=True,
         )
         inp2 = gr.File(
-            file_types=[".csv"], file_count="single", label="Upload File"
+            file_types=UPLOAD_FILE_TYPES, file_count="single", label="Upload File"
         )
     with gr.Row():
         gr.HTML("<h2>Trends Content</h2>")
@@ -196,7 +131,7 @@ def create_actions() -> Tuple[gr.Button, gr.Checkbox, Log]:
     Create the process button and log output display.
     """
     with gr.Row():
-        md_option = gr.Checkbox(label="Include Markdown with HTML?")
+        md_option = gr.Checkbox(label="Include Markdown with HTML?", value=True)
         process_btn = gr.Button("Send To Presses 🖨️", elem_id="send_to_presses")
     with gr.Row():
         output_log = Log(
@@ -211,78 +146,226 @@ def create_actions() -> Tuple[gr.Button, gr.Checkbox, Log]:
     return process_btn, md_option, output_log
 
 
+def create_job_status() -> Tuple[gr.Textbox, gr.Markdown]:
+    """
+    Create the press job ID and its live status line.
+    """
+    with gr.Row():
+        job_id = gr.Textbox(label="Press Job", interactive=False, scale=1)
+        job_status = gr.Markdown()
+    return job_id, job_status
+
+
 def create_output():
+    """
+    Create the download outputs: links served from the in-memory artifact
+    store, and a file list used only when artifacts are also persisted to disk.
+    """
+    with gr.Row():
+        download_links = gr.HTML(label="Downloads", visible=False)
     with gr.Row():
         output_file = gr.File(label="Download File", visible=False)
-    return output_file
+    return output_file, download_links
+
+
+def create_archive_search():
+    """
+    Create the Archive tab: full-text and filtered search over past editions' items.
+    """
+    with gr.Row():
+        gr.Markdown("Search every published edition's items. Words match titles, summaries, customers and domains.")
+    with gr.Row():
+        text = gr.Textbox(label="Search", placeholder="e.g. sso timeout", scale=3)
+        customer = gr.Textbox(label="Customer")
+        domain = gr.Textbox(label="Domain")
+        item_type = gr.Dropdown(label="Type", choices=["", "Issue", "Oops", "Win", "News"], value="")
+    with gr.Row():
+        since = gr.Textbox(label="Published since", placeholder="YYYY-MM-DD")
+        until = gr.Textbox(label="Published until", placeholder="YYYY-MM-DD")
+        search_btn = gr.Button("Search Archive 🔎")
+    with gr.Row():
+        results = gr.Dataframe(headers=list(ITEM_COLUMNS), interactive=False, wrap=True)
+    return [text, customer, domain, item_type, since, until], search_btn, results
 
 
-async def is_ready_to_publish_async(json_input: str, file_input: Any, trend_html: str, progress=gr.Progress(track_tqdm=True)) -> Any:
+async def search_archive_async(text: str, customer: str, domain: str, item_type: str, since: str, until: str):
     """
-    Check if content is ready for publishing and trigger formatting.
+    Search the edition archive and return the matching items as table rows.
     """
+    archive = get_archive()
+    if archive is None:
+        gr.Warning("Archiving is off; set SUPPORTMAIL_ARCHIVE to turn it on.")
+        return []
     try:
-        if json_input and json_input != PLACEHOLDER_JSON:
-            file_input = None
-            current_edition.context['publish_date'] = current_edition.publish_date
-            content = json_input
-        elif file_input is not None:
-            json_input = None
-            # Asynchronously read file content
-            async with aiofiles.open(file_input, "r") as f:
-                csv_data = await f.read()
-
-            # 2) Convert that string data into an in-memory buffer
-                data_buffer = io.StringIO(csv_data)
-
-            # 3) Pass the buffer to csv.DictReader
-                csv_reader = csv.DictReader(data_buffer)
-
-            # 4) Convert the reader to a list of dictionaries and normalise
-            #    CSV column headers to the internal keys collate_content expects.
-                content = normalize_csv_rows(list(csv_reader))
-                current_edition.context['publish_date'] = current_edition.publish_date
-        else:
-            logger.warning("No valid input provided!")
-            return None
-
-        # Set content in the formatter and initiate publishing
-        try:
-            current_edition.set_raw_content(content)
-            current_edition.context["content"]["trend_html"] = trend_html or ""
-            if await current_edition.send_to_press_async():
-                return await current_edition.publish_async()
-        except ValueError as ve:
-            logger.error("Invalid Content File Uploaded. Resetting Press...Please Try Again")
+        items = await asyncio.to_thread(
+            archive.search, text, customer=customer, domain=domain, item_type=item_type, since=since, until=until
+        )
+    except ValueError as e:
+        gr.Warning(f"Invalid search: {e}")
+        return []
+    logger.info(f"Archive search for {text!r} found {len(items)} item(s)")
+    return [[item[column] for column in ITEM_COLUMNS] for item in items]
+
+
+def prepare_edition(json_input: str, file_input: Any, trend_html: str,
+                    include_markdown: bool = True) -> Optional[Formatter]:
+    """
+    Build a fresh Formatter for one press from the JSON or uploaded file input.
+
+    Rows are not read here: they stream into collate_content when the press runs.
+    include_markdown is the "Include Markdown with HTML?" checkbox.
+
+    Returns:
+        Formatter: The edition to press, or None if no input was provided.
+    """
+    if json_input and json_input != PLACEHOLDER_JSON:
+        # Parsed lazily: rows stream into collate_content as they are read.
+        content = iter_json_rows(json_input)
+    elif file_input is not None:
+        # Stream rows straight from the upload; the reader is picked by
+        # file suffix (.csv, .json, .jsonl/.ndjson, .xlsx, optionally inside
+        # .gz/.zst/.zip) and normalises CSV column headers to the
+        # internal keys collate_content expects.
+        content = iter_upload_rows(file_input)
+    else:
+        logger.warning("No valid input provided!")
+        return None
+
+    edition = Formatter(publish_date=datetime.now().strftime("%Y-%m-%d"), include_markdown=include_markdown)
+    edition.set_raw_content(content)
+    edition.context["content"]["trend_html"] = trend_html or ""
+    return edition
+
+
+async def is_ready_to_publish_async(json_input: str, file_input: Any, trend_html: str,
+                                    include_markdown: bool = True) -> Tuple[str, str]:
+    """
+    Queue a press of the provided content and return its job ID at once.
+
+    The press runs on the job queue's worker pool; follow_job_async streams
+    its status and, when it finishes, the downloads.
+    """
+    try:
+        edition = prepare_edition(json_input, file_input, trend_html, include_markdown)
     except Exception as e:
         logger.error(f"Content is not ready for publishing: {e}")
         raise RuntimeError("Content is not ready for publishing.") from e
+    if edition is None:
+        return "", "No valid input provided."
+    try:
+        job = await get_job_queue().submit(
+            lambda: press_edition(edition), name="press", summarize=Formatter.publication_summary
+        )
+    except QueueFullError as e:
+        raise gr.Error(str(e))
+    return job.id, job.describe()
+
 
+def published_updates(summary: Dict[str, Any]) -> list:
+    """
+    The download updates for a finished press, from its job record's summary.
+    """
+    paths = summary.get("paths") or []
+    return [
+        gr.File(value=paths or None, visible=bool(paths)),
+        gr.HTML(value=summary.get("links_html", ""), visible=True),
+        gr.File(visible=False),
+        gr.Textbox(visible=False),
+    ]
 
-def on_select(value, evt: gr.EventData):
-    current_edition.include_markdown = value
+
+async def follow_job_async(job_id: str):
+    """
+    Stream a press job's status until it finishes, then its downloads.
+
+    The job is followed through its record, so it may be running on another
+    worker.
+
+    Yields:
+        list: Updates for the status line, the download file, the download
+        links and the two content inputs.
+    """
+    unchanged = [gr.update(), gr.update(), gr.update(), gr.update()]
+    if not job_id:
+        yield [gr.update(), *unchanged]
+        return
+    queue = get_job_queue()
+    record = await queue.lookup(job_id)
+    while record is not None and record["status"] in (JobStatus.QUEUED, JobStatus.RUNNING):
+        yield [describe_job(record), *unchanged]
+        await queue.wait(job_id, JOB_POLL_INTERVAL)
+        record = await queue.lookup(job_id)
+    if record is None:
+        yield [f"Press job `{job_id}` is unknown or has expired.", *unchanged]
+    elif record.get("result") is None:
+        yield [describe_job(record), *unchanged]
+    else:
+        yield [describe_job(record), *published_updates(record["result"])]
+
+
+async def restore_draft_async(draft_id: str):
+    """
+    Restore this browser's saved draft on page load, or give the browser a draft ID.
+    """
+    if not draft_id:
+        return uuid.uuid4().hex, gr.update(), gr.update()
+    draft = await asyncio.to_thread(get_state_store().get, f"draft:{draft_id}")
+    if draft is None:
+        return draft_id, gr.update(), gr.update()
+    logger.info("Restored your unpressed draft")
+    return draft_id, draft["json_input"], draft["trend_html"]
+
+
+async def save_draft_async(draft_id: str, json_input: str, trend_html: str) -> None:
+    """
+    Save the JSON and trends inputs as this browser's draft.
+    """
+    if not draft_id:
+        return
+    draft = {"json_input": json_input or "", "trend_html": trend_html or "", "saved_at": datetime.now().isoformat()}
+    await asyncio.to_thread(get_state_store().set, f"draft:{draft_id}", draft, DRAFT_TTL)
 
 
 async def log_file_name_async(file):
     logger.info(f"File uploaded: {file.name}")
 
 
+def create_app() -> FastAPI:
+    """
+    Build the ASGI app — the UI plus the HTTP routes — for running several workers:
+
+        uvicorn app:create_app --factory --app-dir support_mail_maker --workers 4
+
+    Set SUPPORTMAIL_STATE to sqlite or redis so the workers share job records,
+    drafts and press artifacts.
+    """
+    server = FastAPI(routes=[*artifact_router.routes, *metrics_router.routes, *editions_router.routes])
+    get_asset_store().preload()
+    return gr.mount_gradio_app(server, build_interface(), path="/", show_error=True,
+                               enable_monitoring=True)
+
+
 @logger.catch
 def main(app):
     app.launch(
-        inbrowser=True,
+        inbrowser=getenv('GRADIO_INBROWSER', 'True').lower() == 'true',
         debug=True,
-        share=True,
+        share=getenv('GRADIO_SHARE', 'True').lower() == 'true',
         show_error=True,
         state_session_capacity=10000,
         quiet=False,
         enable_monitoring=True,
-        server_port=int(getenv('GRADIO_SERVER_PORT', 7500))
+        server_port=int(getenv('GRADIO_SERVER_PORT', 7500)),
+        # Serves press artifacts from memory, the job queue's /metrics and
+        # the /editions HTTP API next to the Gradio routes.
+        app_kwargs={"routes": [*artifact_router.routes, *metrics_router.routes, *editions_router.routes]},
     )
 
 if __name__ == "__main__":
     try:
-        UI = build_interface(current_edition)
+        UI = build_interface()
+        # Optimise and encode the bundled images now rather than on the first press.
+        get_asset_store().preload()
         port = getenv('GRADIO_SERVER_PORT', '7500')
         print(
             f"Starting The Presses at http://127.0.0.1:{port}...\n\n"
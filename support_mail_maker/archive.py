@@ -0,0 +1,356 @@
+"""SQLite archive of published editions, with full-text search over their items.
+
+Archiving is opt-in: with ``SUPPORTMAIL_ARCHIVE`` set (to a database path,
+or ``on`` for ``~/.supportmail/archive.sqlite3``), every successful press
+records the edition's collated items — title, domain, customer, summary,
+ticket URL, type and publish date — in one transaction.  Editions are
+monthly, so re-pressing in the same month, on any day, replaces the earlier
+record: the archive holds the latest press of each month's edition.
+
+An FTS5 index over title, summary, customer and domain answers free-text
+queries, and B-tree indexes on customer, domain and publish date answer
+filtered ones, in milliseconds across years of editions.  Search from the
+UI's Archive tab, or from the command line::
+
+    python support_mail_maker/archive.py search "sso timeout" --customer "Acme Corp"
+    python support_mail_maker/archive.py editions
+"""
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Union
+import argparse
+import os
+import re
+import sqlite3
+import sys
+import threading
+
+from loguru import logger
+
+from dedup import item_key
+
+# The archive used when ``SUPPORTMAIL_ARCHIVE`` is ``on``.
+DEFAULT_ARCHIVE_PATH = os.path.join(os.path.expanduser("~"), ".supportmail", "archive.sqlite3")
+
+# ``SUPPORTMAIL_ARCHIVE`` values that turn archiving off (unset is off too)
+# and that turn it on at ``DEFAULT_ARCHIVE_PATH``.
+_DISABLED = ("", "off", "false", "none")
+_ENABLED = ("on", "true", "yes")
+
+SEARCH_LIMIT = 50
+
+# Keys per ``IN (...)`` lookup, well under SQLite's bound-parameter limit.
+_LOOKUP_BATCH = 500
+
+ITEM_COLUMNS = ("title", "domain", "customer", "summary", "ticket_url", "type", "publish_date")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS editions (
+    id INTEGER PRIMARY KEY,
+    publish_date TEXT NOT NULL UNIQUE,
+    pressed_at TEXT NOT NULL,
+    item_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    edition_id INTEGER NOT NULL REFERENCES editions(id) ON DELETE CASCADE,
+    type TEXT NOT NULL,
+    title TEXT NOT NULL,
+    domain TEXT,
+    customer TEXT,
+    summary TEXT,
+    ticket_url TEXT,
+    publish_date TEXT NOT NULL,
+    dedup_key TEXT
+);
+CREATE INDEX IF NOT EXISTS items_edition ON items (edition_id);
+CREATE INDEX IF NOT EXISTS items_customer ON items (customer COLLATE NOCASE, publish_date);
+CREATE INDEX IF NOT EXISTS items_domain ON items (domain COLLATE NOCASE, publish_date);
+CREATE INDEX IF NOT EXISTS items_publish_date ON items (publish_date);
+CREATE INDEX IF NOT EXISTS items_dedup_key ON items (dedup_key, publish_date);
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5 (
+    title, summary, customer, domain,
+    content = 'items', content_rowid = 'id',
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS items_fts_delete AFTER DELETE ON items BEGIN
+    INSERT INTO items_fts (items_fts, rowid, title, summary, customer, domain)
+    VALUES ('delete', old.id, old.title, old.summary, old.customer, old.domain);
+END;
+"""
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _fts_query(text: str) -> Optional[str]:
+    """Turn free text into an FTS5 query: every word must match, as a prefix.
+
+    Words are quoted, so FTS5 operators and punctuation in user input can't
+    cause syntax errors.
+    """
+    tokens = _TOKEN.findall(text)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def _iso_date(value: Union[str, date, datetime, None]) -> Optional[str]:
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.isoformat()
+    return date.fromisoformat(str(value)).isoformat()
+
+
+def edition_month(value: Union[str, date, datetime]) -> str:
+    """The month (``YYYY-MM``) of the edition published on ``value``; one edition per month."""
+    return _iso_date(value)[:7]
+
+
+class EditionArchive:
+    """A SQLite database of published editions and their items.
+
+    One connection is shared by all threads and serialised with a lock;
+    writes are a single transaction per edition.
+
+    Args:
+        path (str): The database file; created, with its directory, if missing.
+            ``":memory:"`` gives a throwaway archive.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.execute("PRAGMA synchronous = NORMAL")
+            self._connection.execute("PRAGMA foreign_keys = ON")
+            self._migrate()
+            self._connection.executescript(_SCHEMA)
+
+    def _migrate(self) -> None:
+        """Bring an archive created by an earlier version up to the current schema."""
+        columns = {row["name"] for row in self._connection.execute("PRAGMA table_info(items)")}
+        if columns and "dedup_key" not in columns:
+            self._connection.execute("ALTER TABLE items ADD COLUMN dedup_key TEXT")
+            rows = self._connection.execute("SELECT id, title, ticket_url FROM items").fetchall()
+            self._connection.executemany(
+                "UPDATE items SET dedup_key = ? WHERE id = ?",
+                ((item_key(dict(row)), row["id"]) for row in rows),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def record_edition(self, publish_date: Union[str, date, datetime],
+                       items: Iterable[Mapping[str, Any]]) -> int:
+        """Archive an edition's items, replacing any earlier press of that month's edition.
+
+        Args:
+            publish_date: The edition's publish date.
+            items: Items in ``Item.in_dict_format`` shape (``item_type`` and
+                ``domain`` keys).
+
+        Returns:
+            int: The number of items archived.
+        """
+        publish_date = _iso_date(publish_date)
+        rows = [
+            (
+                item.get("item_type") or item.get("type"),
+                item.get("title") or "",
+                item.get("domain"),
+                item.get("customer"),
+                item.get("summary"),
+                item.get("ticket_url") or None,
+                publish_date,
+                item_key(item),
+            )
+            for item in items
+        ]
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM editions WHERE substr(publish_date, 1, 7) = ?", (edition_month(publish_date),)
+            )
+            edition_id = self._connection.execute(
+                "INSERT INTO editions (publish_date, pressed_at, item_count) VALUES (?, ?, ?)",
+                (publish_date, datetime.now().isoformat(timespec="seconds"), len(rows)),
+            ).lastrowid
+            self._connection.executemany(
+                "INSERT INTO items"
+                " (edition_id, type, title, domain, customer, summary, ticket_url, publish_date, dedup_key)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((edition_id, *row) for row in rows),
+            )
+            # Index the whole edition in one statement rather than a trigger per row.
+            self._connection.execute(
+                "INSERT INTO items_fts (rowid, title, summary, customer, domain)"
+                " SELECT id, title, summary, customer, domain FROM items WHERE edition_id = ?",
+                (edition_id,),
+            )
+        logger.info(f"Archived {len(rows)} item(s) for the {publish_date} edition")
+        return len(rows)
+
+    def search(
+        self,
+        text: Optional[str] = None,
+        customer: Optional[str] = None,
+        domain: Optional[str] = None,
+        item_type: Optional[str] = None,
+        since: Union[str, date, None] = None,
+        until: Union[str, date, None] = None,
+        limit: int = SEARCH_LIMIT,
+    ) -> List[Dict[str, Any]]:
+        """Find archived items.
+
+        Args:
+            text: Free text matched against title, summary, customer and
+                domain; every word must appear (prefix matches count).
+                Results are ranked by relevance.  Without text, the newest
+                items come first.
+            customer: Exact customer name (case-insensitive).
+            domain: Exact topic domain (case-insensitive).
+            item_type: ``Issue``, ``Oops``, ``Win`` or ``News``.
+            since: Earliest publish date, inclusive.
+            until: Latest publish date, inclusive.
+            limit: Maximum number of items returned.
+
+        Returns:
+            List[Dict[str, Any]]: Items with the :data:`ITEM_COLUMNS` keys.
+        """
+        clauses, parameters = [], []
+        query = _fts_query(text or "")
+        for column, value in (("customer", customer), ("domain", domain), ("type", item_type)):
+            if value:
+                clauses.append(f"items.{column} = ? COLLATE NOCASE")
+                parameters.append(value)
+        if since:
+            clauses.append("items.publish_date >= ?")
+            parameters.append(_iso_date(since))
+        if until:
+            clauses.append("items.publish_date <= ?")
+            parameters.append(_iso_date(until))
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        if query:
+            sql = (
+                f"SELECT {', '.join(f'items.{c}' for c in ITEM_COLUMNS)} FROM items"
+                " JOIN items_fts ON items_fts.rowid = items.id AND items_fts MATCH ?"
+                f" {where} ORDER BY bm25(items_fts), items.publish_date DESC LIMIT ?"
+            )
+            parameters = [query, *parameters, limit]
+        else:
+            sql = (
+                f"SELECT {', '.join(ITEM_COLUMNS)} FROM items {where}"
+                " ORDER BY publish_date DESC, id LIMIT ?"
+            )
+            parameters.append(limit)
+        with self._lock:
+            return [dict(row) for row in self._connection.execute(sql, parameters)]
+
+    def find_prior(self, keys: Iterable[str], before: Union[str, date, datetime]) -> Dict[str, str]:
+        """Look up items already published in editions before the month of ``before``.
+
+        Args:
+            keys: De-duplication keys (:func:`dedup.item_key`).
+            before: The current edition's publish date.  Every press of that
+                month's edition, on any day, and later editions are ignored,
+                so re-pressing an edition never flags its own items.
+
+        Returns:
+            Dict[str, str]: The latest earlier publish date of each key found.
+        """
+        keys, month_start = list(keys), f"{edition_month(before)}-01"
+        found: Dict[str, str] = {}
+        with self._lock:
+            for start in range(0, len(keys), _LOOKUP_BATCH):
+                batch = keys[start:start + _LOOKUP_BATCH]
+                found.update(self._connection.execute(
+                    f"SELECT dedup_key, MAX(publish_date) FROM items"
+                    f" WHERE dedup_key IN ({', '.join('?' * len(batch))}) AND publish_date < ?"
+                    " GROUP BY dedup_key",
+                    (*batch, month_start),
+                ).fetchall())
+        return found
+
+    def editions(self) -> List[Dict[str, Any]]:
+        """List archived editions, newest first."""
+        with self._lock:
+            return [
+                dict(row) for row in self._connection.execute(
+                    "SELECT publish_date, pressed_at, item_count FROM editions ORDER BY publish_date DESC"
+                )
+            ]
+
+
+_archives: Dict[str, EditionArchive] = {}
+_archives_lock = threading.Lock()
+
+
+def archive_path() -> Optional[str]:
+    """The archive configured by ``SUPPORTMAIL_ARCHIVE``, or ``None`` if archiving is off (the default)."""
+    path = os.environ.get("SUPPORTMAIL_ARCHIVE", "")
+    if path.strip().lower() in _DISABLED:
+        return None
+    return DEFAULT_ARCHIVE_PATH if path.strip().lower() in _ENABLED else path
+
+
+def get_archive(path: Optional[str] = None) -> Optional[EditionArchive]:
+    """Return the shared archive at ``path`` (default: :func:`archive_path`), opening it once."""
+    path = path or archive_path()
+    if path is None:
+        return None
+    with _archives_lock:
+        if path not in _archives:
+            _archives[path] = EditionArchive(path)
+        return _archives[path]
+
+
+def _print_table(rows: Sequence[Mapping[str, Any]], columns: Sequence[str]) -> None:
+    if not rows:
+        print("No results.")
+        return
+    widths = {c: min(40, max(len(c), *(len(str(row[c] or "")) for row in rows))) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(str(row[c] or "")[:widths[c]].ljust(widths[c]) for c in columns))
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command-line entry point; see the module docstring."""
+    parser = argparse.ArgumentParser(description="Search the SupportMail edition archive.")
+    parser.add_argument("--archive", help="Archive file (default: SUPPORTMAIL_ARCHIVE)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    search = commands.add_parser("search", help="Search archived items")
+    search.add_argument("text", nargs="?", default="", help="Words to find in title, summary, customer or domain")
+    search.add_argument("--customer")
+    search.add_argument("--domain")
+    search.add_argument("--type", dest="item_type", choices=("Issue", "Oops", "Win", "News"))
+    search.add_argument("--since", help="Earliest publish date (YYYY-MM-DD)")
+    search.add_argument("--until", help="Latest publish date (YYYY-MM-DD)")
+    search.add_argument("--limit", type=int, default=SEARCH_LIMIT)
+    commands.add_parser("editions", help="List archived editions")
+    args = parser.parse_args(argv)
+
+    archive = get_archive(args.archive)
+    if archive is None:
+        print("Archiving is off; set SUPPORTMAIL_ARCHIVE or pass --archive.", file=sys.stderr)
+        return 1
+    if args.command == "editions":
+        _print_table(archive.editions(), ("publish_date", "pressed_at", "item_count"))
+    else:
+        rows = archive.search(
+            args.text, customer=args.customer, domain=args.domain, item_type=args.item_type,
+            since=args.since, until=args.until, limit=args.limit,
+        )
+        _print_table(rows, ("publish_date", "type", "customer", "domain", "title", "ticket_url"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
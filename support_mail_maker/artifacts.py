@@ -0,0 +1,580 @@
+"""In-memory store for pressed artifacts, served with precompressed variants.
+
+A press produces a handful of documents (HTML, Markdown, JSON Lines and
+optionally ``.eml``) that are downloaded once or twice and then forgotten.
+Rather than writing them to the process's working directory for Gradio to
+read back, each artifact is kept in a bounded, least-recently-used store and
+served by :data:`router` straight from memory.
+
+The ``gzip`` and, when the ``brotli`` package is installed, ``br`` encodings
+of every compressible artifact are computed once, in the same pass that
+stores it, so a download only picks the best representation the client
+accepts.  Bodies larger than :data:`SPOOL_BYTES` are spooled to an anonymous
+temporary file instead of being held in memory.
+
+Each worker process has its own store.  When ``SUPPORTMAIL_STATE`` names a
+shared :mod:`state` store, every artifact's unencoded body is also written
+there (for :data:`SHARED_ARTIFACT_TTL`) in chunks of
+:data:`SHARED_CHUNK_BYTES`, so a download that reaches another worker is
+served from the shared copy rather than answered with 404.  That worker
+recompresses it as it loads it, a chunk at a time.
+
+Persisting artifacts to disk or an object store is optional; see
+:mod:`storage`.
+"""
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from html import escape
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from urllib.parse import quote
+import base64
+import hashlib
+import mimetypes
+import os
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from loguru import logger
+
+from state import StateStore, get_state_store
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - gzip is served instead
+    brotli = None
+
+# URL prefix the artifacts are served under.
+ROUTE_PREFIX = "/artifacts"
+
+# Total bytes (all encodings) kept before the least recently used artifacts
+# are dropped; ``SUPPORTMAIL_ARTIFACT_STORE_BYTES`` overrides it.
+DEFAULT_STORE_BYTES = 64 * 1024 * 1024
+
+# How long artifacts are kept in a shared state store, in seconds; as long as
+# the job records that link to them.
+SHARED_ARTIFACT_TTL = 24 * 3600
+
+# Bytes of an artifact's body in each shared state document, so neither
+# sharing nor loading holds a spooled body in memory whole.
+SHARED_CHUNK_BYTES = 256 * 1024
+
+# Bodies larger than this are spooled to a temporary file.
+SPOOL_BYTES = 1024 * 1024
+
+# Read size when streaming a spooled body.
+_CHUNK_BYTES = 64 * 1024
+
+# Below this, compressing saves too little to be worth a second representation.
+_MIN_COMPRESS_BYTES = 1024
+
+# Artifacts are compressed once but pressed often, so favour speed over ratio.
+_GZIP_LEVEL = 6
+_BROTLI_QUALITY = 5
+
+# Encodings in order of preference when the client accepts several equally.
+_PREFERENCE = ("br", "gzip", "identity")
+
+_MEDIA_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".md": "text/markdown; charset=utf-8",
+    ".jsonl": "application/x-ndjson",
+    ".eml": "message/rfc822",
+}
+
+_COMPRESSIBLE = ("text/", "application/json", "application/x-ndjson", "message/rfc822")
+
+
+def media_type_for(name: str) -> str:
+    """Return the ``Content-Type`` to serve the artifact ``name`` with."""
+    extension = os.path.splitext(name)[1].lower()
+    return _MEDIA_TYPES.get(extension) or mimetypes.guess_type(name)[0] or "application/octet-stream"
+
+
+class _Body:
+    """One encoding of an artifact, in memory or spooled to a temporary file."""
+
+    __slots__ = ("_chunks", "_file", "_lock", "size", "spool_bytes")
+
+    def __init__(self, spool_bytes: int = SPOOL_BYTES):
+        self._chunks: Optional[List[bytes]] = []
+        self._file = None
+        self._lock = threading.Lock()
+        self.size = 0
+        self.spool_bytes = spool_bytes
+
+    @property
+    def in_memory(self) -> bool:
+        return self._file is None
+
+    def write(self, data: bytes) -> None:
+        if not data:
+            return
+        self.size += len(data)
+        if self._file is None and self.size > self.spool_bytes:
+            self._file = tempfile.TemporaryFile(prefix="supportmail_artifact_")
+            self._file.writelines(self._chunks)
+            self._chunks = None
+        if self._file is not None:
+            self._file.write(data)
+        else:
+            self._chunks.append(data)
+
+    def seal(self) -> None:
+        """Finish writing; in-memory chunks are joined so reads don't copy them again."""
+        if self._file is None:
+            self._chunks = [b"".join(self._chunks)]
+        else:
+            self._file.flush()
+
+    def read(self) -> bytes:
+        if self._file is None:
+            return self._chunks[0]
+        return b"".join(self.iter_chunks())
+
+    def iter_chunks(self) -> Iterator[bytes]:
+        if self._file is None:
+            yield self._chunks[0]
+            return
+        position = 0
+        while position < self.size:
+            with self._lock:
+                self._file.seek(position)
+                chunk = self._file.read(_CHUNK_BYTES)
+            if not chunk:
+                return
+            position += len(chunk)
+            yield chunk
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+
+
+@dataclass(eq=False)
+class Artifact:
+    """A stored press artifact and its encoded representations.
+
+    Attributes:
+        id: Random, unguessable token identifying the artifact in URLs.
+        name: The download file name, e.g. ``2025_support_mail_March.html``.
+        media_type: The ``Content-Type`` it is served with.
+        sha256: Hex digest of the unencoded body; the basis of its ``ETag``.
+        bodies: Encoded bodies keyed by content coding (``identity``, ``gzip``, ``br``).
+        created: When it was stored (``time.time()``).
+    """
+
+    id: str
+    name: str
+    media_type: str
+    sha256: str
+    bodies: Dict[str, _Body] = field(repr=False)
+    created: float = field(default_factory=time.time)
+
+    @property
+    def size(self) -> int:
+        """Size of the unencoded body in bytes."""
+        return self.bodies["identity"].size
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held for every encoding together."""
+        return sum(body.size for body in self.bodies.values())
+
+    @property
+    def encodings(self) -> Tuple[str, ...]:
+        return tuple(encoding for encoding in _PREFERENCE if encoding in self.bodies)
+
+    @property
+    def href(self) -> str:
+        """Download path relative to the app root, safe to use in a link."""
+        return f"{ROUTE_PREFIX.lstrip('/')}/{self.id}/{quote(self.name)}"
+
+    def etag(self, encoding: str = "identity") -> str:
+        tag = self.sha256[:32] if encoding == "identity" else f"{self.sha256[:32]}-{encoding}"
+        return f'"{tag}"'
+
+    def negotiate(self, accept_encoding: Optional[str]) -> str:
+        """Pick the representation to serve for an ``Accept-Encoding`` header.
+
+        Args:
+            accept_encoding: The request header, e.g. ``"gzip, br;q=0.9"``.
+
+        Returns:
+            The best available encoding the client accepts; ``"identity"``
+            if it accepts none of the compressed ones.
+        """
+        weights: Dict[str, float] = {}
+        for token in (accept_encoding or "").split(","):
+            coding, _, parameters = token.strip().partition(";")
+            coding = coding.strip().lower()
+            if not coding:
+                continue
+            weight = 1.0
+            name, _, value = parameters.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+            weights[coding] = weight
+        candidates = [
+            encoding for encoding in self.encodings
+            if encoding != "identity" and weights.get(encoding, weights.get("*", 0.0)) > 0
+        ]
+        if not candidates:
+            return "identity"
+        return max(candidates, key=lambda encoding: (weights.get(encoding, weights.get("*", 0.0)),
+                                                     -_PREFERENCE.index(encoding)))
+
+    def read(self, encoding: str = "identity") -> bytes:
+        """Return one representation of the artifact whole."""
+        return self.bodies[encoding].read()
+
+    def iter_chunks(self, encoding: str = "identity") -> Iterator[bytes]:
+        """Yield one representation of the artifact in bounded chunks."""
+        return self.bodies[encoding].iter_chunks()
+
+    def close(self) -> None:
+        for body in self.bodies.values():
+            body.close()
+
+
+def _encode_chunks(content: Union[str, bytes, Iterable[Union[str, bytes]]]) -> Iterator[bytes]:
+    if isinstance(content, (str, bytes)):
+        content = (content,)
+    for chunk in content:
+        yield chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+
+
+def _rechunk(chunks: Iterable[bytes], size: int) -> Iterator[bytes]:
+    """Regroup ``chunks`` into pieces of ``size`` bytes (the last may be shorter)."""
+    buffer = bytearray()
+    for chunk in chunks:
+        buffer += chunk
+        while len(buffer) >= size:
+            yield bytes(buffer[:size])
+            del buffer[:size]
+    if buffer:
+        yield bytes(buffer)
+
+
+class ArtifactWriter:
+    """Builds one artifact from chunks as they are written; see :meth:`ArtifactStore.open`."""
+
+    def __init__(self, store: "ArtifactStore", name: str, media_type: str):
+        self.store = store
+        self.name = name
+        self.media_type = media_type
+        self._digest = hashlib.sha256()
+        self._bodies = {"identity": _Body(store.spool_bytes)}
+        self._compressors = {}
+        if media_type.startswith(_COMPRESSIBLE):
+            self._compressors["gzip"] = zlib.compressobj(_GZIP_LEVEL, zlib.DEFLATED, 31)
+            if brotli is not None:
+                self._compressors["br"] = brotli.Compressor(quality=_BROTLI_QUALITY)
+            for encoding in self._compressors:
+                self._bodies[encoding] = _Body(store.spool_bytes)
+
+    def write(self, chunk: Union[str, bytes]) -> None:
+        """Append a chunk of the body (text is encoded as UTF-8)."""
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        self._digest.update(chunk)
+        self._bodies["identity"].write(chunk)
+        for encoding, compressor in self._compressors.items():
+            self._bodies[encoding].write(compressor.process(chunk) if encoding == "br" else compressor.compress(chunk))
+
+    def close(self) -> Artifact:
+        """Finish the body and store the artifact.
+
+        Returns:
+            The stored artifact.
+        """
+        artifact = self._finish(uuid.uuid4().hex)
+        self.store._share(artifact)
+        self.store._add(artifact)
+        logger.debug(
+            f"Stored artifact {self.name} ({artifact.size} bytes; "
+            + ", ".join(f"{encoding} {body.size}" for encoding, body in artifact.bodies.items()
+                        if encoding != "identity")
+            + ")"
+        )
+        return artifact
+
+    def _finish(self, artifact_id: str, created: Optional[float] = None) -> Artifact:
+        """Finish the body and build the artifact, without storing it."""
+        bodies = self._bodies
+        for encoding, compressor in self._compressors.items():
+            bodies[encoding].write(compressor.finish() if encoding == "br" else compressor.flush())
+
+        identity_size = bodies["identity"].size
+        for encoding in list(self._compressors):
+            # Keep a variant only if it is worth sending instead of the original.
+            if identity_size < _MIN_COMPRESS_BYTES or bodies[encoding].size >= identity_size:
+                bodies.pop(encoding).close()
+        for body in bodies.values():
+            body.seal()
+
+        return Artifact(artifact_id, self.name, self.media_type, self._digest.hexdigest(), bodies,
+                        created or time.time())
+
+    def discard(self) -> None:
+        """Abandon the artifact, releasing anything already spooled."""
+        for body in self._bodies.values():
+            body.close()
+
+
+class ArtifactStore:
+    """A bounded, least-recently-used store of press artifacts.
+
+    Args:
+        max_bytes (int, optional): Bytes kept across all artifacts and their
+            encodings before the least recently used are evicted.  Defaults to
+            ``SUPPORTMAIL_ARTIFACT_STORE_BYTES`` or :data:`DEFAULT_STORE_BYTES`.
+        spool_bytes (int, optional): Bodies larger than this are spooled to a
+            temporary file rather than held in memory.
+        state (StateStore, optional): A store shared with other workers; each
+            artifact is also written there, and artifacts this store does not
+            hold are looked up there.  ``None`` keeps artifacts in this process.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, spool_bytes: int = SPOOL_BYTES,
+                 state: Optional[StateStore] = None):
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("SUPPORTMAIL_ARTIFACT_STORE_BYTES", DEFAULT_STORE_BYTES))
+        self.max_bytes = max_bytes
+        self.spool_bytes = spool_bytes
+        self.state = state
+        self._artifacts: "OrderedDict[str, Artifact]" = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._artifacts)
+
+    def __contains__(self, artifact_id: str) -> bool:
+        return artifact_id in self._artifacts
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes currently held, across all encodings."""
+        return self._nbytes
+
+    def put(self, name: str, content: Union[str, bytes, Iterable[Union[str, bytes]]],
+            media_type: Optional[str] = None) -> Artifact:
+        """Store an artifact, computing its compressed encodings in the same pass.
+
+        Args:
+            name: The download file name.
+            content: The body as text, bytes, or an iterable of text/byte
+                chunks (text is encoded as UTF-8).  Chunks are consumed once
+                and never joined in memory beyond :attr:`spool_bytes`.
+            media_type: The ``Content-Type``; guessed from ``name`` if omitted.
+
+        Returns:
+            The stored artifact.
+        """
+        writer = self.open(name, media_type)
+        try:
+            for chunk in _encode_chunks(content):
+                writer.write(chunk)
+        except BaseException:
+            writer.discard()
+            raise
+        return writer.close()
+
+    def open(self, name: str, media_type: Optional[str] = None) -> "ArtifactWriter":
+        """Start an artifact whose body is written a chunk at a time.
+
+        Lets one producer feed several artifacts in step — e.g. an edition's
+        HTML and its Markdown, section by section — where :meth:`put` would
+        need each body as its own iterable.
+
+        Args:
+            name: The download file name.
+            media_type: The ``Content-Type``; guessed from ``name`` if omitted.
+
+        Returns:
+            A writer; the artifact is stored when it is closed.
+        """
+        return ArtifactWriter(self, name, media_type or media_type_for(name))
+
+    def _add(self, artifact: Artifact) -> None:
+        with self._lock:
+            self._artifacts[artifact.id] = artifact
+            self._nbytes += artifact.nbytes
+            self._evict(keep=artifact.id)
+
+    def _evict(self, keep: str) -> None:
+        while self._nbytes > self.max_bytes and len(self._artifacts) > 1:
+            artifact_id = next(iter(self._artifacts))
+            if artifact_id == keep:
+                break
+            self._drop(artifact_id)
+            logger.info(f"Evicted artifact {artifact_id} to stay within {self.max_bytes} bytes")
+
+    def _drop(self, artifact_id: str) -> None:
+        artifact = self._artifacts.pop(artifact_id)
+        self._nbytes -= artifact.nbytes
+        artifact.close()
+
+    def _share(self, artifact: Artifact) -> None:
+        """Write ``artifact``'s unencoded body to the shared state store, if there is one.
+
+        The body goes in :data:`SHARED_CHUNK_BYTES` documents, read back from
+        any spool a chunk at a time, and then the document describing them,
+        so other workers never find a partial artifact.
+        """
+        if self.state is None:
+            return
+        key = f"artifact:{artifact.id}"
+        try:
+            chunks = 0
+            for data in _rechunk(artifact.iter_chunks(), SHARED_CHUNK_BYTES):
+                self.state.set(f"{key}:{chunks}", {"data": base64.b64encode(data).decode("ascii")},
+                               ttl=SHARED_ARTIFACT_TTL)
+                chunks += 1
+            self.state.set(key, {"name": artifact.name, "media_type": artifact.media_type, "sha256": artifact.sha256,
+                                 "created": artifact.created, "chunks": chunks}, ttl=SHARED_ARTIFACT_TTL)
+        except Exception as e:
+            # Still downloadable from this worker.
+            logger.error(f"Failed to share artifact {artifact.name} through {self.state.name} state: {e}")
+
+    def _load_shared(self, artifact_id: str) -> Optional[Artifact]:
+        """Rebuild an artifact another worker shared, keeping it in this store too.
+
+        Its compressed encodings are made again as the chunks are read.
+        """
+        key = f"artifact:{artifact_id}"
+        document: Optional[Dict[str, Any]] = self.state.get(key)
+        if document is None:
+            return None
+        writer = ArtifactWriter(self, document["name"], document["media_type"])
+        try:
+            for index in range(document["chunks"]):
+                chunk = self.state.get(f"{key}:{index}")
+                if chunk is None:
+                    logger.warning(f"Shared artifact {artifact_id} is missing chunk {index}")
+                    writer.discard()
+                    return None
+                writer.write(base64.b64decode(chunk["data"]))
+        except BaseException:
+            writer.discard()
+            raise
+        artifact = writer._finish(artifact_id, document["created"])
+        if artifact.sha256 != document["sha256"]:
+            logger.warning(f"Shared artifact {artifact_id} does not match its digest")
+            artifact.close()
+            return None
+        with self._lock:
+            # Another request may have loaded it meanwhile.
+            if artifact_id in self._artifacts:
+                artifact.close()
+                return self._artifacts[artifact_id]
+        self._add(artifact)
+        logger.debug(f"Loaded shared artifact {artifact.name} from {self.state.name} state")
+        return artifact
+
+    def get(self, artifact_id: str) -> Optional[Artifact]:
+        """Return a stored artifact, marking it recently used, or ``None``.
+
+        Artifacts this store does not hold are looked up in the shared state
+        store, if there is one.
+        """
+        with self._lock:
+            artifact = self._artifacts.get(artifact_id)
+            if artifact is not None:
+                self._artifacts.move_to_end(artifact_id)
+                return artifact
+        if self.state is None:
+            return None
+        return self._load_shared(artifact_id)
+
+    def discard(self, artifact_id: str) -> None:
+        """Remove an artifact if it is still stored, here and in the shared state store."""
+        with self._lock:
+            if artifact_id in self._artifacts:
+                self._drop(artifact_id)
+        if self.state is not None:
+            key = f"artifact:{artifact_id}"
+            document = self.state.get(key)
+            self.state.delete(key)
+            for index in range(document["chunks"] if document else 0):
+                self.state.delete(f"{key}:{index}")
+
+    def clear(self) -> None:
+        with self._lock:
+            for artifact_id in list(self._artifacts):
+                self._drop(artifact_id)
+
+
+_default_store: Optional[ArtifactStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """Return the process-wide artifact store, creating it on first use.
+
+    It shares artifacts through the state store ``SUPPORTMAIL_STATE`` names,
+    unless that is the (unshared) ``memory`` store.
+    """
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                state = get_state_store()
+                _default_store = ArtifactStore(state=state if state.name != "memory" else None)
+    return _default_store
+
+
+router = APIRouter()
+
+
+@router.get(ROUTE_PREFIX + "/{artifact_id}/{name}")
+def download_artifact(artifact_id: str, name: str, request: Request) -> Response:
+    """Serve a stored artifact in the best encoding the client accepts."""
+    artifact = get_artifact_store().get(artifact_id)
+    if artifact is None or artifact.name != name:
+        raise HTTPException(status_code=404, detail="Artifact not found or expired")
+    encoding = artifact.negotiate(request.headers.get("accept-encoding"))
+    headers = {
+        "ETag": artifact.etag(encoding),
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "private, max-age=3600",
+        "Content-Disposition": f"attachment; filename*=UTF-8''{quote(artifact.name)}",
+    }
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    body = artifact.bodies[encoding]
+    if body.in_memory:
+        return Response(content=body.read(), media_type=artifact.media_type, headers=headers)
+    headers["Content-Length"] = str(body.size)
+    return StreamingResponse(body.iter_chunks(), media_type=artifact.media_type, headers=headers)
+
+
+def render_download_links(artifacts: Iterable[Artifact], urls: Iterable[Optional[str]] = ()) -> str:
+    """Render the download list shown in the UI for a press's artifacts.
+
+    Args:
+        artifacts: The press's artifacts.
+        urls: Their storage URLs, if any, in the same order; ``http(s)`` URLs
+            (e.g. presigned object-store links) are linked instead of the
+            artifact store.
+    """
+    urls = list(urls)
+    items = []
+    for index, artifact in enumerate(artifacts):
+        url = urls[index] if index < len(urls) else None
+        href = url if url and url.startswith(("https://", "http://")) else artifact.href
+        items.append(
+            f'<li><a href="{escape(href)}" download="{escape(artifact.name)}">{escape(artifact.name)}</a>'
+            f" <small>({artifact.size / 1024:.1f} KB)</small></li>"
+        )
+    return f'<ul class="artifact-downloads">{"".join(items)}</ul>' if items else ""
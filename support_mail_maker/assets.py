@@ -0,0 +1,269 @@
+"""Optimised, pre-encoded image assets for self-contained editions.
+
+The templates hot-link their header images from the CDN.  For offline or
+self-contained output (``.eml`` files, archived HTML) the same images ship
+in ``static/images``; this module optimises them once — lossless PNG
+recompression, dropping an unused alpha channel and palettising images with
+few colours — and caches both their ``data:`` URI and their MIME
+``Content-ID`` keyed by file hash, so a press never re-reads or re-encodes
+an image.
+
+Optimised bytes are also kept on disk (``SUPPORTMAIL_ASSET_CACHE``), so the
+optimisation itself runs once per image version, not once per process.
+"""
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+import base64
+import functools
+import hashlib
+import io
+import mimetypes
+import os
+import re
+import tempfile
+import threading
+
+from loguru import logger
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - images are embedded unoptimised
+    Image = None
+
+IMAGE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "images")
+
+CDN_BASE_URL = "https://dozens.nyc3.cdn.digitaloceanspaces.com/learnosity/"
+
+# CDN image referenced by the templates → bundled copy in ``IMAGE_DIR``.
+# Images without a bundled copy (the trends header) stay hot-linked.
+CDN_ASSETS: Dict[str, str] = {
+    f"{CDN_BASE_URL}supportmail_header.png": "img-title-graphic.png",
+    f"{CDN_BASE_URL}section_header_issues.png": "img-section-header-issues.png",
+    f"{CDN_BASE_URL}section_header_oops.png": "img-section-header-oops.png",
+    f"{CDN_BASE_URL}section_header_wins.png": "img-section-header-wins.png",
+    f"{CDN_BASE_URL}section_header_news.png": "img-section-header-news.png",
+}
+
+# Bump when ``optimize_png`` changes, so stale cached output is not reused.
+_OPTIMIZER_VERSION = 1
+
+_SRC_ATTRIBUTE = re.compile(r'(\bsrc\s*=\s*["\'])([^"\']+)(["\'])')
+
+
+def _default_cache_dir() -> str:
+    return os.environ.get("SUPPORTMAIL_ASSET_CACHE", os.path.join(tempfile.gettempdir(), "supportmail_assets"))
+
+
+@dataclass(frozen=True)
+class Asset:
+    """An optimised image and its pre-computed embeddings.
+
+    Attributes:
+        name: File name in the image directory.
+        sha256: Hex digest of the *source* file; the cache key.
+        mime_type: The image's MIME type, e.g. ``image/png``.
+        data: The optimised image bytes.
+    """
+
+    name: str
+    sha256: str
+    mime_type: str
+    data: bytes = field(repr=False)
+
+    @property
+    def cid(self) -> str:
+        """``Content-ID`` (without angle brackets) for ``multipart/related`` parts."""
+        return f"{self.sha256[:16]}@supportmail"
+
+    @functools.cached_property
+    def data_uri(self) -> str:
+        """The image as a ``data:`` URI, encoded once."""
+        return f"data:{self.mime_type};base64,{base64.b64encode(self.data).decode('ascii')}"
+
+    @functools.cached_property
+    def mime_part(self) -> bytes:
+        """The image as a complete inline MIME part (headers and base64 body), encoded once.
+
+        Written as-is into ``multipart/related`` messages, with CRLF line
+        endings and base64 wrapped at 76 characters per RFC 2045.
+        """
+        encoded = base64.encodebytes(self.data).replace(b"\n", b"\r\n")
+        headers = (
+            f"Content-Type: {self.mime_type}\r\n"
+            "Content-Transfer-Encoding: base64\r\n"
+            f"Content-ID: <{self.cid}>\r\n"
+            f'Content-Disposition: inline; filename="{self.name}"\r\n'
+            "\r\n"
+        )
+        return headers.encode("ascii") + encoded
+
+
+def optimize_png(data: bytes) -> bytes:
+    """Losslessly shrink a PNG.
+
+    Drops a fully opaque alpha channel, palettises images with at most 256
+    colours when the round trip is pixel-exact, and recompresses with
+    ``optimize=True``.  Returns the original bytes if nothing helped or
+    Pillow is not installed.
+
+    Args:
+        data: The PNG file contents.
+
+    Returns:
+        The smaller of the optimised and the original encoding.
+    """
+    if Image is None:
+        return data
+    with Image.open(io.BytesIO(data)) as image:
+        image.load()
+        candidate = image
+        if candidate.mode == "RGBA" and candidate.getchannel("A").getextrema() == (255, 255):
+            candidate = candidate.convert("RGB")
+        colours = candidate.getcolors(256) if candidate.mode in ("RGB", "RGBA", "L", "LA") else None
+        if colours is not None:
+            palettised = candidate.quantize(
+                colors=len(colours), method=Image.Quantize.FASTOCTREE, dither=Image.Dither.NONE
+            )
+            if palettised.convert(candidate.mode).tobytes() == candidate.tobytes():
+                candidate = palettised
+        output = io.BytesIO()
+        candidate.save(output, format="PNG", optimize=True)
+    optimised = output.getvalue()
+    return optimised if len(optimised) < len(data) else data
+
+
+class AssetStore:
+    """Loads, optimises and caches the bundled images.
+
+    Assets are built lazily on first use (or all at once with
+    :meth:`preload`) and kept in memory keyed by name and by hash.
+
+    Args:
+        directory (str, optional): Directory holding the source images.
+        cache_dir (str, optional): Where optimised bytes are persisted, keyed
+            by source hash.  Defaults to ``SUPPORTMAIL_ASSET_CACHE`` or a
+            directory under the system temp dir.
+    """
+
+    def __init__(self, directory: str = IMAGE_DIR, cache_dir: Optional[str] = None):
+        self.directory = directory
+        self.cache_dir = cache_dir or _default_cache_dir()
+        self._by_name: Dict[str, Asset] = {}
+        self._by_hash: Dict[str, Asset] = {}
+        self._lock = threading.Lock()
+
+    def _optimised_bytes(self, digest: str, source: bytes, mime_type: str) -> bytes:
+        if mime_type != "image/png" or Image is None:
+            return source
+        cached = os.path.join(self.cache_dir, f"{digest}.o{_OPTIMIZER_VERSION}.png")
+        try:
+            with open(cached, "rb") as cache_file:
+                return cache_file.read()
+        except OSError:
+            pass
+        data = optimize_png(source)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            partial = f"{cached}.{os.getpid()}.tmp"
+            with open(partial, "wb") as cache_file:
+                cache_file.write(data)
+            os.replace(partial, cached)
+        except OSError as e:
+            logger.warning(f"Unable to cache optimised asset {digest}: {e}")
+        logger.info(f"Optimised image asset {digest[:12]}: {len(source)} → {len(data)} bytes")
+        return data
+
+    def get(self, name: str) -> Asset:
+        """Return the asset for the image file ``name``, building it on first use.
+
+        Raises:
+            FileNotFoundError: If there is no such image.
+        """
+        asset = self._by_name.get(name)
+        if asset is not None:
+            return asset
+        with self._lock:
+            asset = self._by_name.get(name)
+            if asset is None:
+                with open(os.path.join(self.directory, name), "rb") as source_file:
+                    source = source_file.read()
+                digest = hashlib.sha256(source).hexdigest()
+                asset = self._by_hash.get(digest)
+                if asset is None:
+                    mime_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                    asset = Asset(name, digest, mime_type, self._optimised_bytes(digest, source, mime_type))
+                    self._by_hash[digest] = asset
+                self._by_name[name] = asset
+        return asset
+
+    def by_hash(self, digest: str) -> Optional[Asset]:
+        """Return an already-built asset by source hash, if any."""
+        return self._by_hash.get(digest)
+
+    def for_url(self, url: str) -> Optional[Asset]:
+        """Return the bundled asset standing in for a CDN image URL, if any."""
+        name = CDN_ASSETS.get(url)
+        if name is None:
+            return None
+        try:
+            return self.get(name)
+        except OSError as e:
+            logger.warning(f"Bundled image for {url} unavailable: {e}")
+            return None
+
+    def preload(self, names: Optional[Iterable[str]] = None) -> List[Asset]:
+        """Build every mapped asset now (e.g. at startup) instead of on first press."""
+        assets = []
+        for name in names if names is not None else sorted(set(CDN_ASSETS.values())):
+            try:
+                assets.append(self.get(name))
+            except OSError as e:
+                logger.warning(f"Unable to preload image asset {name}: {e}")
+        return assets
+
+    def embed(self, html: str, mode: str = "data-uri") -> Tuple[str, List[Asset]]:
+        """Point the CDN ``src`` attributes of ``html`` at embedded images.
+
+        Args:
+            html: A rendered edition.
+            mode: ``"data-uri"`` to inline the images, or ``"cid"`` to
+                reference ``multipart/related`` parts.
+
+        Returns:
+            The rewritten HTML and the distinct assets it now references.
+
+        Raises:
+            ValueError: If ``mode`` is not recognised.
+        """
+        if mode not in ("data-uri", "cid"):
+            raise ValueError(f"Unknown image embedding mode: {mode}")
+        used: Dict[str, Asset] = {}
+
+        def replace(match: re.Match) -> str:
+            asset = self.for_url(match.group(2))
+            if asset is None:
+                return match.group(0)
+            used[asset.sha256] = asset
+            target = asset.data_uri if mode == "data-uri" else f"cid:{asset.cid}"
+            return f"{match.group(1)}{target}{match.group(3)}"
+
+        return _SRC_ATTRIBUTE.sub(replace, html), list(used.values())
+
+
+_default_store: Optional[AssetStore] = None
+_default_store_lock = threading.Lock()
+
+
+def get_asset_store() -> AssetStore:
+    """Return the process-wide asset store, creating it on first use."""
+    global _default_store
+    if _default_store is None:
+        with _default_store_lock:
+            if _default_store is None:
+                _default_store = AssetStore()
+    return _default_store
+
+
+def embed_images(html: str, mode: str = "data-uri") -> Tuple[str, List[Asset]]:
+    """Embed the bundled images into ``html`` using the shared asset store."""
+    return get_asset_store().embed(html, mode)
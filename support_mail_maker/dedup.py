@@ -0,0 +1,129 @@
+"""De-duplication of items within an edition and against earlier editions.
+
+Tracker exports often list a ticket once per owner, and a ticket sometimes
+resurfaces the following month.  Each item is keyed on its normalised
+ticket URL plus a fingerprint of its title (:func:`item_key`):
+
+* within an edition, an :class:`EditionIndex` (a dict keyed by item key)
+  merges repeats into the first occurrence, combining their customers;
+* across editions, the same keys are looked up in the edition archive's
+  index (:meth:`archive.EditionArchive.find_prior`) and items already
+  published in an earlier edition are flagged and left out.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, MutableMapping, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import hashlib
+import re
+import unicodedata
+
+DEDUP_MODES = ("off", "edition", "archive")
+
+# Query parameters that never identify a ticket.
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|mc_\w+|ref|source)$", re.IGNORECASE)
+_DEFAULT_PORTS = {"http": "80", "https": "443"}
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize_url(url: Optional[str]) -> str:
+    """Reduce a ticket URL to the part that identifies the ticket.
+
+    Lowercases the scheme and host, treats ``http`` as ``https``, drops
+    ``www.``, default ports, trailing slashes, fragments and tracking
+    parameters, and sorts the remaining query parameters.
+
+    Returns:
+        str: The normalised URL, or ``""`` for a missing one.
+    """
+    url = (url or "").strip()
+    if not url:
+        return ""
+    parts = urlsplit(url if "//" in url else f"https://{url}")
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    scheme = "https" if parts.scheme.lower() in ("http", "https", "") else parts.scheme.lower()
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and str(port) != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not _TRACKING_PARAMS.match(name)
+    ))
+    return urlunsplit((scheme, host, parts.path.rstrip("/"), query, ""))
+
+
+def title_fingerprint(title: Optional[str]) -> str:
+    """Case-, accent-, punctuation- and whitespace-insensitive form of a title."""
+    decomposed = unicodedata.normalize("NFKD", title or "")
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return " ".join(_NON_WORD.sub(" ", stripped.casefold()).split())
+
+
+def item_key(item: MutableMapping[str, Any]) -> str:
+    """The de-duplication key of an item: normalised ticket URL plus title fingerprint."""
+    identity = f"{normalize_url(item.get('ticket_url'))}\x1f{title_fingerprint(item.get('title'))}"
+    return hashlib.blake2b(identity.encode("utf-8"), digest_size=12).hexdigest()
+
+
+def _merge(kept: MutableMapping[str, Any], duplicate: MutableMapping[str, Any]) -> None:
+    customers = [c.strip() for c in str(kept.get("customer") or "").split(",") if c.strip()]
+    for customer in str(duplicate.get("customer") or "").split(","):
+        if customer.strip() and customer.strip().casefold() not in {c.casefold() for c in customers}:
+            customers.append(customer.strip())
+    kept["customer"] = ", ".join(customers)
+    for key in ("summary", "domain", "ticket_url"):
+        if not kept.get(key) and duplicate.get(key):
+            kept[key] = duplicate[key]
+
+
+@dataclass
+class DedupReport:
+    """What de-duplication did to an edition.
+
+    Attributes:
+        merged: Repeats within the edition merged into an earlier item.
+        flagged: Items left out because an earlier edition already published
+            them, each with the ``previous_publish_date`` it appeared in.
+    """
+
+    merged: int = 0
+    flagged: List[Dict[str, Any]] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        return f"{self.merged} duplicate(s) merged, {len(self.flagged)} item(s) from earlier editions flagged"
+
+
+class EditionIndex:
+    """Hash index of the items collated so far in one edition."""
+
+    def __init__(self):
+        self._items: Dict[str, MutableMapping[str, Any]] = {}
+        self.merged = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def add(self, item: MutableMapping[str, Any]) -> bool:
+        """Index ``item``; if it repeats an indexed item, merge it into that one.
+
+        Returns:
+            bool: ``True`` if the item is new and should be added to the edition.
+        """
+        key = item_key(item)
+        kept = self._items.get(key)
+        if kept is None:
+            self._items[key] = item
+            return True
+        _merge(kept, item)
+        self.merged += 1
+        return False
+
+    def keys(self) -> List[str]:
+        return list(self._items)
+
+    def get(self, key: str) -> Optional[MutableMapping[str, Any]]:
+        return self._items.get(key)
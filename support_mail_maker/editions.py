@@ -0,0 +1,237 @@
+"""HTTP API for pressing editions without the Gradio UI.
+
+``POST /editions`` takes the content as the request body — CSV, JSON or
+JSON Lines, picked by ``Content-Type`` (or ``?format=``), optionally gzip or
+zstd ``Content-Encoding`` — and queues a press on the shared job queue.
+The body is streamed to a temporary file as it arrives, then read by the
+same ingest readers as an upload, so neither the upload nor the queue wait
+holds the content in memory.
+
+``GET /editions/{id}`` reports the press job and, once it has finished, the
+artifacts it produced, downloadable from ``/artifacts``.  Job records are read
+from the shared state store, so any worker can answer.
+
+With ``?stream=true`` the response is the edition's HTML itself, sent with
+chunked transfer encoding a section at a time as it renders.  Streamed
+editions are not published: no artifacts are kept and nothing is archived.
+"""
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional
+import asyncio
+import os
+import tempfile
+
+import aiofiles
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from loguru import logger
+
+from formatter import Formatter
+from ingest import iter_upload_rows
+from jobs import Job, QueueFullError, get_job_queue
+
+ROUTE_PREFIX = "/editions"
+
+# Largest accepted request body; ``SUPPORTMAIL_API_MAX_BYTES`` overrides it.
+DEFAULT_MAX_BODY_BYTES = 64 * 1024 * 1024
+
+# Content type → the file suffix whose ingest reader parses it.
+CONTENT_TYPE_SUFFIXES = {
+    "text/csv": ".csv",
+    "application/csv": ".csv",
+    "application/json": ".json",
+    "application/x-ndjson": ".jsonl",
+    "application/jsonl": ".jsonl",
+    "application/x-jsonlines": ".jsonl",
+}
+FORMAT_SUFFIXES = {"csv": ".csv", "json": ".json", "jsonl": ".jsonl", "ndjson": ".jsonl"}
+ENCODING_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+# Seconds a client should wait before retrying when the press queue is full.
+RETRY_AFTER_SECONDS = 5
+
+# Rendered sections a streamed edition may get ahead of its client.
+STREAM_BUFFER_SECTIONS = 2
+
+_END = object()
+
+router = APIRouter(prefix=ROUTE_PREFIX)
+
+
+def _max_body_bytes() -> int:
+    return int(os.environ.get("SUPPORTMAIL_API_MAX_BYTES", DEFAULT_MAX_BODY_BYTES))
+
+
+def upload_suffix(content_type: Optional[str], content_encoding: Optional[str], format: Optional[str] = None) -> str:
+    """The upload file suffix for a request body, e.g. ``.csv.gz``.
+
+    Raises:
+        HTTPException: 415 for an unsupported format or encoding.
+    """
+    if format:
+        suffix = FORMAT_SUFFIXES.get(format.lower())
+    else:
+        suffix = CONTENT_TYPE_SUFFIXES.get((content_type or "").split(";")[0].strip().lower())
+    if suffix is None:
+        raise HTTPException(415, f"Unsupported content type: {format or content_type}; send CSV, JSON or JSON Lines")
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding != "identity":
+        if encoding not in ENCODING_SUFFIXES:
+            raise HTTPException(415, f"Unsupported content encoding: {encoding}")
+        suffix += ENCODING_SUFFIXES[encoding]
+    return suffix
+
+
+async def spool_body(request: Request, suffix: str) -> str:
+    """Write the request body to a temporary file as it arrives and return its path.
+
+    Raises:
+        HTTPException: 413 if the body exceeds ``SUPPORTMAIL_API_MAX_BYTES``,
+            400 if it is empty.
+    """
+    limit = _max_body_bytes()
+    fd, path = tempfile.mkstemp(prefix="supportmail_edition_", suffix=suffix)
+    os.close(fd)
+    size = 0
+    try:
+        async with aiofiles.open(path, "wb") as output:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > limit:
+                    raise HTTPException(413, f"Request body exceeds {limit} bytes")
+                await output.write(chunk)
+        if size == 0:
+            raise HTTPException(400, "Request body is empty")
+    except BaseException:
+        os.unlink(path)
+        raise
+    return path
+
+
+def _edition_for(path: str, publish_date: Optional[str]) -> Formatter:
+    try:
+        edition = Formatter(publish_date=publish_date or datetime.now().strftime("%Y-%m-%d"))
+    except ValueError:
+        raise HTTPException(422, "publish_date must be YYYY-MM-DD")
+    edition.set_raw_content(iter_upload_rows(path))
+    return edition
+
+
+async def press_edition(edition: Formatter) -> Formatter:
+    """Run one press job: validate and publish ``edition``.
+
+    Shared by the UI and this API; submit it with
+    ``summarize=Formatter.publication_summary``.
+
+    Raises:
+        RuntimeError: If the content did not validate or publishing failed.
+    """
+    try:
+        # send_to_press_async publishes once validation passes.
+        published = await edition.send_to_press_async()
+    except ValueError as e:
+        logger.error("Invalid Content File Uploaded. Resetting Press...Please Try Again")
+        raise RuntimeError("Invalid content file uploaded.") from e
+    if not published or not edition.artifacts:
+        raise RuntimeError("Content is not ready for publishing; see the press log.")
+    return edition
+
+
+async def _press(edition: Formatter, path: str) -> Formatter:
+    try:
+        return await press_edition(edition)
+    finally:
+        os.unlink(path)
+
+
+async def _press_streaming(edition: Formatter, path: str, chunks: asyncio.Queue) -> None:
+    cancelled = False
+    try:
+        if not await edition.ready_to_press_async():
+            raise RuntimeError("Content is not ready for publishing; see the press log.")
+        sections = edition.iter_html()
+        # Each section renders in a worker thread, and rendering waits while
+        # the client is STREAM_BUFFER_SECTIONS behind.
+        while (chunk := await asyncio.to_thread(next, sections, None)) is not None:
+            await chunks.put(chunk)
+    except asyncio.CancelledError:
+        # The client has gone, so nobody is reading the queue.
+        cancelled = True
+        raise
+    finally:
+        os.unlink(path)
+        if not cancelled:
+            await chunks.put(_END)
+
+
+async def _submit(func, path: str, summarize=None) -> Job:
+    try:
+        return await get_job_queue().submit(func, name="api press", summarize=summarize)
+    except QueueFullError as e:
+        os.unlink(path)
+        raise HTTPException(503, str(e), headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+
+
+def describe_edition(record: Dict[str, Any]) -> Dict[str, Any]:
+    """A press job's record for API clients: its state plus, once published,
+    the edition's publish date, artifacts and de-duplication counts."""
+    description = {key: value for key, value in record.items() if key != "result"}
+    result = record.get("result") or {}
+    description.update({key: value for key, value in result.items() if key not in ("links_html", "paths")})
+    return description
+
+
+@router.post("")
+async def create_edition(request: Request, publish_date: Optional[str] = None, format: Optional[str] = None,
+                         stream: bool = False):
+    """Press an edition from the request body.
+
+    Returns 202 with the job's location, or with ``stream=true`` the HTML
+    itself as it renders.
+    """
+    suffix = upload_suffix(request.headers.get("content-type"), request.headers.get("content-encoding"), format)
+    path = await spool_body(request, suffix)
+    try:
+        edition = _edition_for(path, publish_date)
+    except BaseException:
+        os.unlink(path)
+        raise
+
+    if not stream:
+        job = await _submit(lambda: _press(edition, path), path, summarize=Formatter.publication_summary)
+        logger.info(f"API press job {job.id} queued")
+        return JSONResponse(
+            describe_edition(job.to_dict()), status_code=202, headers={"Location": f"{ROUTE_PREFIX}/{job.id}"}
+        )
+
+    chunks: asyncio.Queue = asyncio.Queue(maxsize=STREAM_BUFFER_SECTIONS)
+    job = await _submit(lambda: _press_streaming(edition, path, chunks), path)
+    logger.info(f"API streaming press job {job.id} queued")
+    first = await chunks.get()
+    if first is _END:
+        await job.wait()
+        raise HTTPException(422, job.error or "Content is not ready for publishing")
+
+    async def body() -> AsyncIterator[str]:
+        chunk = first
+        try:
+            while chunk is not _END:
+                yield chunk
+                chunk = await chunks.get()
+        finally:
+            if chunk is not _END:
+                # The response was closed early; stop rendering for it.
+                job.cancel()
+
+    return StreamingResponse(
+        body(), media_type="text/html; charset=utf-8", headers={"X-Edition-Job": job.id}
+    )
+
+
+@router.get("/{job_id}")
+async def get_edition(job_id: str):
+    """Report a press job and the artifacts of the edition it published."""
+    record = await get_job_queue().lookup(job_id)
+    if record is None:
+        raise HTTPException(404, "Unknown or expired edition job")
+    return describe_edition(record)
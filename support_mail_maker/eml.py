@@ -0,0 +1,117 @@
+"""Ready-to-send ``.eml`` output for a pressed edition.
+
+Builds a MIME message — ``multipart/alternative`` with the Markdown as the
+plain-text part and the HTML, plus its header images as inline
+``multipart/related`` parts — that opens in a mail client as a draft.
+
+The message is produced as a stream of byte chunks.  Only the top-level
+headers go through ``email.message``, which would otherwise hold the whole
+encoded message in memory: each body is encoded in bounded slices as it is
+written, and the images are the pre-encoded parts cached by :mod:`assets`.
+"""
+from datetime import datetime
+from email import policy
+from email.message import EmailMessage
+from email.utils import format_datetime, make_msgid
+from typing import Iterable, Iterator, List, Optional
+import base64
+import os
+import uuid
+
+from assets import Asset
+
+# Characters encoded per slice; a multiple of 57 so that, for ASCII text,
+# each slice becomes whole 76-character base64 lines.
+_SLICE_CHARS = 57 * 1024
+
+# Raw bytes per base64 line (76 encoded characters, RFC 2045).
+_LINE_BYTES = 57
+
+
+def _base64_lines(text: str) -> Iterator[bytes]:
+    """Encode ``text`` as UTF-8 base64 in 76-character CRLF lines, slice by slice."""
+    carry = b""
+    for start in range(0, len(text), _SLICE_CHARS):
+        data = carry + text[start:start + _SLICE_CHARS].encode("utf-8")
+        whole = len(data) - len(data) % _LINE_BYTES
+        carry = data[whole:]
+        if whole:
+            yield base64.encodebytes(data[:whole]).replace(b"\n", b"\r\n")
+    if carry:
+        yield base64.encodebytes(carry).replace(b"\n", b"\r\n")
+
+
+def _text_part(content_type: str, text: str) -> Iterator[bytes]:
+    yield (
+        f"Content-Type: {content_type}; charset=\"utf-8\"\r\n"
+        "Content-Transfer-Encoding: base64\r\n"
+        "\r\n"
+    ).encode("ascii")
+    yield from _base64_lines(text)
+
+
+def _headers(**fields: Optional[str]) -> bytes:
+    """Fold and encode top-level headers (addresses, non-ASCII subjects) per RFC 5322."""
+    headers = EmailMessage(policy=policy.SMTP)
+    for name, value in fields.items():
+        if value:
+            headers[name.replace("_", "-")] = value
+    return b"".join(policy.SMTP.fold_binary(name, value) for name, value in headers.items())
+
+
+def iter_eml(
+    html: str,
+    text: str,
+    assets: Iterable[Asset] = (),
+    subject: str = "SupportMail",
+    sender: Optional[str] = None,
+    recipients: Optional[str] = None,
+    date: Optional[datetime] = None,
+) -> Iterator[bytes]:
+    """Yield a complete RFC 5322 message as byte chunks.
+
+    Args:
+        html: The edition HTML; images it references as ``cid:`` must be in
+            ``assets`` (see :meth:`assets.AssetStore.embed`).
+        text: The plain-text alternative (the edition's Markdown).
+        assets: Images to attach as inline ``multipart/related`` parts.
+        subject: The message subject.
+        sender: ``From`` address; defaults to ``SUPPORTMAIL_EML_FROM`` if set.
+        recipients: ``To`` addresses; defaults to ``SUPPORTMAIL_EML_TO`` if set.
+        date: The ``Date`` header; defaults to now.
+
+    Yields:
+        bytes: Consecutive chunks of the message, with CRLF line endings.
+    """
+    sender = sender or os.environ.get("SUPPORTMAIL_EML_FROM")
+    recipients = recipients or os.environ.get("SUPPORTMAIL_EML_TO")
+    alternative = f"=_alt_{uuid.uuid4().hex}"
+    related = f"=_rel_{uuid.uuid4().hex}"
+    assets: List[Asset] = list(assets)
+
+    yield _headers(
+        MIME_Version="1.0",
+        Date=format_datetime((date or datetime.now()).astimezone()),
+        Message_ID=make_msgid(domain="supportmail"),
+        From=sender,
+        To=recipients,
+        Subject=subject,
+        # Opens as an editable draft in Outlook and Apple Mail.
+        X_Unsent="1",
+    )
+    yield f'Content-Type: multipart/alternative; boundary="{alternative}"\r\n\r\n'.encode("ascii")
+
+    yield f"--{alternative}\r\n".encode("ascii")
+    yield from _text_part("text/plain", text)
+
+    yield f"--{alternative}\r\n".encode("ascii")
+    if assets:
+        yield f'Content-Type: multipart/related; boundary="{related}"; type="text/html"\r\n\r\n'.encode("ascii")
+        yield f"--{related}\r\n".encode("ascii")
+    yield from _text_part("text/html", html)
+    if assets:
+        for asset in assets:
+            yield f"--{related}\r\n".encode("ascii")
+            yield asset.mime_part
+        yield f"--{related}--\r\n".encode("ascii")
+    yield f"--{alternative}--\r\n".encode("ascii")
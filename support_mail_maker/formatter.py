@@ -1,47 +1,94 @@
-from django.template.loader import render_to_string
-from typing import Union, Dict, Any, List, TextIO
+from typing import Union, Dict, Any, Iterable, Iterator, List, Optional, TextIO, Tuple
 from datetime import datetime
+from html import escape
+import asyncio
 import csv
 import pathlib
 import json
+import re
 import os
 import gradio as gr
 from jsonschema import ValidationError
 from utils import valid_JSON_input
 from tqdm import tqdm
 import enum
-from markdownify import markdownify as md
+from markdownify import MarkdownConverter, markdownify as md
+from bs4 import BeautifulSoup
+from inliner import inline_css
+from assets import embed_images as embed_bundled_images
+from eml import iter_eml
+from artifacts import Artifact, ArtifactStore, get_artifact_store, render_download_links
+from storage import StorageBackend, get_storage_backend, local_path
+from archive import EditionArchive, get_archive
+from dedup import DEDUP_MODES, DedupReport, EditionIndex
+from renderers import Renderer, get_renderer, submit_renders
+from sanitizer import sanitize_html
 import aiofiles
 from loguru import logger
-import django
-from django.conf import settings
-
-_default_template_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
-settings.configure(
-    TEMPLATES=[
-        {
-            "BACKEND": "django.template.backends.django.DjangoTemplates",
-            "DIRS": [os.environ.get('SUPPORTMAIL_HTML_TEMPLATE', _default_template_dir)],  # Template directory
-            "APP_DIRS": False,  # Optimization: Set to False if not using app-level templates
-            "OPTIONS": {
-                "context_processors": [
-                    "django.template.context_processors.debug",
-                    "django.template.context_processors.request",
-                    "django.contrib.auth.context_processors.auth",
-                    "django.contrib.messages.context_processors.messages",
-                ],
-                # Optimization: Use cached template loader if available
-                'loaders': [
-                    ('django.template.loaders.cached.Loader', [
-                        'django.template.loaders.filesystem.Loader',
-                        'django.template.loaders.app_directories.Loader',
-                    ]),
-                ],
-            },
-        },
-    ]
-)
-django.setup()
+
+
+# Gmail clips messages larger than this ("[Message clipped]").
+GMAIL_CLIP_BYTES = 102 * 1024
+
+# Content sections in the order they appear in an edition; each has a
+# ``templates/sections/<key>.html`` partial.
+SECTION_KEYS = ("issues", "oops", "wins", "news")
+
+# Stands in for the sections when the surrounding document is rendered.
+_SECTIONS_SENTINEL = "<!--supportmail:sections-->"
+
+
+# A converted chunk's leading newlines, content and trailing newlines.
+_MARKDOWN_NEWLINES = re.compile(r"^(\n*)((?:.*[^\n])?)(\n*)$", re.DOTALL)
+
+
+def _byte_size(html: str) -> int:
+    return len(html.encode("utf-8"))
+
+
+def iter_markdown(html_chunks: Iterable[str]) -> Iterator[str]:
+    """Convert consecutive fragments of a document to Markdown, one at a time.
+
+    Each fragment is converted on its own; the newlines where two fragments
+    meet are collapsed the way markdownify collapses them between sibling
+    elements, and the document is stripped at both ends, so the chunks join
+    to exactly ``md("".join(html_chunks))`` for fragments that split the
+    document between top-level blocks (as :meth:`Formatter.iter_html` does).
+
+    Args:
+        html_chunks (Iterable[str]): Consecutive fragments of the HTML.
+
+    Yields:
+        str: Consecutive chunks of the Markdown.
+    """
+    converter = MarkdownConverter(strip_document=None)
+    started = False
+    held = ""  # whitespace ending the last content, dropped if the document ends there
+    newlines = 0  # newlines after it, still to be collapsed with the next chunk's
+    for chunk in html_chunks:
+        soup = BeautifulSoup(chunk, **converter.options["bs4_options"])
+        leading, content, trailing = _MARKDOWN_NEWLINES.match(converter.convert_soup(soup)).groups()
+        # Free the parse tree now: its reference cycles would otherwise keep
+        # every section's tree alive until the next garbage collection.
+        # (Decomposing the soup itself leaves its children linked.)
+        for node in list(soup.contents):
+            node.decompose()
+        if not content.strip():
+            newlines = _collapse_newlines(newlines, len(leading) + len(trailing))
+            continue
+        text = content.rstrip()
+        if started:
+            yield held + "\n" * _collapse_newlines(newlines, len(leading)) + text
+        else:
+            yield text.lstrip()
+            started = True
+        held = content[len(text):]
+        newlines = len(trailing)
+
+
+def _collapse_newlines(before: int, after: int) -> int:
+    # markdownify keeps the larger run, at most two, where two blocks meet.
+    return min(2, max(before, after)) if before and after else before + after
 
 
 class ItemType(enum.Enum):
@@ -137,9 +184,99 @@ class Formatter:
     """Formatter class for managing and publishing support mail content.
 
     This class handles content collation, formatting, and publishing, providing methods for adding items, setting content data, and generating output files.
+
+    Args:
+        publish_date (str): The edition's publish date, as ``YYYY-MM-DD``.
+        inline_styles (bool, optional): Copy the template's CSS onto element ``style``
+            attributes after rendering, for mail clients that strip ``<style>``.
+            Defaults to the ``SUPPORTMAIL_INLINE_CSS`` environment variable (off).
+        embed_images (bool, optional): Replace hot-linked CDN images with the bundled,
+            optimised copies as ``data:`` URIs so the HTML renders offline.
+            Defaults to the ``SUPPORTMAIL_EMBED_IMAGES`` environment variable (off).
+        emit_eml (bool, optional): Also write a ready-to-send ``.eml`` draft with the
+            images attached inline.  Defaults to the ``SUPPORTMAIL_EML`` environment
+            variable (off).
+        size_budget (int, optional): Maximum size in bytes of one rendered HTML
+            document (``GMAIL_CLIP_BYTES`` keeps editions under Gmail's clipping
+            limit).  Defaults to the ``SUPPORTMAIL_SIZE_BUDGET`` environment
+            variable; unset means no limit.
+        overflow (str, optional): What to do with an edition over budget:
+            ``"split"`` it into numbered parts, or move the overflow items to a
+            linked ``"appendix"``.  Defaults to ``SUPPORTMAIL_OVERFLOW`` or ``"split"``.
+        storage (StorageBackend | str, optional): Where artifacts are persisted, as a
+            backend or its name (``"local"`` for the working directory, ``"s3"``).
+            Artifacts are always kept in the in-memory artifact store and served
+            from there.  Defaults to the ``SUPPORTMAIL_STORAGE`` environment
+            variable; unset means they are not persisted.
+        archive (EditionArchive | str, optional): Where published editions' items are
+            archived for search, as an archive or a database path.  Defaults to
+            ``SUPPORTMAIL_ARCHIVE``; unset means editions are not archived.
+        dedup (str, optional): How repeated items are handled: ``"edition"`` merges
+            repeats within the edition, ``"archive"`` also leaves out items already
+            published in an earlier month's archived edition, ``"off"`` keeps
+            everything.  Defaults to ``SUPPORTMAIL_DEDUP`` or ``"edition"``.
+        renderer (Renderer | str, optional): The template engine, as a renderer or
+            its name (``"django"`` or ``"jinja2"``).  Defaults to
+            ``SUPPORTMAIL_RENDERER`` or ``"django"``.
+        stream_render (bool, optional): Publish the edition a section at a time,
+            straight into its HTML and Markdown artifacts, so it is never held
+            whole.  Only applies without a size budget, CSS inlining, image
+            embedding or ``.eml`` drafts, which need the whole document.
+            Defaults to ``SUPPORTMAIL_STREAM_RENDER`` or ``True``.
+        render_workers (int, optional): Processes that render the sections of an
+            edition concurrently; 0 or 1 renders them one after another.  Defaults to
+            ``SUPPORTMAIL_RENDER_WORKERS`` or 0.
+        include_markdown (bool, optional): Whether each document is also published
+            as Markdown.  Defaults to ``True``.
     """
-    def __init__(self, publish_date: str):
+    def __init__(self, publish_date: str, inline_styles: Optional[bool] = None, embed_images: Optional[bool] = None,
+                 emit_eml: Optional[bool] = None, size_budget: Optional[int] = None, overflow: Optional[str] = None,
+                 storage: Optional[Union[StorageBackend, str]] = None,
+                 archive: Optional[Union[EditionArchive, str]] = None, dedup: Optional[str] = None,
+                 renderer: Optional[Union[Renderer, str]] = None, stream_render: Optional[bool] = None,
+                 render_workers: Optional[int] = None, include_markdown: bool = True):
         self.publish_date = datetime.strptime(publish_date, "%Y-%m-%d")
+        if inline_styles is None:
+            inline_styles = os.environ.get("SUPPORTMAIL_INLINE_CSS", "False").lower() == "true"
+        if embed_images is None:
+            embed_images = os.environ.get("SUPPORTMAIL_EMBED_IMAGES", "False").lower() == "true"
+        self.inline_styles: bool = inline_styles
+        if emit_eml is None:
+            emit_eml = os.environ.get("SUPPORTMAIL_EML", "False").lower() == "true"
+        if size_budget is None and os.environ.get("SUPPORTMAIL_SIZE_BUDGET"):
+            size_budget = int(os.environ["SUPPORTMAIL_SIZE_BUDGET"])
+        overflow = overflow or os.environ.get("SUPPORTMAIL_OVERFLOW", "split")
+        if overflow not in ("split", "appendix"):
+            raise ValueError(f"Unknown overflow mode: {overflow}")
+        self.embed_images: bool = embed_images
+        self.emit_eml: bool = emit_eml
+        self.size_budget: Optional[int] = size_budget
+        self.overflow: str = overflow
+        if storage is None or isinstance(storage, str):
+            storage = get_storage_backend(storage or os.environ.get("SUPPORTMAIL_STORAGE"))
+        self.storage: Optional[StorageBackend] = storage
+        if archive is None or isinstance(archive, str):
+            archive = get_archive(archive)
+        self.archive: Optional[EditionArchive] = archive
+        dedup = dedup or os.environ.get("SUPPORTMAIL_DEDUP", "edition")
+        if dedup not in DEDUP_MODES:
+            raise ValueError(f"Unknown dedup mode: {dedup}")
+        self.dedup: str = dedup
+        if renderer is None or isinstance(renderer, str):
+            renderer = get_renderer(renderer)
+        self.renderer: Renderer = renderer
+        if stream_render is None:
+            stream_render = os.environ.get("SUPPORTMAIL_STREAM_RENDER", "True").lower() == "true"
+        self.stream_render: bool = stream_render
+        if render_workers is None:
+            render_workers = int(os.environ.get("SUPPORTMAIL_RENDER_WORKERS", "0"))
+        self.render_workers: int = render_workers
+        self.include_markdown: bool = include_markdown
+        self.dedup_report = DedupReport()
+        # Artifacts of the latest publish, their storage URLs, and the UI update it produced.
+        self.artifacts: List[Artifact] = []
+        self.artifact_urls: List[Optional[str]] = []
+        self.published: Optional[List[Any]] = None
 
         # Edition month is one calendar month before the publish date.
         # day=1 avoids overflow (e.g. March 31 → no Feb 31).
@@ -154,7 +291,7 @@ class Formatter:
 
         self.html: str = ""
         self.markdown: str = ""
-        self.content_data: Union[str, Dict[str, Any]] = {}
+        self.content_data: Union[str, Dict[str, Any], Iterable[Dict[str, Any]]] = {}
         self.context: Dict[str, Any] = {
             "publish_date": self.publish_date,
             "edition_month": edition_month_dt,
@@ -208,30 +345,19 @@ class Formatter:
             None
         """
         try:
-            for item in tqdm(self.content_data):
-                if item.get("include") is True:
-                    classed_item = Item(
-                        title=item['title'],
-                        domain=item['topic_domain'],
-                        summary=item['summary'],
-                        customer=item['customer'],
-                        item_type=item['type'],
-                        ticket_url=item['url'],
-                    )
-                    match classed_item['item_type']:
-                        case ItemType.ISSUE:
-                            self.add_item("issues", classed_item)
-                        case ItemType.WIN:
-                            self.add_item("wins", classed_item)
-                        case ItemType.Oops:
-                            self.add_item("oops", classed_item)
-                        case ItemType.News:
-                            self.add_item("news", classed_item)
-                        case _:
-                            logger.error(
-                                f"Error: Unable to collate content due to item {classed_item}"
-                            )
-            logger.success(f"Completed collating content out of the {len(self.content_data)} items submitted, there are {len(self.get_items('issues'))} issue item(s)")
+            # Repeats are merged as they arrive, keyed by ticket URL and title.
+            index = EditionIndex() if self.dedup != "off" else None
+            # Reading a large upload and collating it is CPU-bound; keep it off the event loop.
+            submitted = await asyncio.to_thread(self._collate_rows, index)
+            self.dedup_report = DedupReport(merged=index.merged if index is not None else 0)
+            # The Trends block is rendered unescaped, so keep only allow-listed markup.
+            content = self.context["content"]
+            content["trend_html"] = sanitize_html(content.get("trend_html") or "")
+            if index is not None and self.dedup == "archive" and self.archive is not None:
+                await self._flag_prior_items(index)
+            if self.dedup != "off":
+                logger.success(f"De-duplication: {self.dedup_report}")
+            logger.success(f"Completed collating content out of the {submitted} items submitted, there are {len(self.get_items('issues'))} issue item(s)")
             logger.success(f"{len(self.get_items('wins'))} win item(s)")
             logger.success(f"{len(self.get_items('oops'))} oops item(s)")
             logger.success(f"{len(self.get_items('news'))} news item(s)")
@@ -239,6 +365,94 @@ class Formatter:
         except Exception as e:
             logger.error(f'Unable to Collate content: {str(e)}')
 
+    def _collate_rows(self, index: Optional[EditionIndex]) -> int:
+        """Sort the included rows of ``content_data`` into their sections.
+
+        Returns:
+            int: How many rows were read.
+        """
+        # content_data may be a lazy row stream (e.g. from iter_json_rows),
+        # so count as we go rather than calling len() on it.
+        submitted = 0
+        for item in tqdm(self.content_data):
+            submitted += 1
+            if item.get("include") is True:
+                classed_item = Item(
+                    title=item['title'],
+                    domain=item['topic_domain'],
+                    summary=item['summary'],
+                    customer=item['customer'],
+                    item_type=item['type'],
+                    ticket_url=item['url'],
+                )
+                match classed_item['item_type']:
+                    case ItemType.ISSUE:
+                        section = "issues"
+                    case ItemType.WIN:
+                        section = "wins"
+                    case ItemType.Oops:
+                        section = "oops"
+                    case ItemType.News:
+                        section = "news"
+                    case _:
+                        logger.error(
+                            f"Error: Unable to collate content due to item {classed_item}"
+                        )
+                        continue
+                entry = classed_item.in_dict_format()
+                if index is None or index.add(entry):
+                    self.get_items(section).append(entry)
+        return submitted
+
+    async def _flag_prior_items(self, index: EditionIndex) -> None:
+        """Leave out items an earlier month's archived edition already published."""
+        try:
+            prior = await asyncio.to_thread(self.archive.find_prior, index.keys(), self.publish_date)
+        except Exception as e:
+            logger.error(f"Unable to check the archive for repeated items: {e}")
+            return
+        if not prior:
+            return
+        flagged_ids = set()
+        for key, previous_publish_date in prior.items():
+            item = index.get(key)
+            flagged_ids.add(id(item))
+            self.dedup_report.flagged.append({**item, "previous_publish_date": previous_publish_date})
+            logger.warning(f"Leaving out '{item['title']}': already published in the {previous_publish_date} edition")
+        for section in SECTION_KEYS:
+            self.context["content"][section] = [i for i in self.get_items(section) if id(i) not in flagged_ids]
+
+    async def ready_to_press_async(self) -> bool:
+        """Collate the content and validate the edition, without publishing it.
+
+        Returns:
+            bool: True if the edition can be rendered, otherwise False.
+        """
+        # 1) Check if a publish date is set
+        if self.context["publish_date"] is None:
+            return False
+        # 2) Properly await collate_content()
+        if not await self.collate_content():
+            return False
+        # 3) Validate the context JSON (serialize datetime for schema)
+        validation_context = {
+            **self.context,
+            "publish_date": self.context["publish_date"].strftime("%Y-%m-%d")
+            if isinstance(self.context["publish_date"], datetime)
+            else self.context["publish_date"],
+            "edition_month": self.context["edition_month"].strftime("%Y-%m-%d")
+            if isinstance(self.context["edition_month"], datetime)
+            else self.context["edition_month"],
+        }
+        try:
+            is_valid = await asyncio.to_thread(valid_JSON_input, validation_context)
+        except ValidationError as exc:
+            logger.warning("Validation failed for publish context: %s", str(exc))
+            return False
+        if not is_valid:
+            logger.error("Unable to Publish Due to Validation Failure")
+        return bool(is_valid)
+
     async def send_to_press_async(self) -> bool:
         """Determine if the content is ready for publishing.
 
@@ -248,38 +462,265 @@ class Formatter:
             bool: True if the content is ready for publishing, otherwise False.
         """
         try:
-            # 1) Check if a publish date is set
-            if self.context["publish_date"] is not None:
-                # 2) Properly await collate_content()
-                collate_ok = await self.collate_content()
-                if collate_ok:
-                    # 3) Validate the context JSON (serialize datetime for schema)
-                    validation_context = {
-                        **self.context,
-                        "publish_date": self.context["publish_date"].strftime("%Y-%m-%d")
-                        if isinstance(self.context["publish_date"], datetime)
-                        else self.context["publish_date"],
-                        "edition_month": self.context["edition_month"].strftime("%Y-%m-%d")
-                        if isinstance(self.context["edition_month"], datetime)
-                        else self.context["edition_month"],
-                    }
-                    try:
-                        is_valid = valid_JSON_input(validation_context)
-                    except ValidationError as exc:
-                        logger.warning("Validation failed for publish context: %s", str(exc))
-                        return False
-
-                    if is_valid:
-                        await self.publish_async()
-                        return True
-                    else:
-                        logger.error("Unable to Publish Due to Validation Failure")
-                        return False
+            if await self.ready_to_press_async():
+                self.published = await self.publish_async()
+                return True
             return False
         except Exception as e:
             logger.error(f"Unable to Publish due to General Press Error: {str(e)}")
             return False
 
+    def _render_context(self, **overrides) -> Dict[str, Any]:
+        return {**self.context, **overrides}
+
+    def render_section(self, section: str, items: Optional[List[Dict[str, Any]]] = None) -> str:
+        """Render one content section on its own.
+
+        Args:
+            section (str): One of ``SECTION_KEYS``.
+            items (list, optional): The items to render; defaults to all of the
+                section's collated items.
+
+        Returns:
+            str: The section's HTML, exactly as the full template would include it.
+        """
+        content = {**self.context["content"], section: self.get_items(section) if items is None else items}
+        return self.renderer.render(f"sections/{section}.html", self._render_context(content=content))
+
+    def render_shell(self) -> Tuple[str, str]:
+        """Render everything around the content sections, once.
+
+        Returns:
+            tuple: The HTML before and after the sections.
+        """
+        html = self.renderer.render("support_mail_template.html", self._render_context(rendered_sections=_SECTIONS_SENTINEL))
+        head, _, tail = html.partition(_SECTIONS_SENTINEL)
+        return head, tail
+
+    def iter_html(self) -> Iterator[str]:
+        """Render the edition a section at a time.
+
+        Yields the document head, each content section and the tail as soon as
+        each is rendered, so a caller can send the edition on while the rest
+        renders.  No size budget, CSS inlining or image embedding is applied:
+        those need the whole document.
+
+        With :attr:`renders_in_parallel`, the surrounding document and the
+        sections are rendered concurrently in worker processes instead, and
+        yielded in order as they finish.
+
+        Yields:
+            str: Consecutive fragments of the edition's HTML.
+        """
+        if self.renders_in_parallel:
+            yield from self._iter_html_parallel()
+            return
+        head, tail = self.render_shell()
+        yield head
+        for section in SECTION_KEYS:
+            yield self.render_section(section)
+        yield tail
+
+    @property
+    def renders_in_parallel(self) -> bool:
+        """Whether the sections are rendered concurrently in worker processes.
+
+        Only with ``render_workers`` set, and only with a shared renderer,
+        which the workers can load by name.
+        """
+        return self.render_workers > 1 and self.renderer is get_renderer(self.renderer.name)
+
+    def _iter_html_parallel(self) -> Iterator[str]:
+        # Each worker is sent only the items it renders; the other sections'
+        # lists are emptied, so the edition is not pickled five times over.
+        emptied = {section: [] for section in SECTION_KEYS}
+        content = {**self.context["content"], **emptied}
+        renders = [("support_mail_template.html", self._render_context(content=content,
+                                                                        rendered_sections=_SECTIONS_SENTINEL))]
+        renders.extend(
+            (f"sections/{section}.html", self._render_context(content={**content, section: self.get_items(section)}))
+            for section in SECTION_KEYS
+        )
+        shell, *sections = submit_renders(self.renderer, renders, self.render_workers)
+        head, _, tail = shell.result().partition(_SECTIONS_SENTINEL)
+        yield head
+        for section in sections:
+            yield section.result()
+        yield tail
+
+    def _fit_section(self, section: str, items: List[Dict[str, Any]], rendered: str, room: int) -> Tuple[str, int]:
+        """Render the longest leading run of ``items`` whose section fits in ``room`` bytes.
+
+        Starts from a proportional estimate based on ``rendered`` (all of
+        ``items``) and shrinks it until it fits, so only this section is
+        re-rendered, a handful of times at most.
+
+        Returns:
+            tuple: The rendered section and the number of items it holds (0 if
+            not even one item fits).
+        """
+        count = min(len(items), max(1, len(items) * room // max(_byte_size(rendered), 1)))
+        html = self.render_section(section, items[:count])
+        while _byte_size(html) > room and count > 1:
+            count = max(1, min(count - 1, count * room // _byte_size(html)))
+            html = self.render_section(section, items[:count])
+        if _byte_size(html) > room:
+            return "", 0
+        return html, count
+
+    def _split_parts(self, head: str, tail: str, sections: List[Tuple[str, str]], budget: int) -> List[Tuple[str, str]]:
+        label_room = _byte_size('<p class="part-label">Part 999 of 999</p>')
+        full_room = budget - _byte_size(head) - _byte_size(tail) - label_room
+        parts: List[List[str]] = [[]]
+        used = 0
+        for section, rendered in sections:
+            items = self.get_items(section)
+            while items:
+                if _byte_size(rendered) <= full_room - used:
+                    parts[-1].append(rendered)
+                    used += _byte_size(rendered)
+                    break
+                html, count = self._fit_section(section, items, rendered, full_room - used)
+                if count == 0:
+                    if parts[-1]:
+                        parts.append([])
+                        used = 0
+                        continue
+                    # A single item larger than a whole part: it gets a part of its own.
+                    logger.warning(f"An item in '{section}' alone exceeds the {budget}-byte budget")
+                    html, count = self.render_section(section, items[:1]), 1
+                parts[-1].append(html)
+                parts.append([])
+                used = 0
+                items = items[count:]
+                rendered = self.render_section(section, items) if items else ""
+        parts = [part for part in parts if part]
+        return [
+            (f"_part{number}", f'{head}<p class="part-label">Part {number} of {len(parts)}</p>{"".join(part)}{tail}')
+            for number, part in enumerate(parts, start=1)
+        ]
+
+    def _appendix_parts(self, head: str, tail: str, sections: List[Tuple[str, str]], budget: int,
+                        appendix_href: str) -> List[Tuple[str, str]]:
+        def note(count: int) -> str:
+            return (f'<p class="appendix-note">{count} more item(s) are in the '
+                    f'<a href="{escape(appendix_href)}">appendix</a>.</p>')
+
+        room = budget - _byte_size(head) - _byte_size(tail) - _byte_size(note(999_999))
+        kept: List[str] = []
+        overflow: List[Tuple[str, List[Dict[str, Any]]]] = []
+        for section, rendered in sections:
+            items = self.get_items(section)
+            if not items:
+                continue
+            if not overflow and _byte_size(rendered) <= room:
+                kept.append(rendered)
+                room -= _byte_size(rendered)
+                continue
+            count = 0
+            if not overflow:
+                html, count = self._fit_section(section, items, rendered, room)
+                if count:
+                    kept.append(html)
+            overflow.append((section, items[count:]))
+        moved = sum(len(items) for _, items in overflow)
+        main = f"{head}{''.join(kept)}{note(moved)}{tail}"
+        appendix = "".join(self.render_section(section, items) for section, items in overflow)
+        return [("", main), ("_appendix", f'{head}<p class="part-label">Appendix</p>{appendix}{tail}')]
+
+    def render_parts(self, appendix_href: str = "appendix.html") -> List[Tuple[str, str]]:
+        """Render the edition, splitting it if it exceeds ``size_budget``.
+
+        The surrounding document and each section are rendered once and
+        measured; an edition within budget is just their concatenation.  An
+        edition over budget is divided by re-rendering only the sections that
+        straddle a boundary — never the whole document per attempt.
+
+        The budget applies to the rendered HTML, before any CSS inlining or
+        image embedding, which both add to the size.
+
+        Args:
+            appendix_href (str, optional): Link to the appendix document, in
+                ``"appendix"`` overflow mode.
+
+        Returns:
+            list: ``(filename_suffix, html)`` per document: a single ``("", html)``
+            within budget, ``_part1``, ``_part2``, … when split, or the main
+            document plus ``_appendix``.
+        """
+        head, *rendered, tail = self.iter_html()
+        sections = list(zip(SECTION_KEYS, rendered))
+        sizes = {section: _byte_size(html) for section, html in sections}
+        total = _byte_size(head) + _byte_size(tail) + sum(sizes.values())
+        logger.info(f"Rendered edition is {total} bytes; sections: {sizes}")
+        if self.size_budget is None or total <= self.size_budget:
+            return [("", head + "".join(html for _, html in sections) + tail)]
+        logger.warning(f"Edition exceeds the {self.size_budget}-byte budget by {total - self.size_budget} bytes; "
+                       f"applying '{self.overflow}' overflow")
+        if self.overflow == "appendix":
+            return self._appendix_parts(head, tail, sections, self.size_budget, appendix_href)
+        return self._split_parts(head, tail, sections, self.size_budget)
+
+    @property
+    def streams_render(self) -> bool:
+        """Whether :meth:`publish_async` will render the edition a section at a time."""
+        return (self.stream_render and self.size_budget is None
+                and not (self.inline_styles or self.embed_images or self.emit_eml))
+
+    async def stream_to_store(self, store: ArtifactStore, filename: str) -> List[Artifact]:
+        """Render the edition into its HTML and Markdown artifacts a section at a time.
+
+        Each section is written to both artifacts as soon as it is rendered and
+        converted, so at most one section is held in memory — plus whatever
+        the store keeps before spooling to disk.
+
+        Args:
+            store (ArtifactStore): Where the artifacts are kept.
+            filename (str): The artifacts' name, without extension.
+
+        Returns:
+            list: The HTML artifact, and the Markdown one if ``include_markdown``.
+        """
+        writers = [store.open(f"{filename}.html")]
+        if self.include_markdown:
+            writers.append(store.open(f"{filename}.md"))
+
+        def html_chunks() -> Iterator[str]:
+            for chunk in self.iter_html():
+                writers[0].write(chunk)
+                yield chunk
+
+        chunks = iter_markdown(html_chunks()) if self.include_markdown else html_chunks()
+        try:
+            # Each section is rendered and converted in a worker thread, so
+            # other presses and requests run in the meantime.
+            while (chunk := await asyncio.to_thread(next, chunks, None)) is not None:
+                if self.include_markdown:
+                    writers[1].write(chunk)
+        except BaseException:
+            for writer in writers:
+                writer.discard()
+            raise
+        # Closing stores each artifact, and shares it with other workers.
+        artifacts = await asyncio.to_thread(lambda: [writer.close() for writer in writers])
+        logger.info(f"Streamed edition is {', '.join(f'{a.size} bytes of {a.name}' for a in artifacts)}")
+        return artifacts
+
+    def iter_jsonl_lines(self) -> Iterator[str]:
+        """Yield the collated items as JSON Lines, one item per line.
+
+        Each line is an item in ``Item.in_dict_format`` shape plus the edition's
+        ``publish_date``, in section order (``SECTION_KEYS``), so
+        downstream tools can consume an edition without re-parsing its HTML.
+
+        Yields:
+            str: A newline-terminated JSON object.
+        """
+        publish_date = self.publish_date.strftime("%Y-%m-%d")
+        for section in SECTION_KEYS:
+            for item in self.get_items(section):
+                yield json.dumps({"publish_date": publish_date, **item}, ensure_ascii=False) + "\n"
+
     def set_raw_content(self, data):
         """Assign raw content data for further processing.
 
@@ -300,15 +741,16 @@ class Formatter:
             logger.error(f"Unable to Set Raw Content {str(e)}")
 
     @staticmethod
-    async def save_to_file(filename: str, content: str, file_ext: str = "html") -> str:
+    async def save_to_file(filename: str, content: Union[str, Iterable[str]], file_ext: str = "html") -> str:
         """Save content to a file and return the file path.
 
         This method saves the given content to a file with the specified filename and extension,
-        and then returns the absolute file path.
+        and then returns the absolute file path. Content may also be an iterable of string
+        chunks, which are written one at a time as they are produced.
 
         Args:
             filename (str): The name of the file (without extension) to save.
-            content (str): The content to write into the file.
+            content (str | Iterable[str]): The content, or content chunks, to write into the file.
             file_ext (str, optional): The file extension. Defaults to 'html'.
 
         Returns:
@@ -317,44 +759,185 @@ class Formatter:
         file_path = os.path.join(pathlib.Path.cwd(), f"{filename}.{file_ext}")
         try:
             async with aiofiles.open(file_path, "w", encoding="utf-8") as output:
-                await output.write(content)
+                if isinstance(content, str):
+                    await output.write(content)
+                else:
+                    for chunk in content:
+                        await output.write(chunk)
             return file_path
         except Exception as e:
             logger.error(f"Failed to save file: {e}")
 
+    def iter_eml(self, html: str, markdown: str) -> Iterator[bytes]:
+        """Yield the edition as a ready-to-send ``.eml`` draft, chunk by chunk.
+
+        The hot-linked header images are swapped for ``cid:`` references to the
+        bundled copies, which are attached as inline parts.  The message is
+        produced as a stream, so it never exists in memory whole.
+
+        Args:
+            html (str): The rendered edition.
+            markdown (str): The plain-text alternative.
+
+        Returns:
+            Iterator[bytes]: Consecutive chunks of the message.
+        """
+        html, images = embed_bundled_images(html, mode="cid")
+        return iter_eml(
+            html=html,
+            text=markdown,
+            assets=images,
+            subject=f"SupportMail — {self.context['edition_month']:%B %Y}",
+        )
+
+    async def store_artifacts(self, artifacts: List[Artifact]) -> List[Optional[str]]:
+        """Persist artifacts with the storage backend and return their URLs.
+
+        Uploads run concurrently.  An artifact that fails to save is logged and
+        gets no URL; it can still be downloaded from the artifact store.
+
+        Args:
+            artifacts (List[Artifact]): Artifacts from the artifact store.
+
+        Returns:
+            List[Optional[str]]: ``file://`` or presigned URLs, in artifact order;
+            empty without a storage backend.
+        """
+        if self.storage is None:
+            return []
+        results = await asyncio.gather(*(self.storage.save(a) for a in artifacts), return_exceptions=True)
+        urls = []
+        for artifact, result in zip(artifacts, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to save {artifact.name} to {self.storage.name} storage: {result}")
+                result = None
+            urls.append(result)
+        return urls
+
+    async def archive_edition(self) -> int:
+        """Record the collated items in the edition archive, if archiving is on.
+
+        A failure is logged rather than raised: the edition itself has already
+        been published.
+
+        Returns:
+            int: The number of items archived.
+        """
+        if self.archive is None:
+            return 0
+        items = [item for section in SECTION_KEYS for item in self.get_items(section)]
+        try:
+            return await asyncio.to_thread(self.archive.record_edition, self.publish_date, items)
+        except Exception as e:
+            logger.error(f"Unable to archive the edition: {e}")
+            return 0
+
+    def publication_summary(self) -> Dict[str, Any]:
+        """Describe the latest publish as JSON, for job records any worker can read.
+
+        Returns:
+            dict: The publish date, each artifact's name, type, size, digest,
+            download link and storage URL, the de-duplication counts, the
+            download links as HTML, and the local paths of persisted files.
+        """
+        urls = list(self.artifact_urls) + [None] * (len(self.artifacts) - len(self.artifact_urls))
+        return {
+            "publish_date": self.publish_date.strftime("%Y-%m-%d"),
+            "artifacts": [
+                {
+                    "name": artifact.name,
+                    "media_type": artifact.media_type,
+                    "size": artifact.size,
+                    "sha256": artifact.sha256,
+                    "href": f"/{artifact.href}",
+                    "url": url,
+                }
+                for artifact, url in zip(self.artifacts, urls)
+            ],
+            "dedup": {"merged": self.dedup_report.merged, "flagged": len(self.dedup_report.flagged)},
+            "links_html": render_download_links(self.artifacts, self.artifact_urls),
+            "paths": [path for path in (local_path(url) for url in urls if url) if path],
+        }
+
+    def _store_part(self, store: ArtifactStore, filename: str, html: str) -> Tuple[List[Artifact], Optional[Artifact]]:
+        """Convert a rendered document to Markdown, finish its HTML and keep both in ``store``.
+
+        Args:
+            store (ArtifactStore): Where the artifacts are kept.
+            filename (str): The artifacts' name, without extension.
+            html (str): The rendered document.
+
+        Returns:
+            tuple: The HTML artifact and, with ``include_markdown``, the Markdown
+            one; and the ``.eml`` draft if one is made.
+        """
+        # The .eml draft uses the Markdown as its plain-text part.
+        markdown = md(html) if self.include_markdown or self.emit_eml else ""
+        # Inline after the Markdown conversion, which ignores styles anyway.
+        if self.inline_styles:
+            html = inline_css(html)
+        eml = store.put(f"{filename}.eml", self.iter_eml(html, markdown)) if self.emit_eml else None
+        if self.embed_images:
+            html, _ = embed_bundled_images(html)
+        stored = [store.put(f"{filename}.html", html)]
+        if self.include_markdown:
+            stored.append(store.put(f"{filename}.md", markdown))
+        return stored, eml
+
     async def publish_async(self):
         """Publishes the support mail content.
 
         This method renders the support mail content using the provided context,
-        converts it to Markdown, and returns it as a downloadable file.
+        converts it to Markdown, and keeps each artifact in the in-memory artifact
+        store, from which the UI's download links are served (already gzip/brotli
+        encoded).  With a ``storage`` backend they are also persisted, and the
+        URLs it returns are kept in ``artifact_urls``.
 
             Args:
                 self (Formatter): The Formatter instance.
 
             Returns:
-                list: A list containing the generated HTML and Markdown files.
+                list: Gradio updates for the download file, the download links and
+                the input fields.
 
         """
         try:
             edition = self.publish_date.strftime("%l")  
             publish_year = self.publish_date.strftime("%Y") 
             root_filename = f"{publish_year}_support_mail_{edition}"
-
-            # Render content (assuming render_to_string is async)
-            html = render_to_string("support_mail_template.html", self.context)
-            
-            # Convert to Markdown (assuming md is async—though often md() is sync)
-            markdown =  md(html)
-            
-            # 1) Await saving of files
-            html_path = await self.save_to_file(filename=root_filename, content=html)
-            markdown_path = await self.save_to_file(filename=root_filename, content=markdown, file_ext="md")
-
-            logger.success("HTML & Markdown Files Generated. Please Download them below ⬇️")
-
-            # 2) Return Gradio components referencing the saved files
+            store = get_artifact_store()
+
+            artifacts, emls = [], []
+            if self.streams_render:
+                # Written a section at a time; the edition is never held whole.
+                artifacts.extend(await self.stream_to_store(store, root_filename))
+                parts = []
+            else:
+                # Render content, split into parts if it is over the size budget.
+                # Rendering and the stages below are CPU-bound, so they run in
+                # worker threads and leave the event loop free for other requests.
+                parts = await asyncio.to_thread(self.render_parts, appendix_href=f"{root_filename}_appendix.html")
+
+            for suffix, html in parts:
+                # 1) Keep the artifacts in the store
+                stored, eml = await asyncio.to_thread(self._store_part, store, f"{root_filename}{suffix}", html)
+                artifacts.extend(stored)
+                if eml is not None:
+                    emls.append(eml)
+            artifacts.append(await asyncio.to_thread(store.put, f"{root_filename}.jsonl", self.iter_jsonl_lines()))
+            artifacts.extend(emls)
+            self.artifacts = artifacts
+
+            self.artifact_urls = await self.store_artifacts(artifacts)
+            await self.archive_edition()
+            paths = [path for path in (local_path(url) for url in self.artifact_urls if url) if path]
+
+            logger.success("HTML, Markdown & JSONL Files Generated. Please Download them below ⬇️")
+
+            # 2) Return Gradio components linking to the stored artifacts
             return [
-                gr.File(value=[html_path, markdown_path], visible=True),
+                gr.File(value=paths or None, visible=bool(paths)),
+                gr.HTML(value=render_download_links(artifacts, self.artifact_urls), visible=True),
                 gr.File(visible=False),
                 gr.Textbox(visible=False)
             ]
@@ -363,7 +946,8 @@ class Formatter:
             logger.error(f"Publishing failed: {e}")
             return [
                 gr.File(visible=False),
+                gr.HTML(visible=False),
                 gr.File(visible=False),
                 gr.Textbox(
                     value="Invalid Content File Uploaded. Resetting Press..."
-                )]
\ No newline at end of file
+                )]
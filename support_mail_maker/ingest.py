@@ -0,0 +1,866 @@
+from typing import Any, Callable, ContextManager, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union, IO
+import codecs
+import contextlib
+import csv
+import difflib
+import functools
+import gzip
+import io
+import itertools
+import json
+import mmap
+import os
+import pathlib
+import re
+import shutil
+import tempfile
+import zipfile
+from loguru import logger
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover - ijson is an optional accelerator
+    ijson = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - only needed for .zst uploads
+    zstandard = None
+
+try:
+    import openpyxl
+except ImportError:  # pragma: no cover - only needed for .xlsx uploads
+    openpyxl = None
+
+try:
+    import pyarrow
+    import pyarrow.compute
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - only needed for Parquet/Arrow uploads
+    pyarrow = None
+
+# ── CSV column-header → internal-key mapping ──────────────────────────────
+# Real-world CSV files arrive with varying header conventions (mixed case,
+# punctuation, abbreviations).  Each internal key maps to a **tuple of
+# accepted aliases** so that any reasonable header variant is recognised.
+# Matching is case-insensitive and strips leading/trailing whitespace.
+#
+# The schema-shaped item keys (``item_type``, ``domain``, ``ticket_url``) are
+# aliases too, so JSON editions normalise through the same table as CSVs.
+CSV_COLUMN_ALIASES: Dict[str, tuple] = {
+    "type": (
+        "section",
+        "type",
+        "ticket_type",
+        "item_type",
+    ),
+    "topic_domain": (
+        "topic_domain",
+        "topic/domain",
+        "domain",
+    ),
+    "title": (
+        "title",
+    ),
+    "customer": (
+        "customer",
+    ),
+    "summary": (
+        "summary",
+        "subject matter/summary",
+    ),
+    "url": (
+        "ticket_link",
+        "link",
+        "ticket_url",
+        "url",
+    ),
+    "include": (
+        "add_to_edition",
+        "add_to_edition?",
+        "include",
+    ),
+}
+
+# The built-in table; ``load_column_aliases`` layers a config file on top.
+_DEFAULT_COLUMN_ALIASES: Dict[str, tuple] = dict(CSV_COLUMN_ALIASES)
+
+# Extra aliases can be added without a deploy: point this variable at a JSON
+# file of ``{"<internal key>": ["alias", ...]}``.  It is re-read whenever its
+# modification time changes.
+COLUMN_ALIASES_ENV = "SUPPORTMAIL_COLUMN_ALIASES"
+
+# Distinct header rows remembered by ``resolve_header_plan``.  Real uploads
+# use a handful of exports, so a small cache is hit almost every time.
+HEADER_PLAN_CACHE_SIZE = 128
+
+# Minimum ``difflib`` similarity for a near-miss header to be accepted.
+_FUZZY_CUTOFF = 0.88
+
+# A known header plus one of these names a different column (``customer_id``,
+# ``title_url``), so such headers are never matched by approximation.
+_IDENTIFIER_SUFFIXES = ("id", "ids", "url", "link", "key", "code", "no", "number", "email")
+
+# Fast lookups, rebuilt in place whenever the alias table changes:
+# lowercased-alias → internal key, and punctuation-free alias → internal key.
+_ALIAS_LOOKUP: Dict[str, str] = {}
+_SQUASHED_LOOKUP: Dict[str, str] = {}
+
+_alias_config_mtime: Optional[Tuple[str, float]] = None
+
+
+def _squash(header: str) -> str:
+    """Reduce a header to lowercase letters and digits: ``Add to edition ?`` → ``addtoedition``."""
+    return re.sub(r"[\W_]+", "", header.lower())
+
+
+def _resolve_exact(header: Any) -> Optional[str]:
+    if header is None:
+        return None
+    header = str(header)
+    return _ALIAS_LOOKUP.get(header.lower().strip()) or _SQUASHED_LOOKUP.get(_squash(header))
+
+
+def _resolve_fuzzy(header: Any, claimed: set) -> Optional[str]:
+    squashed = _squash(str(header)) if header is not None else ""
+    if any(squashed.endswith(suffix) and squashed[:-len(suffix)] in _SQUASHED_LOOKUP for suffix in _IDENTIFIER_SUFFIXES):
+        return None
+    candidates = [alias for alias, key in _SQUASHED_LOOKUP.items() if key not in claimed]
+    close = difflib.get_close_matches(squashed, candidates, n=1, cutoff=_FUZZY_CUTOFF) if squashed else []
+    if not close:
+        return None
+    internal_key = _SQUASHED_LOOKUP[close[0]]
+    logger.info(f"Matched column header {header!r} to '{internal_key}' by approximation")
+    return internal_key
+
+
+@functools.lru_cache(maxsize=HEADER_PLAN_CACHE_SIZE)
+def resolve_header_plan(headers: Tuple[Any, ...]) -> Tuple[Optional[str], ...]:
+    """Map each column of a header row to its internal key.
+
+    Headers are matched against the alias table case-insensitively, then
+    with punctuation and spacing ignored (``Add to edition ?``).  Headers
+    still unmatched are compared by spelling against the aliases of internal
+    keys no other column claimed, unless they are a known header with an
+    identifier suffix (``customer_id``), which are always dropped.  The result is cached per distinct header row: the work,
+    fuzzy matching included, is done once per export format rather than per
+    upload or per row.
+
+    Args:
+        headers: The header row, as a tuple.
+
+    Returns:
+        A tuple of the same length holding the internal key for each column,
+        or ``None`` for columns that are dropped.
+    """
+    plan = [_resolve_exact(header) for header in headers]
+    claimed = set(plan)
+    for index, header in enumerate(headers):
+        if plan[index] is None:
+            plan[index] = _resolve_fuzzy(header, claimed)
+            claimed.add(plan[index])
+    return tuple(plan)
+
+
+def _rebuild_alias_lookup() -> None:
+    _ALIAS_LOOKUP.clear()
+    _SQUASHED_LOOKUP.clear()
+    for internal_key, aliases in CSV_COLUMN_ALIASES.items():
+        for alias in aliases:
+            _ALIAS_LOOKUP[alias.lower().strip()] = internal_key
+            _SQUASHED_LOOKUP.setdefault(_squash(alias), internal_key)
+    resolve_header_plan.cache_clear()
+
+
+def load_column_aliases(path: Optional[str] = None) -> Dict[str, tuple]:
+    """Rebuild the alias table from the built-in aliases plus a config file.
+
+    Args:
+        path: JSON file mapping internal keys to lists of extra aliases.
+            ``None`` restores the built-in table.
+
+    Returns:
+        The alias table now in effect.
+
+    Raises:
+        ValueError: If the file is not a mapping of known internal keys to
+            lists of strings.
+    """
+    table = {key: list(aliases) for key, aliases in _DEFAULT_COLUMN_ALIASES.items()}
+    if path is not None:
+        with open(path, "r", encoding="utf-8") as config:
+            extra = json.load(config)
+        if not isinstance(extra, dict):
+            raise ValueError(f"{path}: expected an object of internal key → aliases")
+        for internal_key, aliases in extra.items():
+            if internal_key not in table:
+                raise ValueError(f"{path}: unknown column '{internal_key}'")
+            if isinstance(aliases, str) or not all(isinstance(alias, str) for alias in aliases):
+                raise ValueError(f"{path}: aliases for '{internal_key}' must be a list of strings")
+            table[internal_key].extend(alias for alias in aliases if alias not in table[internal_key])
+    # Updated in place: other modules hold references to these tables.
+    CSV_COLUMN_ALIASES.update({key: tuple(aliases) for key, aliases in table.items()})
+    _rebuild_alias_lookup()
+    return CSV_COLUMN_ALIASES
+
+
+def refresh_column_aliases() -> None:
+    """Reload the alias config named by ``SUPPORTMAIL_COLUMN_ALIASES`` if it changed.
+
+    Cheap enough to call at the start of every upload: it is one ``stat``.
+    A missing or invalid file is logged and the current table kept, so a
+    bad edit cannot stop editions from being pressed.
+    """
+    global _alias_config_mtime
+    path = os.environ.get(COLUMN_ALIASES_ENV)
+    try:
+        state = (path, os.stat(path).st_mtime) if path else None
+    except OSError as e:
+        logger.error(f"Cannot read column alias config {path}: {e}")
+        return
+    if state == _alias_config_mtime:
+        return
+    try:
+        load_column_aliases(path)
+    except (OSError, ValueError) as e:
+        logger.error(f"Ignoring column alias config {path}: {e}")
+        return
+    _alias_config_mtime = state
+    if path:
+        logger.info(f"Loaded column aliases from {path}")
+
+
+_rebuild_alias_lookup()
+
+
+# Truthy string values accepted for the ``add_to_edition`` CSV column.
+_TRUTHY_STRINGS = frozenset({"true", "1", "yes", "✅"})
+
+# Section containers of a schema-shaped edition and the item type each holds.
+SECTION_ITEM_TYPES: Dict[str, str] = {
+    "issues": "Issue",
+    "oops": "Oops",
+    "wins": "Win",
+    "news": "News",
+}
+
+# ijson prefixes at which a row object starts: the elements of a top-level
+# array, or the elements of one of the ``content`` section arrays.
+_ROW_PREFIX = re.compile(r"^(?:item|content\.(issues|oops|wins|news)\.item)$")
+
+
+def _coerce_bool(value: Any) -> bool:
+    """Convert a CSV cell value to a Python bool.
+
+    Accepts ``True`` / ``False`` booleans as-is, and treats common
+    truthy strings (case-insensitive) — ``"true"``, ``"1"``, ``"yes"``,
+    ``"✅"`` — as ``True``.  Everything else is ``False``.
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return value.strip().lower() in _TRUTHY_STRINGS
+    return False
+
+
+def normalize_row(row: Dict[Any, Any]) -> Dict[str, Any]:
+    """Re-key a single row to the internal keys ``collate_content`` expects.
+
+    See ``normalize_csv_rows`` for the matching rules.
+
+    Args:
+        row: A mapping of source header → cell value.
+
+    Returns:
+        A new dict containing exactly the keys of ``CSV_COLUMN_ALIASES``.
+    """
+    new_row: Dict[str, Any] = {key: "" for key in CSV_COLUMN_ALIASES}
+    for internal_key, value in zip(resolve_header_plan(tuple(row)), row.values()):
+        if internal_key is not None:
+            new_row[internal_key] = value if value is not None else ""
+    # Coerce include from string → bool
+    new_row["include"] = _coerce_bool(new_row.get("include", ""))
+    return new_row
+
+
+def normalize_csv_rows(rows: list[dict]) -> list[dict]:
+    """Re-key each CSV row from upload-template headers to internal keys.
+
+    Header matching is **case-insensitive** and supports multiple aliases
+    per internal key (see ``CSV_COLUMN_ALIASES``); near-miss headers are
+    matched approximately (see ``resolve_header_plan``).  Unmapped columns
+    (e.g. ``owner``, ``notes``, ``client_number``) are silently dropped.
+    The ``include`` field is coerced to a Python ``bool`` so that
+    ``collate_content`` can use ``if item.get("include") is True``.
+
+    Args:
+        rows: A list of dicts produced by ``csv.DictReader``.
+
+    Returns:
+        A new list of dicts with normalised keys.
+    """
+    refresh_column_aliases()
+    return [normalize_row(row) for row in rows]
+
+
+def iter_normalized_rows(rows: Iterable[dict]) -> Iterator[dict]:
+    """Lazily normalise ``rows``; the streaming twin of ``normalize_csv_rows``."""
+    for row in rows:
+        yield normalize_row(row)
+
+
+def _normalize_json_object(section: Optional[str], obj: Any) -> Optional[Dict[str, Any]]:
+    """Normalise one JSON row object, filling in what a section implies.
+
+    Items inside a schema-shaped ``content.<section>`` array are approved by
+    definition, so they are included unless they say otherwise, and take
+    their type from the section when they do not carry one.
+    """
+    if not isinstance(obj, dict):
+        logger.warning(f"Skipping non-object JSON row: {obj!r}")
+        return None
+    row = normalize_row(obj)
+    if section is not None:
+        if "include" not in resolve_header_plan(tuple(obj)):
+            row["include"] = True
+        if not row["type"]:
+            row["type"] = SECTION_ITEM_TYPES[section]
+    return row
+
+
+class _Utf8ChunkReader:
+    """Minimal binary ``read()`` view over a ``str``, encoded a chunk at a time.
+
+    ijson wants bytes; encoding the whole textbox payload up front would hold
+    a second full copy of it, so only the chunk being parsed is ever encoded.
+    """
+
+    def __init__(self, text: str):
+        self._text = text
+        self._pos = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = len(self._text) - self._pos
+        chunk = self._text[self._pos:self._pos + size]
+        self._pos += len(chunk)
+        return chunk.encode("utf-8")
+
+
+def _iter_json_objects_streaming(source: Union[str, bytes, IO]) -> Iterator[Tuple[Optional[str], Any]]:
+    """Yield ``(section, object)`` pairs from an incremental ijson event stream.
+
+    Only one row object is ever held in memory at a time; everything outside
+    the row arrays (``publish_date``, unknown keys) is skipped as it streams by.
+    """
+    builder = None
+    depth = 0
+    section: Optional[str] = None
+    if isinstance(source, str):
+        source = _Utf8ChunkReader(source)
+    for prefix, event, value in ijson.parse(source, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if event in ("start_map", "start_array"):
+                depth += 1
+            elif event in ("end_map", "end_array"):
+                depth -= 1
+                if depth == 0:
+                    yield section, builder.value
+                    builder = None
+            continue
+        match = _ROW_PREFIX.match(prefix)
+        if match is None:
+            continue
+        if event == "start_map":
+            section = match.group(1)
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            depth = 1
+        elif event not in ("end_array", "start_array"):
+            # A scalar where a row object belongs — surface it for a warning.
+            yield match.group(1), value
+
+
+def _iter_json_objects_buffered(source: Union[str, bytes, IO]) -> Iterator[Tuple[Optional[str], Any]]:
+    """Fallback for environments without ijson: decode once, then walk."""
+    if isinstance(source, (str, bytes, bytearray)):
+        document = json.loads(source)
+    else:
+        document = json.load(source)
+    if isinstance(document, list):
+        for obj in document:
+            yield None, obj
+    elif isinstance(document, dict):
+        content = document.get("content") or {}
+        for section in SECTION_ITEM_TYPES:
+            for obj in content.get(section) or []:
+                yield section, obj
+    else:
+        raise ValueError("JSON content must be an array of rows or an edition object")
+
+
+def iter_json_rows(source: Union[str, bytes, IO]) -> Iterator[Dict[str, Any]]:
+    """Stream normalised rows out of a JSON payload.
+
+    Two document shapes are accepted:
+
+    * a flat array of row objects, keyed by upload-template headers or by
+      the internal keys (``[{"ticket_type": "Issue", ...}, ...]``); and
+    * a schema-shaped edition (``{"publish_date": ..., "content":
+      {"issues": [...], "oops": [...], "wins": [...], "news": [...]}}``).
+
+    When ijson is installed the payload is parsed incrementally and each row
+    is handed on as soon as its closing brace is read, so a collator
+    consuming this generator never sees the whole document materialised.
+    The edition's own ``publish_date`` is ignored; the press date belongs to
+    the ``Formatter``.
+
+    Args:
+        source: The JSON text, raw bytes, or a readable file object.
+
+    Yields:
+        Rows in the same normalised form ``normalize_csv_rows`` produces.
+    """
+    refresh_column_aliases()
+    objects = _iter_json_objects_streaming(source) if ijson is not None else _iter_json_objects_buffered(source)
+    for section, obj in objects:
+        row = _normalize_json_object(section, obj)
+        if row is not None:
+            yield row
+
+
+def iter_jsonl_rows(source: Iterable[Union[str, bytes]], errors: Optional[List[Tuple[int, str]]] = None) -> Iterator[Dict[str, Any]]:
+    """Stream normalised rows out of line-delimited JSON (JSONL / NDJSON).
+
+    Each non-blank line must hold one row object, keyed like a CSV row or a
+    JSON array row.  Lines are decoded one at a time, so memory stays
+    bounded by the longest line rather than the file.  A malformed line is
+    logged with its 1-based line number and skipped; the rest of the file
+    is still ingested.
+
+    Args:
+        source: An iterable of lines — an open file (text or binary) or a list.
+        errors: Optional list that receives a ``(line_number, message)``
+            tuple for every line that was skipped.
+
+    Yields:
+        Rows in the same normalised form ``normalize_csv_rows`` produces.
+    """
+    refresh_column_aliases()
+    skipped: List[Tuple[int, str]] = errors if errors is not None else []
+    first_skipped = len(skipped)
+    for line_number, line in enumerate(source, start=1):
+        try:
+            if isinstance(line, bytes):
+                line = line.decode("utf-8-sig" if line_number == 1 else "utf-8")
+            elif line_number == 1:
+                line = line.lstrip("\ufeff")
+        except UnicodeDecodeError as e:
+            message = f"invalid UTF-8 ({e})"
+        else:
+            if not line.strip():
+                continue
+            try:
+                obj = json.loads(line)
+            except ValueError as e:
+                message = f"invalid JSON ({e})"
+            else:
+                if isinstance(obj, dict):
+                    yield normalize_row(obj)
+                    continue
+                message = f"expected an object, got {type(obj).__name__}"
+        logger.warning(f"Skipping malformed JSONL line {line_number}: {message}")
+        skipped.append((line_number, message))
+    if len(skipped) > first_skipped:
+        numbers = ", ".join(str(n) for n, _ in skipped[first_skipped:])
+        logger.warning(f"{len(skipped) - first_skipped} malformed JSONL line(s) skipped: {numbers}")
+
+
+# ── Encoding-aware CSV reading ─────────────────────────────────────────────
+# Spreadsheet exports arrive as UTF-8 (with or without a BOM), UTF-16 or
+# cp1252 depending on who saved them.  The first block is sniffed for a BOM
+# and delimiter, then the bytes are decoded chunk by chunk into the CSV
+# parser so a large upload never exists as both a full ``bytes`` and ``str``.
+_CSV_CHUNK_BYTES = 1024 * 1024
+_CSV_SNIFF_BYTES = 64 * 1024
+_CSV_DELIMITERS = ",;\t|"
+
+# Checked in order: the UTF-32 LE BOM starts with the UTF-16 LE one.
+_BOMS: Tuple[Tuple[bytes, str], ...] = (
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+
+
+def _decode_as_cp1252(error: UnicodeDecodeError) -> Tuple[str, int]:
+    # A "UTF-8" export with a stray cp1252 byte (``\x92`` from a smart quote)
+    # is far more common than a genuinely corrupt file; keep the character.
+    return error.object[error.start:error.end].decode("cp1252", errors="replace"), error.end
+
+
+codecs.register_error("supportmail.cp1252", _decode_as_cp1252)
+
+
+def sniff_encoding(head: bytes) -> Tuple[str, int]:
+    """Guess the encoding of a CSV export from its first block of bytes.
+
+    Args:
+        head: The leading bytes of the file.
+
+    Returns:
+        ``(encoding, bom_length)`` — the codec to decode with and the number
+        of leading BOM bytes to skip.
+    """
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding, len(bom)
+    sample = head[:4096]
+    if sample and sample.count(0) * 4 >= len(sample):
+        # BOM-less UTF-16: ASCII text leaves every other byte NUL.
+        return ("utf-16-le" if sample[1::2].count(0) > sample[::2].count(0) else "utf-16-be"), 0
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        return "cp1252", 0
+    return "utf-8", 0
+
+
+def sniff_dialect(sample: str) -> Union[type, csv.Dialect]:
+    """Detect the delimiter and quoting of ``sample``, defaulting to Excel's."""
+    # Only sniff complete lines so a record cut mid-field cannot mislead it.
+    complete = sample[:sample.rfind("\n") + 1] or sample
+    try:
+        return csv.Sniffer().sniff(complete, delimiters=_CSV_DELIMITERS)
+    except csv.Error:
+        return csv.excel
+
+
+def _iter_byte_chunks(stream: IO[bytes]) -> Iterator[bytes]:
+    """Yield the stream in blocks, memory-mapping it when it is a real file."""
+    view = None
+    # GzipFile and friends expose the *compressed* file's fileno; only map
+    # streams that really are the file.
+    if isinstance(stream, (io.BufferedReader, io.FileIO)):
+        try:
+            view = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            pass  # e.g. an empty file, which cannot be mapped
+    if view is None:
+        yield from iter(lambda: stream.read(_CSV_CHUNK_BYTES), b"")
+        return
+    with view:
+        for offset in range(0, len(view), _CSV_CHUNK_BYTES):
+            yield view[offset:offset + _CSV_CHUNK_BYTES]
+
+
+def _iter_decoded_lines(chunks: Iterator[bytes], decoder: codecs.IncrementalDecoder,
+                        pending: str = "") -> Iterator[str]:
+    """Decode ``chunks`` incrementally and yield lines with their endings.
+
+    Only ``\n`` splits lines, so ``\r\n`` stays intact for the csv module;
+    a file using bare ``\r`` line endings is split on those instead.
+    """
+    separator = None
+    texts = itertools.chain((decoder.decode(chunk) for chunk in chunks), (decoder.decode(b"", final=True),))
+    for text in texts:
+        pending += text
+        if separator is None:
+            # The first line break decides; it precedes any quoted newline.
+            end = re.search(r"\r\n|\r(?=.)|\n", pending, re.DOTALL)
+            if end is None:
+                continue
+            separator = "\r" if end.group() == "\r" else "\n"
+        *lines, pending = pending.split(separator)
+        for line in lines:
+            yield line + separator
+    if pending:
+        yield pending
+
+
+def iter_csv_lines(stream: IO[bytes]) -> Tuple[Iterator[str], Union[type, csv.Dialect]]:
+    """Open a binary CSV stream as decoded lines plus its sniffed dialect.
+
+    Args:
+        stream: A binary file object — a plain upload (which is memory-mapped)
+            or a decompressing stream (which is read in blocks).
+
+    Returns:
+        ``(lines, dialect)``, ready for ``csv.reader`` or ``csv.DictReader``.
+    """
+    chunks = _iter_byte_chunks(stream)
+    head = b""
+    for chunk in chunks:
+        head += chunk
+        if len(head) >= _CSV_SNIFF_BYTES:
+            break
+    encoding, bom_length = sniff_encoding(head)
+    errors = "supportmail.cp1252" if encoding == "utf-8" else "replace"
+    decoder = codecs.getincrementaldecoder(encoding)(errors=errors)
+    first = decoder.decode(head[bom_length:])
+    return _iter_decoded_lines(chunks, decoder, first), sniff_dialect(first[:_CSV_SNIFF_BYTES])
+
+
+def _iter_planned_rows(records: Iterator[Sequence[Any]]) -> Iterator[Dict[str, Any]]:
+    """Map positional records to rows, using the first record as the header.
+
+    The header is resolved once through ``resolve_header_plan``; every later
+    record is then re-keyed by column position.  Empty cells (``None``) are
+    left blank, non-text cells other than ``include`` are stringified, and
+    fully empty records are skipped.
+    """
+    plan = resolve_header_plan(tuple(next(records, ())))
+    columns = [(index, internal_key) for index, internal_key in enumerate(plan) if internal_key is not None]
+    for values in records:
+        if all(value is None for value in values):
+            continue
+        new_row: Dict[str, Any] = {key: "" for key in CSV_COLUMN_ALIASES}
+        for index, internal_key in columns:
+            value = values[index] if index < len(values) else None
+            if value is None:
+                continue
+            if internal_key == "include" or isinstance(value, str):
+                new_row[internal_key] = value
+            else:
+                new_row[internal_key] = str(value)
+        new_row["include"] = _coerce_bool(new_row["include"])
+        yield new_row
+
+
+def _iter_csv_stream(stream: IO[bytes], errors: Optional[List[Tuple[int, str]]] = None) -> Iterator[Dict[str, Any]]:
+    lines, dialect = iter_csv_lines(stream)
+    yield from _iter_planned_rows(csv.reader(lines, dialect=dialect))
+
+
+def _iter_json_stream(stream: IO[bytes], errors: Optional[List[Tuple[int, str]]] = None) -> Iterator[Dict[str, Any]]:
+    yield from iter_json_rows(stream)
+
+
+def _iter_jsonl_stream(stream: IO[bytes], errors: Optional[List[Tuple[int, str]]] = None) -> Iterator[Dict[str, Any]]:
+    yield from iter_jsonl_rows(stream, errors=errors)
+
+
+_XLSX_SPOOL_BYTES = 16 * 1024 * 1024
+
+
+def _iter_xlsx_stream(stream: IO[bytes], errors: Optional[List[Tuple[int, str]]] = None) -> Iterator[Dict[str, Any]]:
+    """Stream normalised rows from the first worksheet of an ``.xlsx`` workbook.
+
+    The workbook is opened read-only, which makes openpyxl parse the sheet
+    XML lazily, one row at a time, so memory stays flat however large the
+    workbook is.  Rows are mapped like CSV records (``_iter_planned_rows``):
+    native boolean cells (including checkbox columns) in ``add_to_edition?``
+    are used as-is, other non-text cells are stringified, and fully empty
+    rows, common below the data in hand-edited sheets, are skipped.
+    """
+    if openpyxl is None:
+        raise ValueError("Excel uploads require the 'openpyxl' package")
+    if not isinstance(stream, (io.BufferedReader, io.FileIO)):
+        # An .xlsx is itself a zip archive and needs random access, which
+        # decompressing streams lack (GzipFile claims to seek but cannot
+        # seek from the end).  Spool the workbook to a temp file that stays
+        # in memory while small.
+        spooled = tempfile.SpooledTemporaryFile(max_size=_XLSX_SPOOL_BYTES)
+        shutil.copyfileobj(stream, spooled)
+        spooled.seek(0)
+        stream = spooled
+    workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    try:
+        yield from _iter_planned_rows(workbook.worksheets[0].iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+
+# Rows are pulled out of Arrow tables this many at a time, bounding the
+# Python objects alive at once.
+_ARROW_BATCH_ROWS = 4096
+
+
+@contextlib.contextmanager
+def _arrow_source(stream: IO[bytes]) -> Iterator["pyarrow.NativeFile"]:
+    """Memory-map the upload.
+
+    Parquet and IPC readers seek, which decompressing streams cannot, so a
+    compressed upload is first spooled to a temp file on disk — never to
+    memory, which would hold every column decompressed.
+    """
+    if isinstance(stream, (io.BufferedReader, io.FileIO)):
+        with pyarrow.memory_map(stream.name, "r") as source:
+            yield source
+        return
+    with tempfile.NamedTemporaryFile(prefix="supportmail_upload_") as spooled:
+        shutil.copyfileobj(stream, spooled)
+        spooled.flush()
+        with pyarrow.memory_map(spooled.name, "r") as source:
+            yield source
+
+
+def _arrow_include_mask(column: "pyarrow.ChunkedArray") -> "pyarrow.ChunkedArray":
+    """Evaluate ``_coerce_bool`` over a whole column inside Arrow."""
+    if pyarrow.types.is_boolean(column.type):
+        return pyarrow.compute.fill_null(column, False)
+    text = pyarrow.compute.utf8_lower(pyarrow.compute.utf8_trim_whitespace(column.cast(pyarrow.string())))
+    return pyarrow.compute.fill_null(pyarrow.compute.is_in(text, value_set=pyarrow.array(sorted(_TRUTHY_STRINGS))), False)
+
+
+def _iter_arrow_table(table: "pyarrow.Table") -> Iterator[Dict[str, Any]]:
+    """Yield the rows of ``table`` that are flagged for the edition.
+
+    Only columns that resolve to an internal key are kept, and the
+    ``include`` filter runs as an Arrow kernel, so unmapped columns and
+    excluded rows never become Python objects.
+    """
+    plan = resolve_header_plan(tuple(table.column_names))
+    if "include" not in plan:
+        logger.warning("Arrow upload has no include column; no rows will be added to the edition")
+        return
+    names = [name for name, internal_key in zip(table.column_names, plan) if internal_key is not None]
+    include = table.column(plan.index("include"))
+    table = table.select(names).filter(_arrow_include_mask(include))
+    for batch in table.to_batches(max_chunksize=_ARROW_BATCH_ROWS):
+        columns = [column.to_pylist() for column in batch.columns]
+        yield from _iter_planned_rows(itertools.chain([names], zip(*columns)))
+
+
+def _mapped_columns(names: Iterable[str]) -> List[str]:
+    return [name for name, internal_key in zip(names, resolve_header_plan(tuple(names))) if internal_key is not None]
+
+
+def _iter_parquet_stream(stream: IO[bytes], errors: Optional[List[Tuple[int, str]]] = None) -> Iterator[Dict[str, Any]]:
+    """Stream edition rows from a Parquet file, reading only mapped columns."""
+    if pyarrow is None:
+        raise ValueError("Parquet uploads require the 'pyarrow' package")
+    with _arrow_source(stream) as source:
+        parquet = pyarrow.parquet.ParquetFile(source)
+        # Column projection happens in the reader: unmapped column chunks are
+        # never decompressed or decoded.
+        table = parquet.read(columns=_mapped_columns(parquet.schema_arrow.names))
+        yield from _iter_arrow_table(table)
+
+
+def _iter_arrow_ipc_stream(stream: IO[bytes], errors: Optional[List[Tuple[int, str]]] = None) -> Iterator[Dict[str, Any]]:
+    """Stream edition rows from an Arrow IPC (Feather v2) file or stream.
+
+    A memory-mapped IPC file is read zero-copy: column buffers point
+    straight into the mapping until the surviving rows are converted.
+    """
+    if pyarrow is None:
+        raise ValueError("Arrow uploads require the 'pyarrow' package")
+    with _arrow_source(stream) as source:
+        try:
+            reader = pyarrow.ipc.open_file(source)
+        except pyarrow.ArrowInvalid:
+            source.seek(0)
+            reader = pyarrow.ipc.open_stream(source)
+        table = reader.read_all()
+        yield from _iter_arrow_table(table.select(_mapped_columns(table.column_names)))
+
+
+# Content suffix → row reader over a binary stream.  Readers that can skip
+# individual bad records report them through ``errors``.
+FORMAT_READERS: Dict[str, Callable[..., Iterator[Dict[str, Any]]]] = {
+    ".csv": _iter_csv_stream,
+    ".json": _iter_json_stream,
+    ".jsonl": _iter_jsonl_stream,
+    ".ndjson": _iter_jsonl_stream,
+    ".xlsx": _iter_xlsx_stream,
+    ".parquet": _iter_parquet_stream,
+    ".arrow": _iter_arrow_ipc_stream,
+    ".feather": _iter_arrow_ipc_stream,
+}
+
+
+@contextlib.contextmanager
+def _open_gzip(path: str) -> Iterator[Tuple[IO[bytes], str]]:
+    with gzip.open(path, "rb") as stream:
+        yield stream, pathlib.Path(path).stem
+
+
+@contextlib.contextmanager
+def _open_zstd(path: str) -> Iterator[Tuple[IO[bytes], str]]:
+    if zstandard is None:
+        raise ValueError("Zstandard uploads require the 'zstandard' package")
+    with open(path, "rb") as raw:
+        with zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True) as stream:
+            yield stream, pathlib.Path(path).stem
+
+
+@contextlib.contextmanager
+def _open_zip(path: str) -> Iterator[Tuple[IO[bytes], str]]:
+    with zipfile.ZipFile(path) as archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+        ]
+        if len(members) != 1:
+            raise ValueError(f"Zip uploads must contain exactly one file, found {len(members)}")
+        with archive.open(members[0]) as stream:
+            yield stream, members[0].filename
+
+
+# Compression suffix → opener yielding ``(decompressed stream, inner name)``.
+# Every opener decompresses incrementally as the stream is read: nothing is
+# written to a temp file and no full decompressed copy is held in memory.
+COMPRESSION_OPENERS: Dict[str, Callable[[str], ContextManager[Tuple[IO[bytes], str]]]] = {
+    ".gz": _open_gzip,
+    ".zst": _open_zstd,
+    ".zip": _open_zip,
+}
+
+# Every suffix the upload widget should accept.
+UPLOAD_FILE_TYPES: List[str] = [*FORMAT_READERS, *COMPRESSION_OPENERS]
+
+
+def _format_reader(name: str) -> Callable[..., Iterator[Dict[str, Any]]]:
+    suffix = pathlib.Path(name).suffix.lower()
+    reader = FORMAT_READERS.get(suffix)
+    if reader is None:
+        raise ValueError(f"Unsupported upload type: {suffix or name}")
+    return reader
+
+
+def _iter_compressed_rows(path: str, opener, errors: Optional[List[Tuple[int, str]]]) -> Iterator[Dict[str, Any]]:
+    with opener(path) as (stream, inner_name):
+        yield from _format_reader(inner_name)(stream, errors=errors)
+
+
+def _iter_plain_rows(path: str, reader, errors: Optional[List[Tuple[int, str]]]) -> Iterator[Dict[str, Any]]:
+    with open(path, "rb") as stream:
+        yield from reader(stream, errors=errors)
+
+
+def iter_upload_rows(path: str, errors: Optional[List[Tuple[int, str]]] = None) -> Iterator[Dict[str, Any]]:
+    """Stream normalised rows from an uploaded file, chosen by its suffix.
+
+    Plain ``.csv``, ``.json``, ``.jsonl``/``.ndjson``, ``.xlsx``,
+    ``.parquet`` and ``.arrow``/``.feather`` files are read directly; the
+    columnar formats yield only the rows flagged for the edition.  ``.gz`` and ``.zst`` files are decompressed on the fly and
+    parsed according to the suffix underneath (``edition.csv.gz``), and a
+    ``.zip`` must hold a single member whose own suffix picks the parser.
+    Decompressed bytes flow straight into the row parser, so memory use is
+    bounded by the parser's buffers, not by the size of the export.
+
+    Args:
+        path: Path of the uploaded file (Gradio hands these over as strings).
+        errors: Optional list collecting ``(line_number, message)`` for rows a
+            line-oriented reader had to skip.
+
+    Returns:
+        A lazy iterator of normalised rows; the file is opened on first use.
+
+    Raises:
+        ValueError: If the file type is not supported.
+    """
+    refresh_column_aliases()
+    name = pathlib.Path(path).name
+    opener = COMPRESSION_OPENERS.get(pathlib.Path(name).suffix.lower())
+    if opener is None:
+        return _iter_plain_rows(path, _format_reader(name), errors)
+    if opener is not _open_zip:
+        # Fail fast on e.g. ``notes.txt.gz``; zip members are checked on open.
+        _format_reader(pathlib.Path(name).stem)
+    return _iter_compressed_rows(path, opener, errors)
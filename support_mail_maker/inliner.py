@@ -0,0 +1,313 @@
+"""Email-ready CSS inlining for rendered SupportMail editions.
+
+Many mail clients strip ``<style>`` blocks, so the rules in
+``support_mail_base.html`` are copied onto each element's ``style``
+attribute after rendering.  Parsing the stylesheet and working out which
+declarations apply to an element are both cached: the stylesheet once per
+template version (its text), and the matched declarations once per distinct
+element path, so thousands of identical ``<dd>`` rows cost one lookup each
+and inlining a render stays a single pass over the HTML.
+
+Only what mail clients can honour inline is inlined: rules whose selectors
+are tags, classes and ids joined by descendant combinators.  ``@media``
+blocks (made ``!important`` so they still beat the inlined values) and any
+other rules are kept in a trimmed ``<style>`` block for the clients that do
+support it.
+"""
+from html import escape
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Sequence, Tuple
+import functools
+import re
+
+from loguru import logger
+
+# Parsed stylesheets kept; one per template version in use.
+STYLESHEET_CACHE_SIZE = 8
+
+# Distinct element paths remembered per stylesheet.
+MATCH_CACHE_SIZE = 4096
+
+# Elements that never have a closing tag, so never become an ancestor.
+_VOID_ELEMENTS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr",
+})
+
+_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+_COMPOUND = re.compile(r"^(?P<tag>[a-zA-Z][\w-]*|\*)?(?P<rest>(?:[.#][\w-]+)*)$")
+_IMPORTANT = re.compile(r"\s*!\s*important\s*$", re.IGNORECASE)
+
+# (tag, id, classes) of one element.
+Signature = Tuple[str, Optional[str], frozenset]
+
+
+class _Compound:
+    """One compound selector such as ``dt.sr-only`` or ``#trends``."""
+
+    __slots__ = ("tag", "ids", "classes")
+
+    def __init__(self, tag: Optional[str], ids: frozenset, classes: frozenset):
+        self.tag = tag
+        self.ids = ids
+        self.classes = classes
+
+    @classmethod
+    def parse(cls, text: str) -> Optional["_Compound"]:
+        match = _COMPOUND.match(text)
+        if match is None or not text:
+            return None
+        parts = re.findall(r"[.#][\w-]+", match.group("rest"))
+        tag = match.group("tag")
+        return cls(
+            tag=None if tag in (None, "*") else tag.lower(),
+            ids=frozenset(p[1:] for p in parts if p[0] == "#"),
+            classes=frozenset(p[1:] for p in parts if p[0] == "."),
+        )
+
+    def matches(self, element: Signature) -> bool:
+        tag, element_id, classes = element
+        return (
+            (self.tag is None or self.tag == tag)
+            and all(i == element_id for i in self.ids)
+            and self.classes <= classes
+        )
+
+
+class _Rule:
+    """A selector with descendant combinators and its declarations."""
+
+    __slots__ = ("compounds", "specificity", "order", "declarations")
+
+    def __init__(self, compounds: List[_Compound], order: int, declarations: List[Tuple[str, str, bool]]):
+        self.compounds = compounds
+        self.specificity = (
+            sum(len(c.ids) for c in compounds),
+            sum(len(c.classes) for c in compounds),
+            sum(c.tag is not None for c in compounds),
+        )
+        self.order = order
+        self.declarations = declarations
+
+    def matches(self, path: Sequence[Signature]) -> bool:
+        """Match against ``path``, the element's ancestors with the element last."""
+        *ancestors, element = path
+        if not self.compounds[-1].matches(element):
+            return False
+        # Descendant combinators only, so matching each remaining compound to
+        # its nearest qualifying ancestor is never wrong.
+        remaining = len(self.compounds) - 2
+        for ancestor in reversed(ancestors):
+            if remaining < 0:
+                break
+            if self.compounds[remaining].matches(ancestor):
+                remaining -= 1
+        return remaining < 0
+
+
+def _split_blocks(css: str) -> List[Tuple[str, str]]:
+    """Split a stylesheet into top-level ``(prelude, body)`` pairs."""
+    blocks = []
+    position = 0
+    while True:
+        start = css.find("{", position)
+        if start < 0:
+            return blocks
+        depth, end = 1, start + 1
+        while depth and end < len(css):
+            depth += {"{": 1, "}": -1}.get(css[end], 0)
+            end += 1
+        blocks.append((css[position:start].strip(), css[start + 1:end - 1]))
+        position = end
+
+
+def _parse_declarations(body: str) -> List[Tuple[str, str, bool]]:
+    declarations = []
+    for declaration in body.split(";"):
+        name, colon, value = declaration.partition(":")
+        if not colon or not name.strip() or not value.strip():
+            continue
+        important = bool(_IMPORTANT.search(value))
+        declarations.append((name.strip().lower(), _IMPORTANT.sub("", value).strip(), important))
+    return declarations
+
+
+def _format_declarations(declarations: List[Tuple[str, str, bool]]) -> str:
+    return "; ".join(
+        f"{name}: {value} !important" if important else f"{name}: {value}"
+        for name, value, important in declarations
+    )
+
+
+def _importantize(media_body: str) -> str:
+    """Mark ``@media`` declarations ``!important`` so they beat inlined styles."""
+    rules = []
+    for selectors, body in _split_blocks(media_body):
+        declarations = "; ".join(f"{name}: {value} !important" for name, value, _ in _parse_declarations(body))
+        rules.append(f"{' '.join(selectors.split())} {{ {declarations} }}")
+    return "\n".join(rules)
+
+
+class Stylesheet:
+    """A parsed stylesheet, split into inlinable rules and residual CSS.
+
+    Build one with :func:`compile_stylesheet`, which caches it per stylesheet
+    text.
+
+    Args:
+        css: The contents of the template's ``<style>`` block(s).
+    """
+
+    def __init__(self, css: str):
+        self.rules: List[_Rule] = []
+        residual: List[str] = []
+        for order, (prelude, body) in enumerate(_split_blocks(_COMMENT.sub("", css))):
+            if prelude.startswith("@media"):
+                residual.append(f"{prelude} {{\n{_importantize(body)}\n}}")
+                continue
+            if prelude.startswith("@"):
+                residual.append(f"{prelude} {{{body}}}")
+                continue
+            declarations = _parse_declarations(body)
+            kept = []
+            for selector in (s.strip() for s in prelude.split(",")):
+                compounds = [_Compound.parse(part) for part in selector.split()]
+                if compounds and all(compounds):
+                    self.rules.append(_Rule(compounds, order, declarations))
+                elif selector:
+                    kept.append(selector)
+            if kept:
+                residual.append(f"{', '.join(kept)} {{{body}}}")
+        self.residual_css = "\n".join(residual)
+        self.style_for = functools.lru_cache(maxsize=MATCH_CACHE_SIZE)(self._style_for)
+
+    def _style_for(self, path: Tuple[Signature, ...]) -> str:
+        """Return the inline declarations the stylesheet gives the last element of ``path``."""
+        matched = sorted(
+            (rule for rule in self.rules if rule.matches(path)),
+            key=lambda rule: (rule.specificity, rule.order),
+        )
+        properties: Dict[str, Tuple[str, bool]] = {}
+        for rule in matched:
+            for name, value, important in rule.declarations:
+                if important or not properties.get(name, ("", False))[1]:
+                    properties.pop(name, None)  # re-insert so order follows the cascade
+                    properties[name] = (value, important)
+        return _format_declarations([(name, value, important) for name, (value, important) in properties.items()])
+
+
+@functools.lru_cache(maxsize=STYLESHEET_CACHE_SIZE)
+def compile_stylesheet(css: str) -> Stylesheet:
+    """Parse ``css`` once per distinct stylesheet text (i.e. template version)."""
+    logger.debug(f"Compiling stylesheet for inlining ({len(css)} characters)")
+    return Stylesheet(css)
+
+
+def _merge_style(inlined: str, existing: Optional[str]) -> str:
+    # Declarations already written on the element win over the stylesheet,
+    # unless the stylesheet marked them ``!important``.
+    if not existing or not existing.strip():
+        return inlined
+    ours = _parse_declarations(inlined)
+    written = _parse_declarations(existing)
+    written_names = {name for name, _, _ in written}
+    important_names = {name for name, _, important in ours if important}
+    return _format_declarations(
+        [d for d in ours if d[2] or d[0] not in written_names]
+        + [d for d in written if d[2] or d[0] not in important_names]
+    )
+
+
+class _InliningParser(HTMLParser):
+    """Re-emits a document with stylesheet rules copied onto each element."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.out: List[str] = []
+        self.path: List[Signature] = []
+        self.css: List[str] = []
+        self.stylesheet: Optional[Stylesheet] = None
+        self.in_style = False
+
+    def _open(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> Optional[Signature]:
+        attributes = dict(attrs)
+        signature = (tag, attributes.get("id"), frozenset((attributes.get("class") or "").split()))
+        if self.stylesheet is None or tag in ("html", "head", "style", "script", "title", "meta", "link"):
+            self.out.append(self.get_starttag_text())
+            return signature
+        inlined = self.stylesheet.style_for((*self.path, signature))
+        if not inlined:
+            self.out.append(self.get_starttag_text())
+            return signature
+        style = _merge_style(inlined, attributes.get("style"))
+        rendered = "".join(
+            f' {name}="{escape(value, quote=True)}"' if value is not None else f" {name}"
+            for name, value in attrs if name != "style"
+        )
+        closing = " />" if self.get_starttag_text().endswith("/>") else ">"
+        self.out.append(f'<{tag}{rendered} style="{escape(style, quote=True)}"{closing}')
+        return signature
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "style":
+            self.in_style = True
+            return
+        signature = self._open(tag, attrs)
+        if tag not in _VOID_ELEMENTS:
+            self.path.append(signature)
+
+    def handle_startendtag(self, tag, attrs):
+        self._open(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if tag == "style":
+            self.in_style = False
+            self.stylesheet = compile_stylesheet("\n".join(self.css))
+            if self.stylesheet.residual_css:
+                self.out.append(f"<style>\n{self.stylesheet.residual_css}\n</style>")
+            return
+        for depth in range(len(self.path) - 1, -1, -1):
+            if self.path[depth][0] == tag:
+                del self.path[depth:]
+                break
+        self.out.append(f"</{tag}>")
+
+    def handle_data(self, data):
+        if self.in_style:
+            self.css.append(data)
+        else:
+            self.out.append(data)
+
+    def handle_entityref(self, name):
+        self.out.append(f"&{name};")
+
+    def handle_charref(self, name):
+        self.out.append(f"&#{name};")
+
+    def handle_comment(self, data):
+        self.out.append(f"<!--{data}-->")
+
+    def handle_decl(self, decl):
+        self.out.append(f"<!{decl}>")
+
+    def handle_pi(self, data):
+        self.out.append(f"<?{data}>")
+
+    def unknown_decl(self, data):
+        self.out.append(f"<![{data}]>")
+
+
+def inline_css(html: str) -> str:
+    """Copy the document's ``<style>`` rules onto its elements' ``style`` attributes.
+
+    Args:
+        html: A rendered edition.
+
+    Returns:
+        The same document with inlinable rules applied to every matching
+        element, and only the residual CSS (``@media`` queries and
+        unsupported selectors) left in ``<style>``.
+    """
+    parser = _InliningParser()
+    parser.feed(html)
+    parser.close()
+    return "".join(parser.out)
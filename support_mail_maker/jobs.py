@@ -0,0 +1,409 @@
+"""Background press jobs: a bounded queue drained by a pool of workers.
+
+A press used to run inside the Gradio click handler, holding the request
+open for the whole render.  Now the handler submits a :class:`Job` and
+returns its ID at once; a fixed pool of asyncio workers runs queued jobs in
+order, and the UI follows the job's status until it finishes.
+
+Admission control is a bound on the queue: once ``max_queued`` jobs are
+waiting, :meth:`JobQueue.submit` raises :class:`QueueFullError` instead of
+letting latency grow without limit.  Queue wait and run times are exported,
+with job counters, in Prometheus text format at ``/metrics``.
+
+Jobs run in the process that accepted them, but each job's record — its
+status, timings and a JSON summary of its result — is written to the
+:mod:`state` store as it changes, so any worker can report on any job.
+"""
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+import asyncio
+import enum
+import os
+import statistics
+import time
+import uuid
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from loguru import logger
+
+from state import StateStore, get_state_store
+
+# Workers running jobs concurrently; ``SUPPORTMAIL_JOB_WORKERS`` overrides it.
+DEFAULT_WORKERS = 2
+
+# Jobs allowed to wait before submissions are refused; ``SUPPORTMAIL_MAX_QUEUED_JOBS``.
+DEFAULT_MAX_QUEUED = 32
+
+# Finished jobs remembered for status lookups.
+JOB_HISTORY = 1000
+
+# Recent timings kept for the exported quantiles.
+_TIMING_WINDOW = 1024
+
+_QUANTILES = (0.5, 0.95, 0.99)
+
+# How long job records are kept in the state store, in seconds.
+JOB_RECORD_TTL = 24 * 3600
+
+
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+class QueueFullError(RuntimeError):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+def describe_job(record: Dict[str, Any]) -> str:
+    """A one-line status for the UI, from a job record (see :meth:`Job.to_dict`)."""
+    now = time.time()
+    status, job_id = record["status"], record["id"]
+    if status == JobStatus.QUEUED:
+        return f"Press job `{job_id}` is queued ({now - record['submitted_at']:.1f}s)…"
+    if status == JobStatus.RUNNING:
+        return f"Press job `{job_id}` is running ({now - record['started_at']:.1f}s)…"
+    if status == JobStatus.SUCCEEDED:
+        return (f"Press job `{job_id}` finished in {record['finished_at'] - record['started_at']:.1f}s "
+                f"(queued {record['started_at'] - record['submitted_at']:.1f}s).")
+    return f"Press job `{job_id}` failed: {record['error']}"
+
+
+@dataclass(eq=False)
+class Job:
+    """A unit of work submitted to a :class:`JobQueue`.
+
+    Attributes:
+        id: Random identifier returned to the submitter.
+        name: Short description for logs.
+        status: Where the job is in its lifecycle.
+        submitted_at: When it was queued (``time.time()``).
+        started_at: When a worker picked it up.
+        finished_at: When it succeeded or failed.
+        result: The job function's return value, once it succeeded.  Jobs
+            submitted with a ``summarize`` function keep only the summary.
+        summary: A JSON-serialisable summary of ``result``, made by the
+            ``summarize`` function it was submitted with.
+        error: The exception message, if it failed.
+        cancelled: Whether :meth:`cancel` was called before it finished.
+    """
+
+    name: str
+    func: Callable[[], Awaitable[Any]] = field(repr=False)
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: JobStatus = JobStatus.QUEUED
+    submitted_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = field(default=None, repr=False)
+    summarize: Optional[Callable[[Any], Dict[str, Any]]] = field(default=None, repr=False)
+    summary: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    cancelled: bool = False
+    _done: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    _task: Optional[asyncio.Task] = field(default=None, repr=False)
+    _save_lock: asyncio.Lock = field(default_factory=asyncio.Lock, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.status in (JobStatus.SUCCEEDED, JobStatus.FAILED)
+
+    @property
+    def queue_wait(self) -> Optional[float]:
+        """Seconds spent queued before a worker started it (so far, if still queued)."""
+        return (self.started_at or time.time()) - self.submitted_at
+
+    @property
+    def run_time(self) -> Optional[float]:
+        """Seconds spent running, once started."""
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the job finishes or ``timeout`` elapses.
+
+        Returns:
+            bool: Whether the job has finished.
+        """
+        try:
+            await asyncio.wait_for(self._done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.done
+
+    def cancel(self) -> bool:
+        """Stop the job: a running job is cancelled, a queued one never starts.
+
+        Returns:
+            bool: Whether the job had not finished yet.
+        """
+        if self.done:
+            return False
+        self.cancelled = True
+        if self._task is not None:
+            self._task.cancel()
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The job's record: its state and result summary, as stored and served."""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status.value,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "queue_wait": self.queue_wait,
+            "run_time": self.run_time,
+            "error": self.error,
+            "result": self.summary,
+        }
+
+    def describe(self) -> str:
+        """A one-line status for the UI."""
+        return describe_job(self.to_dict())
+
+
+class _Timings:
+    """Count, sum and a rolling window of durations, for a Prometheus summary."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.recent: Deque[float] = deque(maxlen=_TIMING_WINDOW)
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.recent.append(seconds)
+
+    def quantiles(self) -> Dict[float, float]:
+        if not self.recent:
+            return {q: 0.0 for q in _QUANTILES}
+        if len(self.recent) == 1:
+            return {q: self.recent[0] for q in _QUANTILES}
+        cuts = statistics.quantiles(self.recent, n=100, method="inclusive")
+        return {q: cuts[int(q * 100) - 1] for q in _QUANTILES}
+
+
+class JobQueue:
+    """A bounded asyncio job queue with a fixed pool of workers.
+
+    Workers are started on first submission, in the running event loop.
+
+    Args:
+        workers (int, optional): Jobs run concurrently.  Defaults to
+            ``SUPPORTMAIL_JOB_WORKERS`` or :data:`DEFAULT_WORKERS`.
+        max_queued (int, optional): Jobs allowed to wait.  Defaults to
+            ``SUPPORTMAIL_MAX_QUEUED_JOBS`` or :data:`DEFAULT_MAX_QUEUED`.
+        history (int, optional): Finished jobs kept in memory for status lookups.
+        state (StateStore, optional): Where job records are shared with other
+            workers.  Defaults to the store ``SUPPORTMAIL_STATE`` names.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_queued: Optional[int] = None, history: int = JOB_HISTORY,
+                 state: Optional[StateStore] = None):
+        self.workers = workers or int(os.environ.get("SUPPORTMAIL_JOB_WORKERS", DEFAULT_WORKERS))
+        self.max_queued = max_queued or int(os.environ.get("SUPPORTMAIL_MAX_QUEUED_JOBS", DEFAULT_MAX_QUEUED))
+        self.history = history
+        self.state = state or get_state_store()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.running = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.completed: Dict[JobStatus, int] = {JobStatus.SUCCEEDED: 0, JobStatus.FAILED: 0}
+        self.queue_wait = _Timings()
+        self.run_time = _Timings()
+
+    @property
+    def queued(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _ensure_workers(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._tasks:
+            return
+        # First use, or the previous loop has gone away (e.g. between tests).
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._tasks = [loop.create_task(self._work(n), name=f"press-worker-{n}") for n in range(self.workers)]
+        logger.info(f"Started {self.workers} press worker(s); up to {self.max_queued} job(s) may queue")
+
+    async def submit(self, func: Callable[[], Awaitable[Any]], name: str = "press",
+                     summarize: Optional[Callable[[Any], Dict[str, Any]]] = None) -> Job:
+        """Queue ``func`` to run on a worker and return its job immediately.
+
+        Returns once the job's record is in the state store, so another
+        worker can look the job up at once.
+
+        Args:
+            func: A zero-argument coroutine function doing the work.
+            name: Short description for logs.
+            summarize: Turns ``func``'s return value into the JSON-serialisable
+                summary kept in the job's record.
+
+        Raises:
+            QueueFullError: If ``max_queued`` jobs are already waiting.
+        """
+        self._ensure_workers()
+        job = Job(name=name, func=func, summarize=summarize)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            logger.warning(f"Refused {name} job: {self.max_queued} job(s) already queued")
+            raise QueueFullError(f"The press queue is full ({self.max_queued} jobs waiting); try again shortly.")
+        self.submitted += 1
+        self._remember(job)
+        await self._save(job)
+        logger.info(f"Queued {name} job {job.id} ({self.queued} waiting)")
+        return job
+
+    def _remember(self, job: Job) -> None:
+        self._jobs[job.id] = job
+        while len(self._jobs) > self.history:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if not oldest.done:
+                break
+            del self._jobs[oldest_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return a queued, running or recently finished job of this process by ID."""
+        return self._jobs.get(job_id)
+
+    async def _save(self, job: Job) -> None:
+        # Writes run in a thread; the lock keeps a job's writes in order, and
+        # each writes the record as it is when its turn comes.
+        async with job._save_lock:
+            try:
+                await asyncio.to_thread(self.state.set, f"job:{job.id}", job.to_dict(), ttl=JOB_RECORD_TTL)
+            except Exception as e:
+                logger.error(f"Unable to save the record of job {job.id}: {e}")
+
+    async def lookup(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the record of a job run by this or any other worker, or ``None``."""
+        job = self.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        try:
+            return await asyncio.to_thread(self.state.get, f"job:{job_id}")
+        except Exception as e:
+            logger.error(f"Unable to read the record of job {job_id}: {e}")
+            return None
+
+    async def wait(self, job_id: str, timeout: float) -> None:
+        """Wait up to ``timeout`` seconds for a job to change state.
+
+        A job of this process wakes the waiter as soon as it finishes; another
+        worker's job can only be polled, so this just sleeps.
+        """
+        job = self.get(job_id)
+        if job is not None:
+            await job.wait(timeout)
+        else:
+            await asyncio.sleep(timeout)
+
+    async def _work(self, worker: int) -> None:
+        while True:
+            job: Job = await self._queue.get()
+            job.status, job.started_at = JobStatus.RUNNING, time.time()
+            self.queue_wait.observe(job.queue_wait)
+            self.running += 1
+            await self._save(job)
+            try:
+                with logger.contextualize(job=job.id):
+                    if job.cancelled:
+                        raise asyncio.CancelledError
+                    # Run as its own task, so cancelling the job leaves the worker running.
+                    job._task = asyncio.ensure_future(job.func())
+                    job.result = await job._task
+                    if job.summarize is not None:
+                        # The history outlives the job; don't keep a whole press alive in it.
+                        job.summary, job.result = job.summarize(job.result), None
+                job.status = JobStatus.SUCCEEDED
+            except asyncio.CancelledError:
+                job.status, job.error = JobStatus.FAILED, "cancelled"
+                if not job.cancelled:
+                    # The worker itself is being shut down.
+                    raise
+            except Exception as e:
+                job.status, job.error = JobStatus.FAILED, str(e) or type(e).__name__
+                logger.error(f"{job.name} job {job.id} failed: {job.error}")
+            finally:
+                job.finished_at, job._task = time.time(), None
+                self.running -= 1
+                self.completed[job.status] = self.completed.get(job.status, 0) + 1
+                self.run_time.observe(job.run_time)
+                try:
+                    await self._save(job)
+                finally:
+                    job._done.set()
+                    self._queue.task_done()
+            logger.info(f"{job.describe()} [worker {worker}]")
+
+    async def shutdown(self) -> None:
+        """Cancel the workers; queued jobs are abandoned."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def render_metrics(self) -> str:
+        """The queue's counters and timings in Prometheus text exposition format."""
+        lines = [
+            "# HELP supportmail_jobs_submitted_total Press jobs accepted into the queue.",
+            "# TYPE supportmail_jobs_submitted_total counter",
+            f"supportmail_jobs_submitted_total {self.submitted}",
+            "# HELP supportmail_jobs_rejected_total Press jobs refused because the queue was full.",
+            "# TYPE supportmail_jobs_rejected_total counter",
+            f"supportmail_jobs_rejected_total {self.rejected}",
+            "# HELP supportmail_jobs_completed_total Press jobs finished, by outcome.",
+            "# TYPE supportmail_jobs_completed_total counter",
+            *(f'supportmail_jobs_completed_total{{status="{status.value}"}} {count}'
+              for status, count in self.completed.items()),
+            "# HELP supportmail_jobs_queued Press jobs waiting for a worker.",
+            "# TYPE supportmail_jobs_queued gauge",
+            f"supportmail_jobs_queued {self.queued}",
+            "# HELP supportmail_jobs_running Press jobs being run.",
+            "# TYPE supportmail_jobs_running gauge",
+            f"supportmail_jobs_running {self.running}",
+            "# HELP supportmail_job_workers Size of the worker pool.",
+            "# TYPE supportmail_job_workers gauge",
+            f"supportmail_job_workers {self.workers}",
+        ]
+        for metric, timings, description in (
+            ("supportmail_job_queue_wait_seconds", self.queue_wait, "Time press jobs waited in the queue."),
+            ("supportmail_job_run_seconds", self.run_time, "Time press jobs took to run."),
+        ):
+            lines += [f"# HELP {metric} {description}", f"# TYPE {metric} summary"]
+            lines += [f'{metric}{{quantile="{q}"}} {value:.6f}' for q, value in timings.quantiles().items()]
+            lines += [f"{metric}_sum {timings.total:.6f}", f"{metric}_count {timings.count}"]
+        return "\n".join(lines) + "\n"
+
+
+_default_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    """Return the process-wide job queue, creating it on first use."""
+    global _default_queue
+    if _default_queue is None:
+        _default_queue = JobQueue()
+    return _default_queue
+
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> str:
+    """Prometheus scrape endpoint for the press job queue."""
+    return get_job_queue().render_metrics()
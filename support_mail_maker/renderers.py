@@ -0,0 +1,317 @@
+"""Template engines that render an edition, behind one renderer interface.
+
+A :class:`Renderer` turns a template name and a context into HTML.  Two
+engines render the same edition, chosen by ``SUPPORTMAIL_RENDERER``:
+
+* ``django`` (the default) — Django's template engine over ``templates/``.
+  Django is imported and configured the first time this renderer is created.
+* ``jinja2`` — Jinja2 over the ports in ``templates/jinja/``.  Templates are
+  compiled once per process and their bytecode is cached on disk
+  (``SUPPORTMAIL_TEMPLATE_CACHE``), so later processes skip compilation too.
+
+Both produce byte-identical output for the same context; keep the two
+template sets in step when changing either.
+
+:func:`submit_renders` renders several templates at once in a pool of
+worker processes, each with its own copy of the named renderer.
+"""
+from collections import namedtuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import date
+from html import escape
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import abc
+import multiprocessing
+import os
+import threading
+
+from summaries import render_summary
+
+try:
+    import jinja2
+    from markupsafe import Markup
+except ImportError:  # pragma: no cover - only the Django renderer is available
+    jinja2 = None
+    Markup = None
+
+RENDERERS = ("django", "jinja2")
+
+DEFAULT_TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+# The Jinja2 templates live in this subdirectory of the template directory.
+JINJA_SUBDIR = "jinja"
+
+_MONTHS = ("January", "February", "March", "April", "May", "June", "July",
+           "August", "September", "October", "November", "December")
+_DAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+# Django ``date`` format characters the Jinja2 ``date`` filter understands.
+_DATE_FORMATS = {
+    "d": lambda value: f"{value.day:02d}",
+    "j": lambda value: str(value.day),
+    "D": lambda value: _DAYS[value.weekday()][:3],
+    "l": lambda value: _DAYS[value.weekday()],
+    "m": lambda value: f"{value.month:02d}",
+    "n": lambda value: str(value.month),
+    "F": lambda value: _MONTHS[value.month - 1],
+    "M": lambda value: _MONTHS[value.month - 1][:3],
+    "Y": lambda value: str(value.year),
+    "y": lambda value: f"{value.year % 100:02d}",
+}
+
+# Django's ``regroup`` result: one group of consecutive items sharing a key.
+GroupedResult = namedtuple("GroupedResult", ["grouper", "list"])
+
+
+def template_dir() -> str:
+    """The Django template directory: ``SUPPORTMAIL_HTML_TEMPLATE`` or the bundled one."""
+    return os.environ.get("SUPPORTMAIL_HTML_TEMPLATE", DEFAULT_TEMPLATE_DIR)
+
+
+def format_date(value: Optional[date], format: str) -> str:
+    """Format ``value`` like Django's ``date`` filter, for the characters in ``_DATE_FORMATS``.
+
+    Other characters are copied as they are; a backslash copies the next one.
+    Month and day names are always English, whatever the process locale.
+    """
+    if value is None or value == "":
+        return ""
+    out = []
+    characters = iter(format)
+    for character in characters:
+        if character == "\\":
+            out.append(next(characters, ""))
+        elif character in _DATE_FORMATS:
+            out.append(_DATE_FORMATS[character](value))
+        else:
+            out.append(character)
+    return "".join(out)
+
+
+def regroup(items: Iterable[Any], attribute: str) -> List[GroupedResult]:
+    """Group consecutive ``items`` by ``attribute``, like Django's ``{% regroup %}``.
+
+    Unlike Jinja2's ``groupby`` the items are not sorted first, so groups keep
+    the order collation gave them.
+    """
+    groups: List[GroupedResult] = []
+    for item in items or ():
+        key = item.get(attribute) if isinstance(item, dict) else getattr(item, attribute, None)
+        if groups and groups[-1].grouper == key:
+            groups[-1].list.append(item)
+        else:
+            groups.append(GroupedResult(key, [item]))
+    return groups
+
+
+def _summary_text(value: Any) -> str:
+    # What ``{{ item.summary }}`` showed before summaries had markup.
+    return render_summary(value if isinstance(value, str) else str(value))
+
+
+class Renderer(abc.ABC):
+    """Renders a named template with a context."""
+
+    #: Short name used by ``SUPPORTMAIL_RENDERER``.
+    name: str = ""
+
+    @abc.abstractmethod
+    def render(self, template_name: str, context: Dict[str, Any]) -> str:
+        """Render ``template_name`` (relative to the template directory) with ``context``."""
+
+
+class DjangoRenderer(Renderer):
+    """Renders with Django's template engine and its cached template loader.
+
+    Django is configured once per process, with only what template rendering
+    needs; an application that has already configured Django keeps its settings.
+
+    Args:
+        directory (str, optional): The template directory.  Defaults to
+            ``SUPPORTMAIL_HTML_TEMPLATE`` or the bundled templates.  Only the
+            first Django renderer of a process can choose it.
+    """
+
+    name = "django"
+
+    def __init__(self, directory: Optional[str] = None):
+        import django
+        from django.conf import settings
+        from django.template.loader import render_to_string
+
+        with _renderers_lock:
+            if not settings.configured:
+                settings.configure(
+                    TEMPLATES=[
+                        {
+                            "BACKEND": "django.template.backends.django.DjangoTemplates",
+                            "DIRS": [directory or template_dir()],
+                            "APP_DIRS": False,
+                            "OPTIONS": {
+                                "loaders": [
+                                    ("django.template.loaders.cached.Loader", [
+                                        "django.template.loaders.filesystem.Loader",
+                                    ]),
+                                ],
+                            },
+                        },
+                    ]
+                )
+                django.setup()
+            _add_django_filters()
+        self._render_to_string = render_to_string
+
+    def render(self, template_name: str, context: Dict[str, Any]) -> str:
+        return self._render_to_string(template_name, context)
+
+
+_django_library = None
+
+
+def _add_django_filters() -> None:
+    # Added to every Django engine's builtins, so the filters also work when
+    # the application configured Django itself.
+    from django.template import Library, engines
+    from django.template.backends.django import DjangoTemplates
+    from django.utils.safestring import mark_safe
+
+    global _django_library
+    if _django_library is None:
+        _django_library = Library()
+        _django_library.filter("summary_html", lambda value: mark_safe(_summary_text(value)), is_safe=True)
+    for engine in engines.all():
+        if isinstance(engine, DjangoTemplates) and _django_library not in engine.engine.template_builtins:
+            engine.engine.template_builtins.append(_django_library)
+
+
+class Jinja2Renderer(Renderer):
+    """Renders with Jinja2, from templates compiled once and cached as bytecode.
+
+    Output is escaped the way Django escapes it (``&#x27;`` and ``&quot;``
+    rather than ``&#39;`` and ``&#34;``), so both engines give the same bytes.
+
+    Args:
+        directory (str, optional): The Jinja2 template directory.  Defaults to
+            ``jinja/`` under ``SUPPORTMAIL_HTML_TEMPLATE`` or the bundled templates.
+        cache_dir (str, optional): Where compiled templates are cached.  Defaults
+            to ``SUPPORTMAIL_TEMPLATE_CACHE`` or Jinja2's per-user temporary directory.
+
+    Raises:
+        ValueError: If the ``jinja2`` package is not installed.
+    """
+
+    name = "jinja2"
+
+    def __init__(self, directory: Optional[str] = None, cache_dir: Optional[str] = None):
+        if jinja2 is None:
+            raise ValueError("The Jinja2 renderer requires the 'jinja2' package. Install it with: pip install jinja2")
+        cache_dir = cache_dir or os.environ.get("SUPPORTMAIL_TEMPLATE_CACHE")
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.environment = jinja2.Environment(
+            loader=jinja2.FileSystemLoader(directory or os.path.join(template_dir(), JINJA_SUBDIR)),
+            autoescape=True,
+            finalize=_django_escape,
+            keep_trailing_newline=True,
+            # Like Django's cached loader: templates are not re-read when they change.
+            auto_reload=False,
+            bytecode_cache=jinja2.FileSystemBytecodeCache(cache_dir),
+        )
+        self.environment.filters["date"] = format_date
+        self.environment.filters["regroup"] = regroup
+        self.environment.filters["summary_html"] = lambda value: Markup(_summary_text(value))
+
+    def precompile(self) -> int:
+        """Compile every template now rather than on first use; returns how many."""
+        names = self.environment.list_templates(extensions=["html"])
+        for template_name in names:
+            self.environment.get_template(template_name)
+        return len(names)
+
+    def render(self, template_name: str, context: Dict[str, Any]) -> str:
+        return self.environment.get_template(template_name).render(context)
+
+
+def _django_escape(value: Any) -> Any:
+    if isinstance(value, Markup):
+        return value
+    return Markup(escape(str(value)))
+
+
+_renderers: Dict[str, Renderer] = {}
+_renderers_lock = threading.RLock()
+
+
+def get_renderer(name: Optional[str] = None) -> Renderer:
+    """Return the shared renderer called ``name``, or the one ``SUPPORTMAIL_RENDERER`` names.
+
+    Renderers are created once per process, so every press shares the
+    compiled templates.  The Jinja2 renderer compiles all of its templates
+    when created.
+
+    Raises:
+        ValueError: If the name is not a known renderer.
+    """
+    name = (name or os.environ.get("SUPPORTMAIL_RENDERER") or "django").lower()
+    if name not in RENDERERS:
+        raise ValueError(f"Unknown renderer: {name}")
+    with _renderers_lock:
+        if name not in _renderers:
+            if name == "jinja2":
+                renderer = Jinja2Renderer()
+                renderer.precompile()
+            else:
+                renderer = DjangoRenderer()
+            _renderers[name] = renderer
+        return _renderers[name]
+
+
+def _render_in_worker(name: str, template_name: str, context: Dict[str, Any]) -> str:
+    return get_renderer(name).render(template_name, context)
+
+
+_pools: Dict[Tuple[str, int], ProcessPoolExecutor] = {}
+
+
+def get_render_pool(name: str, workers: int) -> ProcessPoolExecutor:
+    """Return the shared pool of ``workers`` processes rendering with the renderer called ``name``.
+
+    Workers are spawned rather than forked, so they start without the
+    parent's threads, and load their renderer as they start.
+    """
+    with _renderers_lock:
+        key = (name, workers)
+        if key not in _pools:
+            _pools[key] = ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context("spawn"), initializer=get_renderer, initargs=(name,)
+            )
+        return _pools[key]
+
+
+def submit_renders(renderer: Renderer, renders: Iterable[Tuple[str, Dict[str, Any]]], workers: int) -> List[Future]:
+    """Render templates concurrently in a pool of worker processes.
+
+    Each worker renders with its own copy of the shared renderer called
+    ``renderer.name``, so a renderer built with non-default options is not
+    reproduced.  Contexts must be picklable.
+
+    Args:
+        renderer (Renderer): The renderer whose name the workers use.
+        renders (Iterable[tuple]): ``(template_name, context)`` pairs.
+        workers (int): The size of the pool.
+
+    Returns:
+        list: A future of each template's HTML, in the order given.
+    """
+    pool = get_render_pool(renderer.name, workers)
+    return [pool.submit(_render_in_worker, renderer.name, template_name, context)
+            for template_name, context in renders]
+
+
+def shutdown_render_pools() -> None:
+    """Stop every render pool's worker processes."""
+    with _renderers_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
@@ -0,0 +1,275 @@
+"""Allow-list sanitising for the HTML editors paste into the Trends field.
+
+The Trends block is rendered unescaped into the outbound mail, so it is
+re-emitted through :class:`_SanitizingParser`, which keeps only the tags and
+attributes mail clients render and that cannot run code:
+
+* Allowed tags (:data:`ALLOWED_TAGS`) are kept with their allowed attributes;
+  links and images keep only ``http``, ``https`` (and for links ``mailto``) URLs.
+* ``<script>``, ``<style>`` and other active content are dropped with
+  everything inside them; any other tag is dropped but its text kept.
+* Comments and declarations are dropped, unclosed tags are closed and stray
+  end tags removed, so the block cannot break the layout around it.
+
+The result is also normalised and minified: whitespace runs become one
+space, whitespace between blocks is dropped, entities are decoded and
+re-escaped consistently and attributes are double-quoted.
+
+Editors re-press the same block many times, so cleaned blocks are cached by
+the SHA-256 of their text (:data:`SANITIZE_CACHE_SIZE` of them, per process).
+"""
+from collections import OrderedDict
+from html import escape
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Set, Tuple
+import hashlib
+import re
+import threading
+
+from loguru import logger
+
+# Cleaned blocks remembered, keyed by content hash.
+SANITIZE_CACHE_SIZE = 64
+
+# Tags kept, with the attributes each may carry.
+ALLOWED_TAGS: Dict[str, frozenset] = {
+    "a": frozenset({"href", "title"}),
+    "abbr": frozenset({"title"}),
+    "b": frozenset(),
+    "blockquote": frozenset(),
+    "br": frozenset(),
+    "code": frozenset(),
+    "dd": frozenset(),
+    "div": frozenset(),
+    "dl": frozenset(),
+    "dt": frozenset(),
+    "em": frozenset(),
+    "h2": frozenset(),
+    "h3": frozenset(),
+    "h4": frozenset(),
+    "h5": frozenset(),
+    "h6": frozenset(),
+    "hr": frozenset(),
+    "i": frozenset(),
+    "img": frozenset({"src", "alt", "width", "height"}),
+    "li": frozenset(),
+    "ol": frozenset({"start"}),
+    "p": frozenset(),
+    "pre": frozenset(),
+    "s": frozenset(),
+    "small": frozenset(),
+    "span": frozenset(),
+    "strong": frozenset(),
+    "sub": frozenset(),
+    "sup": frozenset(),
+    "table": frozenset(),
+    "tbody": frozenset(),
+    "td": frozenset({"colspan", "rowspan"}),
+    "th": frozenset({"colspan", "rowspan"}),
+    "thead": frozenset(),
+    "tr": frozenset(),
+    "u": frozenset(),
+    "ul": frozenset(),
+}
+
+# URL attributes and the schemes each accepts.
+URL_SCHEMES: Dict[str, frozenset] = {
+    "href": frozenset({"http", "https", "mailto"}),
+    "src": frozenset({"http", "https"}),
+}
+
+# Dropped together with everything inside them.
+_DROPPED_WITH_CONTENT = frozenset({
+    "script", "style", "iframe", "object", "embed", "template", "noscript", "svg", "math", "title", "head",
+    "textarea", "select", "button", "frame", "frameset", "applet",
+})
+
+_VOID_ELEMENTS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr",
+})
+
+# Whitespace around these is insignificant, so it is dropped.
+_BLOCK_ELEMENTS = frozenset({
+    "address", "article", "aside", "blockquote", "body", "center", "dd", "div", "dl", "dt", "fieldset",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "html",
+    "li", "main", "nav", "ol", "p", "pre", "section", "table", "tbody", "td", "tfoot", "th", "thead", "tr", "ul",
+})
+
+_WHITESPACE = re.compile(r"\s+")
+_URL_SCHEME = re.compile(r"^([a-zA-Z][a-zA-Z0-9+.-]*):")
+# Characters browsers ignore inside a URL, which would otherwise hide a scheme.
+_URL_IGNORED = re.compile(r"[\x00-\x20\x7f]+")
+
+
+def is_safe_url(name: str, value: str) -> bool:
+    """Whether ``value`` may be kept as the ``name`` (``href`` or ``src``) attribute."""
+    url = _URL_IGNORED.sub("", value)
+    match = _URL_SCHEME.match(url)
+    # Scheme-less URLs are relative, which mean nothing in a mail; drop them too.
+    return match is not None and match.group(1).lower() in URL_SCHEMES[name]
+
+
+class _SanitizingParser(HTMLParser):
+    """Re-emits allow-listed markup, normalised and with every tag balanced."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out: List[str] = []
+        self.open: List[str] = []
+        self.removed: Set[str] = set()
+        self.dropping: List[str] = []
+        self.pre_depth = 0
+        # A space is owed before the next text or inline tag; dropped at a block boundary.
+        self.pending_space = False
+        self.at_boundary = True
+
+    def _boundary(self) -> None:
+        self.pending_space = False
+        self.at_boundary = True
+
+    def _inline(self) -> None:
+        if self.pending_space:
+            self.out.append(" ")
+            self.pending_space = False
+        self.at_boundary = False
+
+    def _attributes(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> str:
+        rendered = []
+        for name, value in attrs:
+            if name not in ALLOWED_TAGS[tag]:
+                self.removed.add(f"{tag}[{name}]")
+                continue
+            value = (value or "").strip()
+            if name in URL_SCHEMES and not is_safe_url(name, value):
+                self.removed.add(f"{tag}[{name}]")
+                continue
+            rendered.append(f' {name}="{escape(value, quote=True)}"')
+        return "".join(rendered)
+
+    def _start(self, tag: str, attrs: List[Tuple[str, Optional[str]]], self_closing: bool) -> None:
+        if self.dropping:
+            if tag not in _VOID_ELEMENTS and not self_closing:
+                self.dropping.append(tag)
+            return
+        if tag in _DROPPED_WITH_CONTENT:
+            self.removed.add(tag)
+            if tag not in _VOID_ELEMENTS and not self_closing:
+                self.dropping.append(tag)
+            return
+        if tag not in ALLOWED_TAGS:
+            self.removed.add(tag)
+            if tag in _BLOCK_ELEMENTS:
+                self._boundary()
+            return
+        attributes = self._attributes(tag, attrs)
+        if tag == "img" and ' src="' not in attributes:
+            return
+        if tag in _BLOCK_ELEMENTS:
+            self._boundary()
+        else:
+            self._inline()
+        self.out.append(f"<{tag}{attributes}>")
+        if tag not in _VOID_ELEMENTS:
+            self.open.append(tag)
+            if tag == "pre":
+                self.pre_depth += 1
+
+    def _close(self, tag: str) -> None:
+        if tag in _BLOCK_ELEMENTS:
+            self._boundary()
+        else:
+            self._inline()
+        self.out.append(f"</{tag}>")
+        if tag == "pre":
+            self.pre_depth -= 1
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs, self_closing=False)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs, self_closing=True)
+
+    def handle_endtag(self, tag):
+        if self.dropping:
+            if tag in self.dropping:
+                del self.dropping[len(self.dropping) - 1 - self.dropping[::-1].index(tag):]
+            return
+        if tag not in self.open:
+            if tag in _BLOCK_ELEMENTS:
+                self._boundary()
+            return
+        while self.open:
+            opened = self.open.pop()
+            self._close(opened)
+            if opened == tag:
+                break
+
+    def handle_data(self, data):
+        if self.dropping or not data:
+            return
+        if self.pre_depth:
+            self._inline()
+            self.out.append(escape(data, quote=False))
+            return
+        text = _WHITESPACE.sub(" ", data)
+        if text.startswith(" "):
+            if not self.at_boundary:
+                self.pending_space = True
+            text = text[1:]
+        if not text:
+            return
+        self._inline()
+        if text.endswith(" "):
+            text = text[:-1]
+            self.pending_space = True
+        self.out.append(escape(text, quote=False))
+
+    def close(self):
+        super().close()
+        while self.open:
+            self._close(self.open.pop())
+
+
+_cache: "OrderedDict[str, str]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def sanitize_html(html: str) -> str:
+    """Return ``html`` with only allow-listed markup, normalised and minified.
+
+    Results are cached by the SHA-256 of ``html``, so re-pressing the same
+    block skips parsing it again.
+
+    Args:
+        html: Untrusted HTML, e.g. the pasted Trends block.
+
+    Returns:
+        Markup that is safe to render unescaped.
+    """
+    if not html:
+        return ""
+    key = hashlib.sha256(html.encode("utf-8")).hexdigest()
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    parser = _SanitizingParser()
+    parser.feed(html)
+    parser.close()
+    cleaned = "".join(parser.out)
+    if parser.removed:
+        logger.warning(f"Removed disallowed markup from the Trends HTML: {', '.join(sorted(parser.removed))}")
+    logger.debug(f"Sanitized Trends HTML: {len(html)} → {len(cleaned)} characters")
+
+    with _cache_lock:
+        _cache[key] = cleaned
+        while len(_cache) > SANITIZE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return cleaned
+
+
+def clear_cache() -> None:
+    """Forget every cleaned block."""
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,243 @@
+"""Shared state for press jobs and editors' drafts, behind one store interface.
+
+Job records and drafts used to live only in the process that created them,
+so every request of a session had to reach the same process.  A
+:class:`StateStore` keeps them as JSON documents under string keys, with an
+optional expiry, in one of three places chosen by ``SUPPORTMAIL_STATE``:
+
+* ``memory`` (the default) — a dict in this process; a single worker only.
+* ``sqlite`` — a SQLite file (``SUPPORTMAIL_STATE_PATH``), shared by the
+  workers of one host.
+* ``redis`` — any server speaking the Redis protocol (``SUPPORTMAIL_REDIS_URL``),
+  shared by every host.
+"""
+from typing import Any, Dict, Optional
+import abc
+import json
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - only the memory and SQLite stores are available
+    redis = None
+
+STATE_BACKENDS = ("memory", "sqlite", "redis")
+
+# The SQLite store used when ``SUPPORTMAIL_STATE_PATH`` is not set.
+DEFAULT_STATE_PATH = os.path.join(os.path.expanduser("~"), ".supportmail", "state.sqlite3")
+
+DEFAULT_REDIS_URL = "redis://localhost:6379/0"
+
+# Prefix of every key the app writes to Redis, so it can share a server.
+REDIS_KEY_PREFIX = "supportmail:"
+
+# The memory and SQLite stores drop expired documents once every this many writes.
+_PURGE_EVERY = 1000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS state_expires_at ON state (expires_at);
+"""
+
+
+class StateStore(abc.ABC):
+    """JSON documents under string keys, each with an optional time to live."""
+
+    #: Short name used by ``SUPPORTMAIL_STATE``.
+    name: str = ""
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the document stored under ``key``, or ``None`` if missing or expired."""
+
+    @abc.abstractmethod
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        """Store ``value`` under ``key``, replacing any earlier document.
+
+        Args:
+            key: The key.
+            value: A JSON-serialisable document.
+            ttl: Seconds until the document expires; ``None`` keeps it indefinitely.
+        """
+
+    @abc.abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove ``key``, if present."""
+
+
+class MemoryStateStore(StateStore):
+    """Keeps documents in this process; they are lost on restart.
+
+    Documents are stored serialised, so readers get a copy just as they would
+    from the shared stores.
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self._documents: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._documents.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._documents[key]
+                return None
+        return json.loads(value)
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        entry = (json.dumps(value), time.time() + ttl if ttl is not None else None)
+        with self._lock:
+            self._documents[key] = entry
+            self._writes += 1
+            purge = self._writes % _PURGE_EVERY == 0
+        if purge:
+            self.purge_expired()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._documents.pop(key, None)
+
+    def purge_expired(self) -> int:
+        """Drop expired documents; returns how many were dropped."""
+        now = time.time()
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._documents.items()
+                       if expires_at is not None and expires_at <= now]
+            for key in expired:
+                del self._documents[key]
+        return len(expired)
+
+
+class SQLiteStateStore(StateStore):
+    """Keeps documents in a SQLite file shared by the processes of one host.
+
+    One connection per store is shared by all threads and serialised with a
+    lock; WAL mode lets other processes read while one writes.
+
+    Args:
+        path (str): The database file; created, with its directory, if missing.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: str):
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._lock = threading.Lock()
+        self._writes = 0
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.execute("PRAGMA synchronous = NORMAL")
+            self._connection.executescript(_SCHEMA)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO state (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+                (key, json.dumps(value), expires_at),
+            )
+            self._writes += 1
+            purge = self._writes % _PURGE_EVERY == 0
+        if purge:
+            self.purge_expired()
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM state WHERE key = ?", (key,))
+
+    def purge_expired(self) -> int:
+        """Delete expired documents; returns how many were deleted."""
+        with self._lock, self._connection:
+            return self._connection.execute(
+                "DELETE FROM state WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+            ).rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class RedisStateStore(StateStore):
+    """Keeps documents on a Redis-protocol server (Redis, Valkey, KeyDB…).
+
+    Expiry is left to the server (``SET … PX``).
+
+    Args:
+        url (str, optional): Server URL.  Defaults to ``SUPPORTMAIL_REDIS_URL``
+            or ``redis://localhost:6379/0``.
+        client (optional): A pre-configured ``redis`` client.
+        prefix (str, optional): Prepended to every key.
+
+    Raises:
+        ValueError: If the ``redis`` package is not installed and no client is given.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: Optional[str] = None, client=None, prefix: str = REDIS_KEY_PREFIX):
+        if client is None:
+            if redis is None:
+                raise ValueError("Redis state requires the 'redis' package. Install it with: pip install redis")
+            client = redis.Redis.from_url(url or os.environ.get("SUPPORTMAIL_REDIS_URL", DEFAULT_REDIS_URL))
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        px = max(1, int(ttl * 1000)) if ttl is not None else None
+        self.client.set(self.prefix + key, json.dumps(value), px=px)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+
+_stores: Dict[str, StateStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_state_store(name: Optional[str] = None) -> StateStore:
+    """Return the shared store called ``name``, or the one ``SUPPORTMAIL_STATE`` names.
+
+    Raises:
+        ValueError: If the name is not a known backend.
+    """
+    name = (name or os.environ.get("SUPPORTMAIL_STATE") or "memory").lower()
+    if name not in STATE_BACKENDS:
+        raise ValueError(f"Unknown state backend: {name}")
+    with _stores_lock:
+        if name not in _stores:
+            if name == "sqlite":
+                _stores[name] = SQLiteStateStore(os.environ.get("SUPPORTMAIL_STATE_PATH", DEFAULT_STATE_PATH))
+            elif name == "redis":
+                _stores[name] = RedisStateStore()
+            else:
+                _stores[name] = MemoryStateStore()
+        return _stores[name]
@@ -0,0 +1,237 @@
+"""Where press artifacts are persisted beyond the in-memory artifact store.
+
+Artifacts are always kept in :mod:`artifacts` and served from there; a
+storage backend is the optional, durable copy.  :class:`LocalStorage` writes
+to a directory (the working directory by default, as the app always did),
+and :class:`S3Storage` uploads to any S3-compatible object store, so several
+replicas behind a load balancer share one place to publish to.
+
+Both return a URL for each artifact saved — a ``file://`` URL or a
+presigned ``https://`` one — rather than a path.
+"""
+from typing import Iterator, Optional, Union
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+import abc
+import asyncio
+import io
+import os
+import pathlib
+import threading
+
+import aiofiles
+from loguru import logger
+
+from artifacts import Artifact
+
+try:
+    import boto3
+    from boto3.s3.transfer import TransferConfig
+    from botocore.config import Config
+except ImportError:  # pragma: no cover - only the local backend is available
+    boto3 = None
+
+# Artifacts at least this large are uploaded in parts (S3's minimum part is 5MB).
+MULTIPART_THRESHOLD_BYTES = 8 * 1024 * 1024
+MULTIPART_CHUNK_BYTES = 8 * 1024 * 1024
+
+# Connections kept open to the object store, shared by concurrent uploads.
+MAX_POOL_CONNECTIONS = 16
+
+# How long presigned download URLs stay valid.
+DEFAULT_URL_EXPIRY_SECONDS = 7 * 24 * 3600
+
+STORAGE_BACKENDS = ("local", "s3")
+
+
+class StorageBackend(abc.ABC):
+    """Durable storage for press artifacts."""
+
+    #: Short name used by ``SUPPORTMAIL_STORAGE``.
+    name: str = ""
+
+    @abc.abstractmethod
+    async def save(self, artifact: Artifact) -> str:
+        """Persist ``artifact`` and return a URL it can be downloaded from.
+
+        Raises:
+            OSError: If the artifact could not be written.
+        """
+
+
+class LocalStorage(StorageBackend):
+    """Writes artifacts to a local directory.
+
+    Args:
+        directory (str, optional): Target directory.  Defaults to
+            ``SUPPORTMAIL_STORAGE_DIR``, or the working directory at the time
+            each artifact is saved.
+    """
+
+    name = "local"
+
+    def __init__(self, directory: Optional[Union[str, os.PathLike]] = None):
+        directory = directory or os.environ.get("SUPPORTMAIL_STORAGE_DIR")
+        self.directory = pathlib.Path(directory) if directory else None
+
+    async def save(self, artifact: Artifact) -> str:
+        directory = self.directory or pathlib.Path.cwd()
+        directory.mkdir(parents=True, exist_ok=True)
+        file_path = (directory / artifact.name).absolute()
+        async with aiofiles.open(file_path, "wb") as output:
+            for chunk in artifact.iter_chunks():
+                await output.write(chunk)
+        return file_path.as_uri()
+
+
+class _ArtifactReader(io.RawIOBase):
+    """A read-only file object over an artifact's chunks, for multipart uploads."""
+
+    def __init__(self, artifact: Artifact):
+        self._chunks: Iterator[bytes] = artifact.iter_chunks()
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, target) -> int:
+        while not self._buffer:
+            self._buffer = next(self._chunks, None)
+            if self._buffer is None:
+                self._buffer = b""
+                return 0
+        size = min(len(target), len(self._buffer))
+        target[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+class S3Storage(StorageBackend):
+    """Uploads artifacts to an S3-compatible bucket and returns presigned URLs.
+
+    One client — and so one pool of keep-alive connections — is shared by
+    every upload through the backend.  Artifacts of at least
+    ``multipart_threshold`` bytes are uploaded in parallel parts, streamed
+    from the artifact store rather than read whole.
+
+    Args:
+        bucket (str): Bucket name.
+        prefix (str, optional): Key prefix, e.g. ``"editions/"``.
+        endpoint_url (str, optional): Endpoint of a non-AWS store (MinIO, R2…).
+        region (str, optional): Bucket region.
+        url_expiry (int, optional): Lifetime of presigned URLs in seconds.
+        multipart_threshold (int, optional): Size from which uploads are multipart.
+        multipart_chunksize (int, optional): Size of each uploaded part.
+        max_pool_connections (int, optional): Connections kept in the client's pool.
+        client (optional): A pre-configured ``boto3`` S3 client.
+
+    Raises:
+        ValueError: If ``boto3`` is not installed.
+    """
+
+    name = "s3"
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        url_expiry: int = DEFAULT_URL_EXPIRY_SECONDS,
+        multipart_threshold: int = MULTIPART_THRESHOLD_BYTES,
+        multipart_chunksize: int = MULTIPART_CHUNK_BYTES,
+        max_pool_connections: int = MAX_POOL_CONNECTIONS,
+        client=None,
+    ):
+        if boto3 is None:
+            raise ValueError("S3 storage requires the 'boto3' package. Install it with: pip install boto3")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.url_expiry = url_expiry
+        self.client = client or boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            config=Config(max_pool_connections=max_pool_connections, retries={"mode": "standard"}),
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_threshold,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=max(1, max_pool_connections // 2),
+        )
+
+    def key_for(self, artifact: Artifact) -> str:
+        # The artifact id keeps presses of the same edition from overwriting each other.
+        return f"{self.prefix}{artifact.id}/{artifact.name}"
+
+    def _upload(self, artifact: Artifact) -> str:
+        key = self.key_for(artifact)
+        extra = {
+            "ContentType": artifact.media_type,
+            "ContentDisposition": f'attachment; filename="{artifact.name}"',
+        }
+        if artifact.size < self.transfer_config.multipart_threshold:
+            self.client.put_object(Bucket=self.bucket, Key=key, Body=artifact.read(), **extra)
+        else:
+            self.client.upload_fileobj(
+                # Buffered, so each read returns a whole part rather than one stored chunk.
+                io.BufferedReader(_ArtifactReader(artifact)), self.bucket, key,
+                ExtraArgs=extra, Config=self.transfer_config,
+            )
+        logger.debug(f"Uploaded {artifact.name} to s3://{self.bucket}/{key}")
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": key}, ExpiresIn=self.url_expiry
+        )
+
+    async def save(self, artifact: Artifact) -> str:
+        return await asyncio.to_thread(self._upload, artifact)
+
+    @classmethod
+    def from_environment(cls) -> "S3Storage":
+        """Configure from ``SUPPORTMAIL_S3_*`` environment variables.
+
+        Raises:
+            ValueError: If ``SUPPORTMAIL_S3_BUCKET`` is not set.
+        """
+        bucket = os.environ.get("SUPPORTMAIL_S3_BUCKET")
+        if not bucket:
+            raise ValueError("SUPPORTMAIL_S3_BUCKET must be set to use S3 storage")
+        return cls(
+            bucket=bucket,
+            prefix=os.environ.get("SUPPORTMAIL_S3_PREFIX", ""),
+            endpoint_url=os.environ.get("SUPPORTMAIL_S3_ENDPOINT_URL"),
+            region=os.environ.get("SUPPORTMAIL_S3_REGION"),
+            url_expiry=int(os.environ.get("SUPPORTMAIL_S3_URL_EXPIRY", DEFAULT_URL_EXPIRY_SECONDS)),
+        )
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_storage_backend(name: Optional[str]) -> Optional[StorageBackend]:
+    """Return the shared backend called ``name`` (``"local"`` or ``"s3"``), or ``None``.
+
+    Backends are created once per process, so every press shares the S3
+    client's connection pool.
+
+    Raises:
+        ValueError: If ``name`` is not a known backend.
+    """
+    if not name:
+        return None
+    name = name.lower()
+    if name not in STORAGE_BACKENDS:
+        raise ValueError(f"Unknown storage backend: {name}")
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = LocalStorage() if name == "local" else S3Storage.from_environment()
+        return _backends[name]
+
+
+def local_path(url: str) -> Optional[str]:
+    """Return the filesystem path behind a ``file://`` URL, or ``None`` for other URLs."""
+    parsed = urlparse(url)
+    if parsed.scheme != "file":
+        return None
+    return url2pathname(parsed.path)
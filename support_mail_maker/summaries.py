@@ -0,0 +1,81 @@
+"""A small Markdown subset for item summaries.
+
+Editors paste summaries with Markdown in them, so the templates render each
+summary through :func:`render_summary` (the ``summary_html`` filter in both
+template engines) rather than as plain text.  Only what summaries use is
+understood:
+
+* ``**bold**`` becomes ``<strong>``;
+* ``[text](url)`` becomes a link, if the URL is ``http``, ``https`` or
+  ``mailto`` — otherwise only the text is kept;
+* lines starting with ``-``, ``*`` or ``+`` and a space become a bullet list.
+
+Everything else is text.  The summary is escaped before any markup is added,
+so pasted HTML still shows as text, and a summary without markup renders
+exactly as it did as plain text.  The Markdown artifact is converted from
+the HTML, so it carries the same formatting.
+
+The same boilerplate summaries recur across sections and editions, so each
+distinct summary is converted once per process (:data:`SUMMARY_CACHE_SIZE`
+of them).
+"""
+from html import escape, unescape
+from typing import List
+import functools
+import re
+
+from sanitizer import is_safe_url
+
+# Distinct summaries remembered.
+SUMMARY_CACHE_SIZE = 4096
+
+# Anything that may be markup; summaries without it skip the conversion.
+_MAYBE_MARKUP = re.compile(r"\*\*|\]\(|^[ \t]*[-*+][ \t]", re.MULTILINE)
+_BULLET = re.compile(r"^[ \t]*[-*+][ \t]+(.*)$")
+_LINK = re.compile(r"\[([^\[\]\n]+)\]\(([^()\s]+)\)")
+_BOLD = re.compile(r"\*\*(?=\S)(.+?)(?<=\S)\*\*")
+
+
+def _link(match: re.Match) -> str:
+    text, url = match.groups()
+    # The URL is already escaped for the attribute; check what it decodes to.
+    if not is_safe_url("href", unescape(url)):
+        return text
+    return f'<a href="{url}">{text}</a>'
+
+
+def _bold(match: re.Match) -> str:
+    return f"<strong>{match.group(1)}</strong>"
+
+
+def _inline(text: str) -> str:
+    return _BOLD.sub(_bold, _LINK.sub(_link, text))
+
+
+@functools.lru_cache(maxsize=SUMMARY_CACHE_SIZE)
+def render_summary(summary: str) -> str:
+    """Return ``summary`` as HTML, with its Markdown-subset markup applied.
+
+    Args:
+        summary (str): The summary as the editor wrote it.
+
+    Returns:
+        str: Escaped HTML that is safe to render unescaped.
+    """
+    text = escape(summary)
+    if not _MAYBE_MARKUP.search(summary):
+        return text
+    out: List[str] = []
+    bullets: List[str] = []
+    for line in text.split("\n"):
+        bullet = _BULLET.match(line)
+        if bullet:
+            bullets.append(f"<li>{_inline(bullet.group(1))}</li>")
+            continue
+        if bullets:
+            out.append(f"<ul>{''.join(bullets)}</ul>")
+            bullets = []
+        out.append(_inline(line))
+    if bullets:
+        out.append(f"<ul>{''.join(bullets)}</ul>")
+    return "\n".join(out)
@@ -9,6 +9,9 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
 # Ensure logs directory exists before utils module initializes logger
 os.makedirs(os.path.join(os.path.dirname(__file__), "..", "logs"), exist_ok=True)
 
+# Keep test presses out of the user's edition archive; archive tests open their own.
+os.environ.setdefault("SUPPORTMAIL_ARCHIVE", "off")
+
 from formatter import Item, ItemType, Formatter
 from utils import load_schema
 
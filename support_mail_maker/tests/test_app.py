@@ -1,7 +1,6 @@
 import pytest
-from datetime import datetime
 from unittest.mock import patch, AsyncMock
-from app import normalize_csv_rows, CSV_COLUMN_ALIASES, _ALIAS_LOOKUP, _coerce_bool
+from ingest import normalize_csv_rows, CSV_COLUMN_ALIASES, _ALIAS_LOOKUP, _coerce_bool
 from formatter import Formatter
 
 
@@ -455,92 +454,162 @@ class TestNormalizeCSVRowsIntegration:
 
 
 class TestTrendHtmlInput:
-    """Tests for the trend HTML input integration with the processing handler."""
-
-    @pytest.fixture(autouse=True)
-    def reset_formatter(self):
-        """Reset the module-level current_edition before each test."""
-        import app
-        app.current_edition = Formatter(
-            publish_date=datetime.now().strftime("%Y-%m-%d")
-        )
-        yield
-
-    async def test_trend_html_set_in_context_via_csv(self, tmp_path):
-        """User-supplied trend HTML should reach the Formatter context."""
-        import app
-        from app import is_ready_to_publish_async
+    """Tests for the trend HTML input reaching each press's Formatter."""
 
+    @pytest.fixture
+    def csv_file(self, tmp_path):
         csv_file = tmp_path / "test.csv"
         csv_file.write_text(
             "ticket_type,topic_domain,title,customer,summary,link,add_to_edition\n"
             "Issue,Auth,Login Bug,Acme,Users cannot login,,true\n"
         )
+        return csv_file
 
-        trend_content = "<p>Ticket volume up 15%</p>"
+    def test_trend_html_set_in_context_via_csv(self, csv_file):
+        """User-supplied trend HTML should reach the Formatter context."""
+        from app import prepare_edition
 
-        with patch.object(
-            app.current_edition, "send_to_press_async",
-            new_callable=AsyncMock, return_value=False,
-        ):
-            await is_ready_to_publish_async(
-                json_input=None,
-                file_input=str(csv_file),
-                trend_html=trend_content,
-            )
+        trend_content = "<p>Ticket volume up 15%</p>"
+        edition = prepare_edition(json_input=None, file_input=str(csv_file), trend_html=trend_content)
 
-        assert app.current_edition.context["content"]["trend_html"] == trend_content
+        assert edition.context["content"]["trend_html"] == trend_content
 
-    async def test_trend_html_empty_string_when_not_provided(self, tmp_path):
+    def test_trend_html_empty_string_when_not_provided(self, csv_file):
         """Empty trend input should store empty string in context."""
-        import app
-        from app import is_ready_to_publish_async
+        from app import prepare_edition
+
+        edition = prepare_edition(json_input=None, file_input=str(csv_file), trend_html="")
+
+        assert edition.context["content"]["trend_html"] == ""
+
+    def test_trend_html_none_becomes_empty_string(self, csv_file):
+        """None (cleared Gradio field) should be coerced to empty string."""
+        from app import prepare_edition
+
+        edition = prepare_edition(json_input=None, file_input=str(csv_file), trend_html=None)
+
+        assert edition.context["content"]["trend_html"] == ""
+
+    def test_each_press_gets_its_own_formatter(self, csv_file):
+        """Concurrent presses must not share (and overwrite) one Formatter."""
+        from app import prepare_edition
 
+        first = prepare_edition(None, str(csv_file), "<p>first</p>")
+        second = prepare_edition(None, str(csv_file), "<p>second</p>")
+
+        assert first is not second
+        assert first.context["content"]["trend_html"] == "<p>first</p>"
+
+    def test_markdown_checkbox_reaches_the_formatter(self, csv_file):
+        from app import prepare_edition
+
+        assert prepare_edition(None, str(csv_file), "").include_markdown is True
+        assert prepare_edition(None, str(csv_file), "", include_markdown=False).include_markdown is False
+
+    def test_no_input_returns_none(self):
+        from app import PLACEHOLDER_JSON, prepare_edition
+
+        assert prepare_edition(PLACEHOLDER_JSON, None, "") is None
+
+    def test_trend_html_default_in_formatter(self):
+        """Formatter should initialize trend_html as empty string."""
+        f = Formatter(publish_date="2025-06-15")
+        assert f.context["content"]["trend_html"] == ""
+
+
+class TestPressJobs:
+    """The press button queues a job; follow_job_async streams it to completion."""
+
+    @pytest.fixture(autouse=True)
+    def job_queue(self, monkeypatch):
+        import jobs
+        from state import MemoryStateStore
+        queue = jobs.JobQueue(workers=1, max_queued=1, state=MemoryStateStore())
+        monkeypatch.setattr(jobs, "_default_queue", queue)
+        yield queue
+
+    @pytest.fixture
+    def csv_file(self, tmp_path):
         csv_file = tmp_path / "test.csv"
         csv_file.write_text(
             "ticket_type,topic_domain,title,customer,summary,link,add_to_edition\n"
             "Issue,Auth,Login Bug,Acme,Users cannot login,,true\n"
         )
+        return csv_file
 
-        with patch.object(
-            app.current_edition, "send_to_press_async",
-            new_callable=AsyncMock, return_value=False,
-        ):
-            await is_ready_to_publish_async(
-                json_input=None,
-                file_input=str(csv_file),
-                trend_html="",
-            )
+    async def test_submit_returns_job_id_and_follow_streams_result(self, csv_file):
+        from artifacts import get_artifact_store
+        from app import follow_job_async, is_ready_to_publish_async
 
-        assert app.current_edition.context["content"]["trend_html"] == ""
+        async def press(self):
+            self.artifacts = [get_artifact_store().put("edition.html", "<p>Edition</p>")]
+            return True
 
-    async def test_trend_html_none_becomes_empty_string(self, tmp_path):
-        """None (cleared Gradio field) should be coerced to empty string."""
-        import app
+        with patch.object(Formatter, "send_to_press_async", press):
+            job_id, status = await is_ready_to_publish_async("", str(csv_file), "")
+            assert job_id and ("queued" in status or "running" in status)
+            updates = [update async for update in follow_job_async(job_id)]
+
+        status, download_file, download_links, *_ = updates[-1]
+        assert "finished" in status
+        assert 'edition.html' in download_links.value
+        assert download_file.visible is False
+
+    async def test_follows_a_job_run_by_another_worker(self, job_queue):
+        from app import follow_job_async
+
+        job_queue.state.set("job:elsewhere", {
+            "id": "elsewhere", "name": "press", "status": "succeeded", "submitted_at": 1.0,
+            "started_at": 2.0, "finished_at": 4.0, "queue_wait": 1.0, "run_time": 2.0, "error": None,
+            "result": {"links_html": '<a href="artifacts/x/edition.html">edition.html</a>', "paths": []},
+        })
+        updates = [update async for update in follow_job_async("elsewhere")]
+
+        assert "finished in 2.0s" in updates[-1][0]
+        assert "artifacts/x/edition.html" in updates[-1][2].value
+
+    async def test_failed_press_reports_error(self, csv_file):
+        from app import follow_job_async, is_ready_to_publish_async
+
+        with patch.object(Formatter, "send_to_press_async", new_callable=AsyncMock, return_value=False):
+            job_id, _ = await is_ready_to_publish_async("", str(csv_file), "")
+            updates = [update async for update in follow_job_async(job_id)]
+
+        assert "failed" in updates[-1][0]
+        assert "not ready for publishing" in updates[-1][0]
+
+    async def test_no_input_queues_nothing(self, job_queue):
+        from app import PLACEHOLDER_JSON, is_ready_to_publish_async
+
+        job_id, status = await is_ready_to_publish_async(PLACEHOLDER_JSON, None, "")
+        assert job_id == "" and job_queue.submitted == 0
+
+    async def test_full_queue_is_refused(self, csv_file, job_queue):
+        import asyncio
+        import gradio as gr
         from app import is_ready_to_publish_async
 
-        csv_file = tmp_path / "test.csv"
-        csv_file.write_text(
-            "ticket_type,topic_domain,title,customer,summary,link,add_to_edition\n"
-            "Issue,Auth,Login Bug,Acme,Users cannot login,,true\n"
-        )
+        release = asyncio.Event()
 
-        with patch.object(
-            app.current_edition, "send_to_press_async",
-            new_callable=AsyncMock, return_value=False,
-        ):
-            await is_ready_to_publish_async(
-                json_input=None,
-                file_input=str(csv_file),
-                trend_html=None,
-            )
+        async def slow_press(self):
+            await release.wait()
+            return False
 
-        assert app.current_edition.context["content"]["trend_html"] == ""
+        with patch.object(Formatter, "send_to_press_async", slow_press):
+            await is_ready_to_publish_async("", str(csv_file), "")  # running
+            await asyncio.sleep(0)
+            await is_ready_to_publish_async("", str(csv_file), "")  # queued
+            with pytest.raises(gr.Error):
+                await is_ready_to_publish_async("", str(csv_file), "")
+            release.set()
+            await job_queue.shutdown()
+        assert job_queue.rejected == 1
 
-    def test_trend_html_default_in_formatter(self):
-        """Formatter should initialize trend_html as empty string."""
-        f = Formatter(publish_date="2025-06-15")
-        assert f.context["content"]["trend_html"] == ""
+    async def test_unknown_job(self):
+        from app import follow_job_async
+
+        updates = [update async for update in follow_job_async("missing")]
+        assert "unknown" in updates[0][0]
 
 
 class TestCreateInputsReturnsTrendInput:
@@ -555,3 +624,78 @@ class TestCreateInputsReturnsTrendInput:
             result = create_inputs()
         assert len(result) == 3
         assert isinstance(result[2], gr.Textbox)
+
+
+class TestArchiveSearch:
+    """Tests for the Archive tab's search handler."""
+
+    async def test_returns_table_rows(self, tmp_path, monkeypatch):
+        import app
+        from archive import EditionArchive, ITEM_COLUMNS
+
+        archive = EditionArchive(str(tmp_path / "archive.sqlite3"))
+        archive.record_edition("2025-03-15", [{
+            "title": "Login timeout on SSO", "domain": "Authentication", "summary": "Timeouts.",
+            "customer": "Acme Corp", "item_type": "Issue", "ticket_url": None,
+        }])
+        monkeypatch.setattr(app, "get_archive", lambda: archive)
+        rows = await app.search_archive_async("login", "", "", "", "", "")
+        assert rows == [["Login timeout on SSO", "Authentication", "Acme Corp", "Timeouts.", None, "Issue", "2025-03-15"]]
+        assert len(rows[0]) == len(ITEM_COLUMNS)
+
+    async def test_invalid_date_returns_no_rows(self, tmp_path, monkeypatch):
+        import app
+        from archive import EditionArchive
+
+        monkeypatch.setattr(app, "get_archive", lambda: EditionArchive(str(tmp_path / "archive.sqlite3")))
+        assert await app.search_archive_async("", "", "", "", "last March", "") == []
+
+
+class TestDrafts:
+    """Drafts are kept in the state store, keyed by an ID held in the browser."""
+
+    @pytest.fixture(autouse=True)
+    def state_store(self, monkeypatch):
+        import state
+        store = state.MemoryStateStore()
+        monkeypatch.setattr(state, "_stores", {"memory": store})
+        monkeypatch.delenv("SUPPORTMAIL_STATE", raising=False)
+        return store
+
+    async def test_new_browser_gets_a_draft_id(self):
+        from app import restore_draft_async
+
+        draft_id, json_update, trend_update = await restore_draft_async("")
+        assert len(draft_id) == 32
+        assert json_update == {"__type__": "update"}
+
+    async def test_saved_draft_is_restored(self, state_store):
+        from app import restore_draft_async, save_draft_async
+
+        await save_draft_async("abc", '{"content": {}}', "<p>Trends</p>")
+        assert state_store.get("draft:abc")["trend_html"] == "<p>Trends</p>"
+        assert await restore_draft_async("abc") == ("abc", '{"content": {}}', "<p>Trends</p>")
+
+    async def test_unknown_draft_leaves_inputs_alone(self):
+        from app import restore_draft_async
+
+        draft_id, json_update, _ = await restore_draft_async("gone")
+        assert draft_id == "gone" and json_update == {"__type__": "update"}
+
+
+class TestCreateApp:
+    def test_mounts_ui_and_http_routes(self):
+        from app import create_app
+
+        paths = {getattr(route, "path", None) for route in create_app().routes}
+        assert {"/metrics", "/editions", "/editions/{job_id}", "/artifacts/{artifact_id}/{name}"} <= paths
+
+    def test_import_builds_no_formatter_or_ui(self):
+        """Spawned render workers re-import app.py as __mp_main__; that must stay cheap."""
+        import runpy
+        import app
+
+        with patch("formatter.Formatter") as formatter, patch("gradio.Blocks") as blocks:
+            runpy.run_path(app.__file__, run_name="__mp_main__")
+        formatter.assert_not_called()
+        blocks.assert_not_called()
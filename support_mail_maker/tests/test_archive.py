@@ -0,0 +1,125 @@
+import pytest
+
+import archive as archive_module
+from archive import EditionArchive, get_archive, main
+
+MARCH = [
+    {"title": "Login timeout on SSO", "domain": "Authentication", "summary": "Users time out during SSO.",
+     "customer": "Acme Corp", "item_type": "Issue", "ticket_url": "https://support.example.com/1"},
+    {"title": "Invoices miscalculated", "domain": "Billing", "summary": "Rounding error in invoices.",
+     "customer": "Gamma LLC", "item_type": "Oops", "ticket_url": None},
+]
+APRIL = [
+    {"title": "SSO login restored", "domain": "Authentication", "summary": "Timeouts fixed for Acme.",
+     "customer": "Acme Corp", "item_type": "Win", "ticket_url": "https://support.example.com/2"},
+]
+
+
+@pytest.fixture
+def archive(tmp_path):
+    archive = EditionArchive(str(tmp_path / "archive.sqlite3"))
+    archive.record_edition("2025-03-15", MARCH)
+    archive.record_edition("2025-04-15", APRIL)
+    yield archive
+    archive.close()
+
+
+class TestEditionArchive:
+    def test_full_text_search_ranks_and_prefix_matches(self, archive):
+        titles = [item["title"] for item in archive.search("sso time")]
+        assert set(titles) == {"Login timeout on SSO", "SSO login restored"}
+
+    def test_search_returns_item_columns(self, archive):
+        (item,) = archive.search("invoices")
+        assert item == {
+            "title": "Invoices miscalculated", "domain": "Billing", "customer": "Gamma LLC",
+            "summary": "Rounding error in invoices.", "ticket_url": None, "type": "Oops",
+            "publish_date": "2025-03-15",
+        }
+
+    def test_filters_without_text_newest_first(self, archive):
+        items = archive.search(customer="acme corp")
+        assert [item["publish_date"] for item in items] == ["2025-04-15", "2025-03-15"]
+        assert [i["title"] for i in archive.search(domain="Billing")] == ["Invoices miscalculated"]
+        assert [i["title"] for i in archive.search("sso", item_type="Win")] == ["SSO login restored"]
+
+    def test_date_range(self, archive):
+        assert [i["publish_date"] for i in archive.search(since="2025-04-01")] == ["2025-04-15"]
+        assert [i["publish_date"] for i in archive.search("sso", until="2025-03-31")] == ["2025-03-15"]
+        with pytest.raises(ValueError):
+            archive.search(since="March")
+
+    def test_query_syntax_is_escaped(self, archive):
+        assert archive.search('"sso" AND (NEAR') == archive.search("sso and near")
+        assert len(archive.search("*** ")) == 3
+
+    def test_repress_replaces_edition(self, archive):
+        archive.record_edition("2025-03-15", MARCH[:1])
+        assert archive.search("invoices") == []
+        assert [e["item_count"] for e in archive.editions()] == [1, 1]
+        assert len(archive.search("login")) == 2
+
+    def test_repress_on_a_later_day_replaces_the_months_edition(self, archive):
+        archive.record_edition("2025-03-28", MARCH[:1])
+        assert [e["publish_date"] for e in archive.editions()] == ["2025-04-15", "2025-03-28"]
+        assert archive.search("invoices") == []
+        assert [i["publish_date"] for i in archive.search("login timeout", item_type="Issue")] == ["2025-03-28"]
+
+    def test_get_archive_is_shared_and_can_be_disabled(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(archive_module, "_archives", {})
+        monkeypatch.setenv("SUPPORTMAIL_ARCHIVE", str(tmp_path / "shared.sqlite3"))
+        assert get_archive() is get_archive()
+        monkeypatch.setenv("SUPPORTMAIL_ARCHIVE", "off")
+        assert get_archive() is None
+
+    def test_archiving_is_opt_in(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(archive_module, "_archives", {})
+        monkeypatch.setattr(archive_module, "DEFAULT_ARCHIVE_PATH", str(tmp_path / "default.sqlite3"))
+        monkeypatch.delenv("SUPPORTMAIL_ARCHIVE", raising=False)
+        assert get_archive() is None
+        monkeypatch.setenv("SUPPORTMAIL_ARCHIVE", "on")
+        assert get_archive().path == str(tmp_path / "default.sqlite3")
+
+
+class TestFindPrior:
+    def test_finds_latest_earlier_edition(self, archive):
+        from dedup import item_key
+        key = item_key({"title": "login timeout on sso", "ticket_url": "http://support.example.com/1/"})
+        assert archive.find_prior([key, "missing"], "2025-05-01") == {key: "2025-03-15"}
+        assert archive.find_prior([key], "2025-03-15") == {}
+        assert archive.find_prior([key], "2025-03-31") == {}
+        assert archive.find_prior([key], "2025-04-01") == {key: "2025-03-15"}
+
+    def test_migrates_archive_without_keys(self, tmp_path):
+        import sqlite3
+        from dedup import item_key
+        path = str(tmp_path / "old.sqlite3")
+        connection = sqlite3.connect(path)
+        connection.executescript("""
+            CREATE TABLE editions (id INTEGER PRIMARY KEY, publish_date TEXT NOT NULL UNIQUE,
+                                   pressed_at TEXT NOT NULL, item_count INTEGER NOT NULL);
+            CREATE TABLE items (id INTEGER PRIMARY KEY, edition_id INTEGER NOT NULL, type TEXT NOT NULL,
+                                title TEXT NOT NULL, domain TEXT, customer TEXT, summary TEXT,
+                                ticket_url TEXT, publish_date TEXT NOT NULL);
+            INSERT INTO editions VALUES (1, '2025-01-15', '2025-01-15T09:00:00', 1);
+            INSERT INTO items VALUES (1, 1, 'Issue', 'Old item', NULL, NULL, NULL, 'https://s.example.com/9', '2025-01-15');
+        """)
+        connection.close()
+        key = item_key({"title": "Old item", "ticket_url": "https://s.example.com/9"})
+        assert EditionArchive(path).find_prior([key], "2025-02-15") == {key: "2025-01-15"}
+
+
+class TestArchiveCli:
+    def test_search(self, archive, capsys):
+        assert main(["--archive", archive.path, "search", "sso", "--type", "Issue"]) == 0
+        output = capsys.readouterr().out
+        assert "Login timeout on SSO" in output
+        assert "SSO login restored" not in output
+
+    def test_editions(self, archive, capsys):
+        assert main(["--archive", archive.path, "editions"]) == 0
+        assert "2025-04-15" in capsys.readouterr().out
+
+    def test_archiving_off(self, monkeypatch, capsys):
+        monkeypatch.setenv("SUPPORTMAIL_ARCHIVE", "off")
+        assert main(["editions"]) == 1
@@ -0,0 +1,207 @@
+import base64
+import gzip
+
+import brotli
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import artifacts
+from artifacts import ArtifactStore, get_artifact_store, media_type_for, render_download_links, router
+from state import MemoryStateStore
+
+HTML = "<html><body>" + "<dd class=\"issue-summary\">Users cannot log in.</dd>\n" * 200 + "</body></html>"
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = ArtifactStore(max_bytes=1024 * 1024)
+    monkeypatch.setattr(artifacts, "_default_store", store)
+    yield store
+    store.clear()
+
+
+@pytest.fixture
+def client(store):
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
+
+
+class TestArtifactStore:
+    def test_put_keeps_text_and_precompressed_variants(self, store):
+        artifact = store.put("edition.html", HTML)
+        assert artifact.read() == HTML.encode("utf-8")
+        assert artifact.encodings == ("br", "gzip", "identity")
+        assert gzip.decompress(artifact.read("gzip")) == HTML.encode("utf-8")
+        assert brotli.decompress(artifact.read("br")) == HTML.encode("utf-8")
+        assert artifact.bodies["br"].size < artifact.size
+        assert store.get(artifact.id) is artifact
+
+    def test_accepts_chunks(self, store):
+        artifact = store.put("edition.jsonl", iter(['{"a": 1}\n', b'{"b": 2}\n']))
+        assert artifact.read() == b'{"a": 1}\n{"b": 2}\n'
+        assert artifact.media_type == "application/x-ndjson"
+
+    def test_writers_fill_artifacts_in_step(self, store):
+        html, markdown = store.open("edition.html"), store.open("edition.md")
+        for i in range(0, len(HTML), 500):
+            html.write(HTML[i:i + 500])
+            markdown.write(f"Chunk {i}\n".encode("utf-8"))
+        assert len(store) == 0
+        html_artifact, markdown_artifact = html.close(), markdown.close()
+        assert html_artifact.read() == store.put("copy.html", HTML).read()
+        assert html_artifact.sha256 == store.put("copy.html", HTML).sha256
+        assert markdown_artifact.read().startswith(b"Chunk 0\nChunk 500\n")
+        assert store.get(markdown_artifact.id) is markdown_artifact
+
+    def test_discarded_writer_stores_nothing(self, store):
+        writer = store.open("edition.html")
+        writer.write(HTML)
+        writer.discard()
+        assert len(store) == 0
+
+    def test_small_or_binary_artifacts_are_not_compressed(self, store):
+        assert store.put("tiny.md", "# Hi").encodings == ("identity",)
+        assert store.put("image.png", b"\x89PNG" * 1000).encodings == ("identity",)
+
+    def test_large_bodies_are_spooled(self):
+        store = ArtifactStore(spool_bytes=1024)
+        artifact = store.put("edition.html", (HTML[i:i + 500] for i in range(0, len(HTML), 500)))
+        assert not artifact.bodies["identity"].in_memory
+        assert b"".join(artifact.iter_chunks()) == HTML.encode("utf-8")
+        store.clear()
+
+    def test_evicts_least_recently_used(self):
+        store = ArtifactStore(max_bytes=25_000)
+        first = store.put("first.bin", b"1" * 10_000, media_type="application/octet-stream")
+        second = store.put("second.bin", b"2" * 10_000, media_type="application/octet-stream")
+        store.get(first.id)
+        third = store.put("third.bin", b"3" * 10_000, media_type="application/octet-stream")
+        assert first.id in store and third.id in store
+        assert second.id not in store
+        assert store.nbytes == 20_000
+
+    def test_oversized_artifact_is_kept_alone(self):
+        store = ArtifactStore(max_bytes=100)
+        store.put("a.bin", b"a" * 50, media_type="application/octet-stream")
+        big = store.put("big.bin", b"b" * 500, media_type="application/octet-stream")
+        assert len(store) == 1 and big.id in store
+
+    @pytest.mark.parametrize("header, expected", [
+        (None, "identity"),
+        ("gzip", "gzip"),
+        ("gzip, deflate, br", "br"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("br;q=0, gzip;q=0", "identity"),
+        ("*", "br"),
+    ])
+    def test_negotiate(self, store, header, expected):
+        assert store.put("edition.html", HTML).negotiate(header) == expected
+
+    def test_media_types(self):
+        assert media_type_for("a.html") == "text/html; charset=utf-8"
+        assert media_type_for("a.md") == "text/markdown; charset=utf-8"
+        assert media_type_for("a.eml") == "message/rfc822"
+
+    def test_download_links(self, store):
+        artifact = store.put("2025_support_mail_March.html", HTML)
+        links = render_download_links([artifact])
+        assert f'href="artifacts/{artifact.id}/2025_support_mail_March.html"' in links
+        assert render_download_links([]) == ""
+
+    def test_download_links_prefer_remote_urls(self, store):
+        html, md = store.put("edition.html", HTML), store.put("edition.md", "# Edition")
+        links = render_download_links([html, md], ["https://bucket.example.com/edition.html?sig=1", "file:///tmp/edition.md"])
+        assert 'href="https://bucket.example.com/edition.html?sig=1"' in links
+        assert f'href="{md.href}"' in links
+
+
+class TestArtifactRoute:
+    def test_serves_brotli_when_accepted(self, store, client):
+        artifact = store.put("edition.html", HTML)
+        response = client.get(f"/{artifact.href}", headers={"Accept-Encoding": "gzip, br"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "br"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers["content-type"] == "text/html; charset=utf-8"
+        assert "attachment" in response.headers["content-disposition"]
+        assert response.text == HTML
+
+    def test_serves_identity_without_accept_encoding(self, store, client):
+        artifact = store.put("edition.html", HTML)
+        response = client.get(f"/{artifact.href}", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        assert response.content == HTML.encode("utf-8")
+
+    def test_streams_spooled_bodies(self, monkeypatch, client):
+        store = ArtifactStore(spool_bytes=1024)
+        monkeypatch.setattr(artifacts, "_default_store", store)
+        artifact = store.put("edition.html", HTML)
+        response = client.get(f"/{artifact.href}", headers={"Accept-Encoding": "gzip"})
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.text == HTML
+        store.clear()
+
+    def test_not_modified(self, store, client):
+        artifact = store.put("edition.html", HTML)
+        etag = client.get(f"/{artifact.href}", headers={"Accept-Encoding": "gzip"}).headers["etag"]
+        response = client.get(f"/{artifact.href}", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+        assert response.status_code == 304
+
+    def test_unknown_or_mismatched_artifact(self, store, client):
+        artifact = store.put("edition.html", HTML)
+        assert client.get("/artifacts/deadbeef/edition.html").status_code == 404
+        assert client.get(f"/artifacts/{artifact.id}/other.html").status_code == 404
+
+
+class TestSharedArtifacts:
+    def test_other_stores_load_shared_artifacts(self):
+        state = MemoryStateStore()
+        first, second = ArtifactStore(state=state), ArtifactStore(state=state, spool_bytes=1024)
+        artifact = first.put("edition.html", HTML)
+        shared = second.get(artifact.id)
+        assert (shared.name, shared.sha256, shared.encodings) == (artifact.name, artifact.sha256, artifact.encodings)
+        assert all(shared.read(encoding) == artifact.read(encoding) for encoding in artifact.encodings)
+        assert artifact.id in second
+        assert not shared.bodies["identity"].in_memory
+
+    def test_only_the_unencoded_body_is_shared_in_chunks(self, monkeypatch):
+        monkeypatch.setattr(artifacts, "SHARED_CHUNK_BYTES", 4096)
+        state = MemoryStateStore()
+        artifact = ArtifactStore(state=state, spool_bytes=1024).put("edition.html", HTML)
+        document = state.get(f"artifact:{artifact.id}")
+        assert document["chunks"] == -(-artifact.size // 4096) > 1
+        assert "bodies" not in document
+        shared = b"".join(base64.b64decode(state.get(f"artifact:{artifact.id}:{index}")["data"])
+                          for index in range(document["chunks"]))
+        assert shared == artifact.read()
+
+    def test_incomplete_shared_artifact_is_missing(self, monkeypatch):
+        monkeypatch.setattr(artifacts, "SHARED_CHUNK_BYTES", 4096)
+        state = MemoryStateStore()
+        artifact = ArtifactStore(state=state).put("edition.html", HTML)
+        state.delete(f"artifact:{artifact.id}:1")
+        assert ArtifactStore(state=state).get(artifact.id) is None
+
+    def test_discard_removes_the_shared_copy(self):
+        state = MemoryStateStore()
+        first, second = ArtifactStore(state=state), ArtifactStore(state=state)
+        artifact = first.put("edition.html", HTML)
+        first.discard(artifact.id)
+        assert second.get(artifact.id) is None
+        assert state._documents == {}
+
+    def test_unshared_store_misses(self):
+        assert ArtifactStore().get("deadbeef") is None
+
+    @pytest.mark.parametrize("backend, shared", [("memory", False), ("sqlite", True)])
+    def test_default_store_shares_through_shared_state(self, monkeypatch, tmp_path, backend, shared):
+        monkeypatch.setenv("SUPPORTMAIL_STATE", backend)
+        monkeypatch.setenv("SUPPORTMAIL_STATE_PATH", str(tmp_path / "state.sqlite3"))
+        monkeypatch.setattr(artifacts, "_default_store", None)
+        monkeypatch.setattr("state._stores", {})
+        store = get_artifact_store()
+        assert (store.state is not None) is shared
+        if shared:
+            store.state.close()
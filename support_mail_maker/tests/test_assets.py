@@ -0,0 +1,91 @@
+import base64
+import email
+import io
+
+import pytest
+
+import assets
+from assets import CDN_ASSETS, CDN_BASE_URL, AssetStore, optimize_png
+
+Image = pytest.importorskip("PIL.Image")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return AssetStore(cache_dir=str(tmp_path / "cache"))
+
+
+def _png(mode, size, colour):
+    output = io.BytesIO()
+    Image.new(mode, size, colour).save(output, format="PNG")
+    return output.getvalue()
+
+
+def _pixels(data, mode="RGBA"):
+    with Image.open(io.BytesIO(data)) as image:
+        return image.convert(mode).tobytes()
+
+
+class TestOptimizePng:
+    def test_bundled_images_shrink_losslessly(self):
+        with open(f"{assets.IMAGE_DIR}/img-section-header-issues.png", "rb") as f:
+            source = f.read()
+        optimised = optimize_png(source)
+        assert len(optimised) < len(source)
+        assert _pixels(optimised) == _pixels(source)
+
+    def test_opaque_alpha_is_dropped_and_few_colours_palettised(self):
+        source = _png("RGBA", (64, 64), (0, 49, 61, 255))
+        optimised = optimize_png(source)
+        with Image.open(io.BytesIO(optimised)) as image:
+            assert image.mode == "P"
+        assert _pixels(optimised) == _pixels(source)
+
+    def test_never_grows(self):
+        source = _png("L", (1, 1), 0)
+        assert len(optimize_png(source)) <= len(source)
+
+
+class TestAssetStore:
+    def test_every_mapped_image_exists(self, store):
+        assert {a.name for a in store.preload()} == set(CDN_ASSETS.values())
+
+    def test_assets_cached_in_memory_by_name_and_hash(self, store):
+        asset = store.get("img-section-header-wins.png")
+        assert store.get("img-section-header-wins.png") is asset
+        assert store.by_hash(asset.sha256) is asset
+        assert asset.data_uri is asset.data_uri
+
+    def test_optimised_bytes_persisted_across_stores(self, store, tmp_path, monkeypatch):
+        first = store.get("img-section-header-news.png")
+        calls = []
+        monkeypatch.setattr(assets, "optimize_png", lambda data: calls.append(data) or data)
+        second = AssetStore(cache_dir=store.cache_dir).get("img-section-header-news.png")
+        assert calls == []
+        assert second.data == first.data
+
+    def test_data_uri_and_mime_part(self, store):
+        asset = store.get("img-section-header-oops.png")
+        assert asset.data_uri.startswith("data:image/png;base64,")
+        assert base64.b64decode(asset.data_uri.split(",", 1)[1]) == asset.data
+        part = email.message_from_bytes(asset.mime_part)
+        assert part["Content-ID"] == f"<{asset.cid}>"
+        assert part.get_payload(decode=True) == asset.data
+        assert all(len(line) <= 76 for line in asset.mime_part.split(b"\r\n"))
+
+    def test_embed_data_uris(self, store):
+        html = f'<img src="{CDN_BASE_URL}section_header_wins.png" /><img src="{CDN_BASE_URL}section_header_trends.png" />'
+        embedded, used = store.embed(html)
+        asset = store.get("img-section-header-wins.png")
+        assert embedded == f'<img src="{asset.data_uri}" /><img src="{CDN_BASE_URL}section_header_trends.png" />'
+        assert used == [asset]
+
+    def test_embed_cid_references_each_asset_once(self, store):
+        src = f'<img src="{CDN_BASE_URL}section_header_news.png">'
+        embedded, used = store.embed(src * 3, mode="cid")
+        assert embedded.count(f"cid:{used[0].cid}") == 3
+        assert len(used) == 1
+
+    def test_unknown_mode(self, store):
+        with pytest.raises(ValueError, match="embedding mode"):
+            store.embed("", mode="link")
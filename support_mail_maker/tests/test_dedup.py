@@ -0,0 +1,50 @@
+import pytest
+
+from dedup import EditionIndex, item_key, normalize_url, title_fingerprint
+
+
+class TestNormalizeUrl:
+    @pytest.mark.parametrize("url", [
+        "https://support.example.com/tickets/123",
+        "http://Support.Example.com/tickets/123/",
+        "https://www.support.example.com:443/tickets/123#comment-4",
+        "https://support.example.com/tickets/123?utm_source=mail&fbclid=x",
+        "support.example.com/tickets/123",
+    ])
+    def test_variants_of_one_ticket(self, url):
+        assert normalize_url(url) == "https://support.example.com/tickets/123"
+
+    def test_keeps_identifying_query_sorted(self):
+        assert normalize_url("https://t.example.com/view?b=2&id=9&utm_medium=x") == "https://t.example.com/view?b=2&id=9"
+
+    def test_missing(self):
+        assert normalize_url(None) == normalize_url("  ") == ""
+
+
+class TestTitleFingerprint:
+    def test_ignores_case_accents_punctuation_and_spacing(self):
+        assert title_fingerprint("  Café login — TIMEOUT!! ") == title_fingerprint("cafe login timeout")
+
+    def test_different_titles_differ(self):
+        assert title_fingerprint("Login timeout") != title_fingerprint("Logout timeout")
+
+
+class TestEditionIndex:
+    def test_merges_repeats_and_combines_customers(self):
+        index = EditionIndex()
+        first = {"title": "Login timeout", "ticket_url": "https://s.example.com/1", "customer": "Acme", "summary": ""}
+        again = {"title": "login timeout.", "ticket_url": "http://s.example.com/1/", "customer": "Beta, acme", "summary": "Fixed"}
+        assert index.add(first) is True
+        assert index.add(again) is False
+        assert first["customer"] == "Acme, Beta"
+        assert first["summary"] == "Fixed"
+        assert (len(index), index.merged) == (1, 1)
+
+    def test_same_ticket_different_title_is_kept(self):
+        index = EditionIndex()
+        assert index.add({"title": "Login timeout", "ticket_url": "https://s.example.com/1"})
+        assert index.add({"title": "Login fixed", "ticket_url": "https://s.example.com/1"})
+
+    def test_item_key_is_stable(self):
+        item = {"title": "Login timeout", "ticket_url": "https://s.example.com/1"}
+        assert item_key(item) == item_key(dict(item)) and len(item_key(item)) == 24
@@ -0,0 +1,174 @@
+import asyncio
+import gzip
+import json
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import artifacts
+import jobs
+from artifacts import ArtifactStore, router as artifact_router
+from editions import router, upload_suffix
+from formatter import Formatter
+
+CSV = (
+    "ticket_type,topic_domain,title,customer,summary,link,add_to_edition\n"
+    "Issue,Auth,Login Bug,Acme,Users cannot login,https://support.example.com/tickets/1,true\n"
+    "Win,Reports,Faster reports,Beta,Reports load 3x faster,https://support.example.com/tickets/2,true\n"
+)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(jobs, "_default_queue", jobs.JobQueue(workers=1, max_queued=4))
+    monkeypatch.setattr(artifacts, "_default_store", ArtifactStore())
+    app = FastAPI()
+    app.include_router(router)
+    app.include_router(artifact_router)
+    # One client for the whole test, so the job queue's workers keep one event loop.
+    with TestClient(app) as client:
+        yield client
+
+
+def _wait_for(client, location, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        body = client.get(location).json()
+        if body["status"] in ("succeeded", "failed"):
+            return body
+        time.sleep(0.02)
+    raise AssertionError("press job did not finish")
+
+
+class TestUploadSuffix:
+    @pytest.mark.parametrize("content_type, encoding, fmt, expected", [
+        ("text/csv; charset=utf-8", None, None, ".csv"),
+        ("application/json", "gzip", None, ".json.gz"),
+        ("application/x-ndjson", "zstd", None, ".jsonl.zst"),
+        ("application/octet-stream", None, "jsonl", ".jsonl"),
+    ])
+    def test_suffixes(self, content_type, encoding, fmt, expected):
+        assert upload_suffix(content_type, encoding, fmt) == expected
+
+    def test_unsupported(self):
+        from fastapi import HTTPException
+        with pytest.raises(HTTPException) as error:
+            upload_suffix("application/pdf", None)
+        assert error.value.status_code == 415
+        with pytest.raises(HTTPException):
+            upload_suffix("text/csv", "br")
+
+
+class TestEditionsApi:
+    def test_press_csv_and_fetch_artifacts(self, client):
+        response = client.post("/editions?publish_date=2025-03-15", content=CSV, headers={"Content-Type": "text/csv"})
+        assert response.status_code == 202
+        location = response.headers["location"]
+        assert location == f"/editions/{response.json()['id']}"
+
+        edition = _wait_for(client, location)
+        assert edition["status"] == "succeeded"
+        assert edition["publish_date"] == "2025-03-15"
+        suffixes = sorted(artifact["name"].rsplit(".", 1)[1] for artifact in edition["artifacts"])
+        assert suffixes == ["html", "jsonl", "md"]
+        html_href = next(a["href"] for a in edition["artifacts"] if a["name"].endswith(".html"))
+        assert "Login Bug" in client.get(html_href).text
+
+    def test_artifacts_download_from_another_worker(self, client, monkeypatch, tmp_path):
+        from state import SQLiteStateStore
+        state = SQLiteStateStore(str(tmp_path / "state.sqlite3"))
+        monkeypatch.setattr(artifacts, "_default_store", ArtifactStore(state=state))
+        response = client.post("/editions?publish_date=2025-03-15", content=CSV, headers={"Content-Type": "text/csv"})
+        edition = _wait_for(client, response.headers["location"])
+        html_href = next(a["href"] for a in edition["artifacts"] if a["name"].endswith(".html"))
+
+        # Another worker's store holds none of the job's artifacts.
+        monkeypatch.setattr(artifacts, "_default_store", ArtifactStore(state=state))
+        response = client.get(html_href, headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert "Login Bug" in response.text
+        state.close()
+
+    def test_gzip_jsonl_body(self, client):
+        rows = [
+            {"type": "Issue", "include": True, "title": "Login Bug", "customer": "Acme",
+             "topic_domain": "Auth", "summary": "Users cannot login", "url": ""},
+        ]
+        body = gzip.compress("".join(json.dumps(row) + "\n" for row in rows).encode("utf-8"))
+        response = client.post(
+            "/editions", content=body,
+            headers={"Content-Type": "application/x-ndjson", "Content-Encoding": "gzip"},
+        )
+        edition = _wait_for(client, response.headers["location"])
+        assert edition["status"] == "succeeded"
+
+    def test_invalid_content_fails_the_job(self, client):
+        response = client.post("/editions", content="[1, 2", headers={"Content-Type": "application/json"})
+        edition = _wait_for(client, response.headers["location"])
+        assert edition["status"] == "failed"
+        assert "artifacts" not in edition
+
+    def test_streams_html(self, client):
+        with client.stream("POST", "/editions?stream=true&publish_date=2025-03-15", content=CSV,
+                           headers={"Content-Type": "text/csv"}) as response:
+            assert response.status_code == 200
+            assert response.headers["content-type"] == "text/html; charset=utf-8"
+            html = "".join(response.iter_text())
+        assert "Login Bug" in html and "Faster reports" in html
+        assert html.rstrip().endswith("</html>")
+
+    def test_streamed_html_matches_published_html(self, client):
+        streamed = client.post("/editions?stream=true&publish_date=2025-03-15", content=CSV,
+                               headers={"Content-Type": "text/csv"}).text
+        location = client.post("/editions?publish_date=2025-03-15", content=CSV,
+                               headers={"Content-Type": "text/csv"}).headers["location"]
+        edition = _wait_for(client, location)
+        html_href = next(a["href"] for a in edition["artifacts"] if a["name"].endswith(".html"))
+        assert client.get(html_href).text == streamed
+
+    async def test_closed_stream_stops_rendering(self, monkeypatch):
+        import editions
+        from starlette.requests import Request
+
+        monkeypatch.setattr(jobs, "_default_queue", jobs.JobQueue(workers=1, max_queued=4))
+        monkeypatch.setattr(editions, "STREAM_BUFFER_SECTIONS", 1)
+        rendered = []
+        iter_html = Formatter.iter_html
+
+        def counting_iter_html(self):
+            for chunk in iter_html(self):
+                rendered.append(chunk)
+                yield chunk
+
+        monkeypatch.setattr(Formatter, "iter_html", counting_iter_html)
+
+        async def receive():
+            return {"type": "http.request", "body": CSV.encode(), "more_body": False}
+
+        request = Request({"type": "http", "method": "POST", "path": "/editions", "query_string": b"",
+                           "headers": [(b"content-type", b"text/csv")]}, receive)
+        response = await editions.create_edition(request, publish_date="2025-03-15", stream=True)
+        job = jobs.get_job_queue().get(response.headers["x-edition-job"])
+        body = response.body_iterator
+        await body.__anext__()
+        await asyncio.sleep(0.2)
+        # One section sent, one buffered and one waiting to be queued: the client sets the pace.
+        assert len(rendered) == 3
+        await body.aclose()
+        assert await job.wait(1)
+        assert job.error == "cancelled"
+        assert len(rendered) == 3
+        await jobs.get_job_queue().shutdown()
+
+    def test_rejections(self, client, monkeypatch):
+        assert client.post("/editions", content=CSV, headers={"Content-Type": "application/pdf"}).status_code == 415
+        assert client.post("/editions", content="", headers={"Content-Type": "text/csv"}).status_code == 400
+        assert client.post("/editions?publish_date=15/03/2025", content=CSV,
+                           headers={"Content-Type": "text/csv"}).status_code == 422
+        monkeypatch.setenv("SUPPORTMAIL_API_MAX_BYTES", "10")
+        assert client.post("/editions", content=CSV, headers={"Content-Type": "text/csv"}).status_code == 413
+
+    def test_unknown_edition(self, client):
+        assert client.get("/editions/deadbeef").status_code == 404
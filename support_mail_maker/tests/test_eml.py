@@ -0,0 +1,68 @@
+import email
+from datetime import datetime, timezone
+from email import policy
+from unittest.mock import patch
+
+import pytest
+
+import eml
+from assets import CDN_BASE_URL, AssetStore
+from eml import iter_eml
+
+
+def _parse(chunks):
+    return email.message_from_bytes(b"".join(chunks), policy=policy.default)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return AssetStore(cache_dir=str(tmp_path / "cache"))
+
+
+class TestIterEml:
+    def test_alternative_parts_round_trip(self):
+        message = _parse(iter_eml("<p>Café ✅</p>", "Café ✅", subject="SupportMail — February 2026",
+                                  sender="support@example.com", recipients="all@example.com",
+                                  date=datetime(2026, 2, 9, tzinfo=timezone.utc)))
+        assert message.get_content_type() == "multipart/alternative"
+        assert message["Subject"] == "SupportMail — February 2026"
+        assert message["From"] == "support@example.com"
+        assert message["To"] == "all@example.com"
+        assert message["X-Unsent"] == "1"
+        assert message["Date"] == "Mon, 09 Feb 2026 00:00:00 +0000"
+        text, html = message.get_payload()
+        assert (text.get_content_type(), text.get_content()) == ("text/plain", "Café ✅")
+        assert (html.get_content_type(), html.get_content()) == ("text/html", "<p>Café ✅</p>")
+
+    def test_addresses_default_from_environment(self, monkeypatch):
+        monkeypatch.setenv("SUPPORTMAIL_EML_FROM", "press@example.com")
+        monkeypatch.delenv("SUPPORTMAIL_EML_TO", raising=False)
+        message = _parse(iter_eml("<p>x</p>", "x"))
+        assert message["From"] == "press@example.com"
+        assert message["To"] is None
+
+    def test_inline_images_in_related_part(self, store):
+        html, images = store.embed(f'<img src="{CDN_BASE_URL}section_header_wins.png">', mode="cid")
+        message = _parse(iter_eml(html, "wins", assets=images))
+        _, related = message.get_payload()
+        assert related.get_content_type() == "multipart/related"
+        body, image = related.get_payload()
+        assert f'src="cid:{images[0].cid}"' in body.get_content()
+        assert image["Content-ID"] == f"<{images[0].cid}>"
+        assert image.get_content_disposition() == "inline"
+        assert image.get_content() == images[0].data
+
+    @pytest.mark.parametrize("slice_chars", [1, 7, 57, 100])
+    def test_body_encoded_across_slices(self, slice_chars):
+        text = "Ünïcödé ✅ tickets\n" * 50
+        with patch.object(eml, "_SLICE_CHARS", slice_chars):
+            chunks = list(iter_eml(f"<pre>{text}</pre>", text))
+        message = _parse(chunks)
+        assert message.get_payload()[0].get_content() == text
+        lines = b"".join(chunks).split(b"\r\n")
+        assert all(len(line) <= 998 for line in lines)
+
+    def test_streams_in_bounded_chunks(self):
+        text = "x" * (eml._SLICE_CHARS * 4)
+        chunks = list(iter_eml(text, text))
+        assert max(len(chunk) for chunk in chunks) < eml._SLICE_CHARS * 2
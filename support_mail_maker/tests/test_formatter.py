@@ -1,3 +1,6 @@
+import asyncio
+import time
+
 import pytest
 from datetime import datetime
 from unittest.mock import patch, AsyncMock, MagicMock
@@ -319,6 +322,48 @@ class TestFormatterSaveToFile:
         assert path.endswith(".txt")
 
 
+    async def test_save_to_file_accepts_chunks(self, formatter, tmp_path):
+        with patch("formatter.pathlib.Path.cwd", return_value=tmp_path):
+            path = await Formatter.save_to_file("test_output", iter(["a", "b", "c"]), file_ext="txt")
+        with open(path) as f:
+            assert f.read() == "abc"
+
+
+class TestFormatterJsonlExport:
+    async def test_one_line_per_collated_item(self, formatter, raw_content_data):
+        formatter.set_raw_content(raw_content_data)
+        await formatter.collate_content()
+        lines = list(formatter.iter_jsonl_lines())
+        assert len(lines) == 4
+        assert all(line.endswith("\n") for line in lines)
+
+    async def test_lines_carry_item_and_publish_date(self, formatter, raw_content_data):
+        import json
+        formatter.set_raw_content(raw_content_data)
+        await formatter.collate_content()
+        records = [json.loads(line) for line in formatter.iter_jsonl_lines()]
+        assert [r["item_type"] for r in records] == ["Issue", "Oops", "Win", "News"]
+        assert records[0]["publish_date"] == "2025-03-15"
+        assert records[0]["title"] == "Login timeout on SSO"
+        assert records[0]["domain"] == "Authentication"
+
+    async def test_export_round_trips_through_ingest(self, formatter, raw_content_data):
+        from ingest import iter_jsonl_rows
+        formatter.set_raw_content(raw_content_data)
+        await formatter.collate_content()
+        rows = list(iter_jsonl_rows(formatter.iter_jsonl_lines()))
+        assert [r["title"] for r in rows] == [
+            "Login timeout on SSO",
+            "Incorrect billing calculation",
+            "Reduced response time",
+            "New API endpoint launched",
+        ]
+        assert rows[0]["topic_domain"] == "Authentication"
+
+    def test_empty_edition_exports_nothing(self, formatter):
+        assert list(formatter.iter_jsonl_lines()) == []
+
+
 class TestFormatterSendToPress:
     async def test_send_to_press_returns_false_without_publish_date(self, formatter):
         formatter.context["publish_date"] = None
@@ -375,3 +420,395 @@ class TestFormatterSendToPress:
             result = await formatter.send_to_press_async()
             assert result is False
             mock_publish.assert_not_awaited()
+
+
+    async def test_ready_to_press_collates_without_publishing(self, formatter, raw_content_data):
+        formatter.set_raw_content(raw_content_data)
+        with patch.object(formatter, "publish_async", new_callable=AsyncMock) as mock_publish:
+            assert await formatter.ready_to_press_async() is True
+            mock_publish.assert_not_awaited()
+
+
+class TestFormatterInlineStyles:
+    def test_off_by_default(self, monkeypatch):
+        monkeypatch.delenv("SUPPORTMAIL_INLINE_CSS", raising=False)
+        assert Formatter(publish_date="2025-03-15").inline_styles is False
+
+    def test_enabled_from_environment(self, monkeypatch):
+        monkeypatch.setenv("SUPPORTMAIL_INLINE_CSS", "true")
+        assert Formatter(publish_date="2025-03-15").inline_styles is True
+
+    async def test_publish_writes_inlined_html(self, raw_content_data, tmp_path):
+        formatter = Formatter(publish_date="2025-03-15", inline_styles=True, storage="local")
+        formatter.set_raw_content(raw_content_data)
+        await formatter.collate_content()
+        with patch("formatter.pathlib.Path.cwd", return_value=tmp_path):
+            await formatter.publish_async()
+        html = next(tmp_path.glob("*.html")).read_text(encoding="utf-8")
+        assert '<dd class="issue-title" style="' in html
+        assert "margin: 0 0 12px 0;" not in html[:html.index("</head>")]
+
+
+class TestFormatterEmbedImages:
+    async def test_publish_embeds_bundled_images(self, raw_content_data, tmp_path, monkeypatch):
+        monkeypatch.setenv("SUPPORTMAIL_ASSET_CACHE", str(tmp_path / "cache"))
+        formatter = Formatter(publish_date="2025-03-15", embed_images=True, storage="local")
+        formatter.set_raw_content(raw_content_data)
+        await formatter.collate_content()
+        with patch("formatter.pathlib.Path.cwd", return_value=tmp_path):
+            await formatter.publish_async()
+        html = next(tmp_path.glob("*.html")).read_text(encoding="utf-8")
+        assert 'src="data:image/png;base64,' in html
+        assert "section_header_issues.png" not in html
+        assert "section_header_trends.png" in html
+
+
+class TestFormatterEml:
+    async def test_publish_adds_eml_draft(self, raw_content_data, tmp_path, monkeypatch):
+        import email
+        from email import policy
+        monkeypatch.setenv("SUPPORTMAIL_ASSET_CACHE", str(tmp_path / "cache"))
+        formatter = Formatter(publish_date="2025-03-15", emit_eml=True, storage="local")
+        formatter.set_raw_content(raw_content_data)
+        await formatter.collate_content()
+        with patch("formatter.pathlib.Path.cwd", return_value=tmp_path):
+            await formatter.publish_async()
+        with open(next(tmp_path.glob("*.eml")), "rb") as eml_file:
+            message = email.message_from_binary_file(eml_file, policy=policy.default)
+        assert message["Subject"] == "SupportMail — February 2025"
+        html = message.get_body(preferencelist=("html",)).get_content()
+        assert "Login timeout on SSO" in html
+        assert 'src="cid:' in html
+        assert "Login timeout on SSO" in message.get_body(preferencelist=("plain",)).get_content()
+
+    def test_off_by_default(self, monkeypatch):
+        monkeypatch.delenv("SUPPORTMAIL_EML", raising=False)
+        assert Formatter(publish_date="2025-03-15").emit_eml is False
+
+
+class TestFormatterArtifacts:
+    async def test_publish_keeps_artifacts_in_memory(self, raw_content_data, tmp_path, monkeypatch):
+        monkeypatch.delenv("SUPPORTMAIL_STORAGE", raising=False)
+        formatter = Formatter(publish_date="2025-03-15")
+        formatter.set_raw_content(raw_content_data)
+        await formatter.collate_content()
+        with patch("formatter.pathlib.Path.cwd", return_value=tmp_path):
+            download_file, download_links, *_ = await formatter.publish_async()
+        assert list(tmp_path.iterdir()) == []
+        assert [a.name.rsplit(".", 1)[1] for a in formatter.artifacts] == ["html", "md", "jsonl"]
+        assert "Login timeout on SSO" in formatter.artifacts[0].read().decode("utf-8")
+        assert all(a.href in download_links.value for a in formatter.artifacts)
+        assert download_file.visible is False
+
+    async def test_local_storage_writes_stored_bytes(self, raw_content_data, tmp_path):
+        formatter = Formatter(publish_date="2025-03-15", storage="local")
+        formatter.set_raw_content(raw_content_data)
+        await formatter.collate_content()
+        with patch("formatter.pathlib.Path.cwd", return_value=tmp_path):
+            download_file, *_ = await formatter.publish_async()
+        for artifact, url in zip(formatter.artifacts, formatter.artifact_urls):
+            assert url == (tmp_path / artifact.name).as_uri()
+            assert (tmp_path / artifact.name).read_bytes() == artifact.read()
+        assert len(download_file.value) == 3
+
+    async def test_publish_archives_items(self, raw_content_data, tmp_path):
+        formatter = Formatter(publish_date="2025-03-15", archive=str(tmp_path / "archive.sqlite3"))
+        formatter.set_raw_content(raw_content_data)
+        await formatter.collate_content()
+        await formatter.publish_async()
+        (edition,) = formatter.archive.editions()
+        assert edition["publish_date"] == "2025-03-15"
+        assert edition["item_count"] == sum(len(formatter.get_items(s)) for s in ("issues", "oops", "wins", "news"))
+        assert formatter.archive.search("SSO")[0]["title"] == "Login timeout on SSO"
+
+    async def test_send_to_press_publishes_once(self, formatter, raw_content_data):
+        formatter.set_raw_content(raw_content_data)
+        with patch.object(formatter, "publish_async", new_callable=AsyncMock, return_value=["update"]) as mock_publish:
+            assert await formatter.send_to_press_async() is True
+        mock_publish.assert_awaited_once()
+        assert formatter.published == ["update"]
+
+
+class TestFormatterDedup:
+    @staticmethod
+    def _row(title, url, customer="Acme", type="Issue"):
+        return {"title": title, "topic_domain": "Auth", "summary": "Summary", "customer": customer,
+                "type": type, "url": url, "include": True}
+
+    async def test_repeats_within_edition_are_merged(self):
+        formatter = Formatter(publish_date="2025-03-15", dedup="edition")
+        formatter.set_raw_content([
+            self._row("Login timeout", "https://s.example.com/1", "Acme"),
+            self._row("Login Timeout", "http://s.example.com/1/", "Beta"),
+            self._row("Invoices wrong", "https://s.example.com/2", type="Oops"),
+        ])
+        await formatter.collate_content()
+        assert [i["customer"] for i in formatter.get_items("issues")] == ["Acme, Beta"]
+        assert formatter.dedup_report.merged == 1
+
+    async def test_items_from_earlier_editions_are_flagged(self, tmp_path):
+        from archive import EditionArchive
+        archive = EditionArchive(str(tmp_path / "archive.sqlite3"))
+        archive.record_edition("2025-02-15", [{"title": "Login timeout", "ticket_url": "https://s.example.com/1",
+                                                "item_type": "Issue", "customer": "Acme"}])
+        rows = [self._row("Login timeout", "https://s.example.com/1"), self._row("New thing", "https://s.example.com/3")]
+
+        formatter = Formatter(publish_date="2025-03-15", archive=archive, dedup="archive")
+        formatter.set_raw_content(rows)
+        await formatter.collate_content()
+        assert [i["title"] for i in formatter.get_items("issues")] == ["New thing"]
+        (flagged,) = formatter.dedup_report.flagged
+        assert (flagged["title"], flagged["previous_publish_date"]) == ("Login timeout", "2025-02-15")
+
+        # Re-pressing the earlier edition itself flags nothing.
+        repress = Formatter(publish_date="2025-02-15", archive=archive, dedup="archive")
+        repress.set_raw_content(rows)
+        await repress.collate_content()
+        assert len(repress.get_items("issues")) == 2
+
+    async def test_repress_on_a_later_day_keeps_every_item(self, tmp_path):
+        from archive import EditionArchive
+        archive = EditionArchive(str(tmp_path / "archive.sqlite3"))
+        rows = [self._row("Login timeout", "https://s.example.com/1"), self._row("New thing", "https://s.example.com/3")]
+        for publish_date in ("2026-02-09", "2026-02-10"):
+            formatter = Formatter(publish_date=publish_date, archive=archive, dedup="archive")
+            formatter.set_raw_content(rows)
+            await formatter.collate_content()
+            assert len(formatter.get_items("issues")) == 2
+            assert formatter.dedup_report.flagged == []
+            await formatter.archive_edition()
+        assert [(e["publish_date"], e["item_count"]) for e in archive.editions()] == [("2026-02-10", 2)]
+
+    def test_default_mode_is_edition(self, monkeypatch):
+        monkeypatch.delenv("SUPPORTMAIL_DEDUP", raising=False)
+        assert Formatter(publish_date="2025-03-15").dedup == "edition"
+
+    async def test_off_keeps_everything(self):
+        formatter = Formatter(publish_date="2025-03-15", dedup="off")
+        formatter.set_raw_content([self._row("Login timeout", "https://s.example.com/1")] * 2)
+        await formatter.collate_content()
+        assert len(formatter.get_items("issues")) == 2
+
+    def test_unknown_mode(self):
+        with pytest.raises(ValueError, match="dedup"):
+            Formatter(publish_date="2025-03-15", dedup="fuzzy")
+
+
+class TestFormatterSizeBudget:
+    @staticmethod
+    async def _edition(count=60, summary="A summary long enough to matter. " * 10, **kwargs):
+        formatter = Formatter(publish_date="2025-03-15", **kwargs)
+        formatter.set_raw_content([
+            {
+                "title": f"Item {i:03d}",
+                "topic_domain": f"Domain {i % 4}",
+                "summary": summary,
+                "customer": "Acme",
+                "type": ("Issue", "Oops", "Win", "News")[i % 4],
+                "url": f"https://support.example.com/{i}",
+                "include": True,
+            }
+            for i in range(count)
+        ])
+        await formatter.collate_content()
+        return formatter
+
+    @staticmethod
+    def _titles(html):
+        import re
+        return re.findall(r"Item \d{3}", html)
+
+    async def test_within_budget_matches_full_render(self):
+        from django.template.loader import render_to_string
+        formatter = await self._edition()
+        assert formatter.render_parts() == [("", render_to_string("support_mail_template.html", formatter.context))]
+
+    async def test_iter_html_matches_full_render(self):
+        from django.template.loader import render_to_string
+        formatter = await self._edition()
+        chunks = list(formatter.iter_html())
+        assert len(chunks) == 6
+        assert "".join(chunks) == render_to_string("support_mail_template.html", formatter.context)
+
+    async def test_split_into_numbered_parts_within_budget(self):
+        formatter = await self._edition(size_budget=20_000)
+        parts = formatter.render_parts()
+        assert [suffix for suffix, _ in parts] == [f"_part{n}" for n in range(1, len(parts) + 1)]
+        assert len(parts) > 1
+        assert all(len(html.encode("utf-8")) <= 20_000 for _, html in parts)
+        assert f"Part 1 of {len(parts)}" in parts[0][1]
+        titles = [title for _, html in parts for title in self._titles(html)]
+        expected = [item["title"] for section in ("issues", "oops", "wins", "news") for item in formatter.get_items(section)]
+        assert titles == expected
+
+    async def test_whole_document_rendered_once_when_splitting(self):
+        formatter = await self._edition(size_budget=20_000)
+        with patch.object(formatter.renderer, "render", wraps=formatter.renderer.render) as render:
+            formatter.render_parts()
+        templates = [call.args[0] for call in render.call_args_list]
+        assert templates.count("support_mail_template.html") == 1
+
+    async def test_appendix_collects_overflow(self):
+        formatter = await self._edition(size_budget=20_000, overflow="appendix")
+        (main_suffix, main), (appendix_suffix, appendix) = formatter.render_parts(appendix_href="edition_appendix.html")
+        assert (main_suffix, appendix_suffix) == ("", "_appendix")
+        assert len(main.encode("utf-8")) <= 20_000
+        moved = self._titles(appendix)
+        assert f'{len(moved)} more item(s) are in the <a href="edition_appendix.html">appendix</a>' in main
+        assert sorted(self._titles(main) + moved) == [f"Item {i:03d}" for i in range(60)]
+
+    async def test_oversized_item_gets_its_own_part(self):
+        formatter = await self._edition(count=3, summary="x" * 3_000, size_budget=9_000)
+        parts = formatter.render_parts()
+        assert len(parts) == 3
+        assert sorted(t for _, html in parts for t in self._titles(html)) == ["Item 000", "Item 001", "Item 002"]
+
+    async def test_publish_writes_each_part(self, tmp_path):
+        formatter = await self._edition(size_budget=20_000, storage="local")
+        with patch("formatter.pathlib.Path.cwd", return_value=tmp_path):
+            await formatter.publish_async()
+        assert len(list(tmp_path.glob("*_part*.html"))) == len(list(tmp_path.glob("*_part*.md"))) > 1
+        assert len(list(tmp_path.glob("*.jsonl"))) == 1
+
+    def test_budget_from_environment(self, monkeypatch):
+        monkeypatch.setenv("SUPPORTMAIL_SIZE_BUDGET", "50000")
+        monkeypatch.setenv("SUPPORTMAIL_OVERFLOW", "appendix")
+        formatter = Formatter(publish_date="2025-03-15")
+        assert (formatter.size_budget, formatter.overflow) == (50_000, "appendix")
+
+    def test_unknown_overflow_mode(self):
+        with pytest.raises(ValueError, match="overflow"):
+            Formatter(publish_date="2025-03-15", overflow="truncate")
+
+
+class TestFormatterStreamRender:
+    @staticmethod
+    async def _edition(count=60, **kwargs):
+        return await TestFormatterSizeBudget._edition(count=count, **kwargs)
+
+    def test_on_by_default(self, monkeypatch):
+        monkeypatch.delenv("SUPPORTMAIL_STREAM_RENDER", raising=False)
+        assert Formatter(publish_date="2025-03-15").streams_render is True
+
+    def test_disabled_from_environment(self, monkeypatch):
+        monkeypatch.setenv("SUPPORTMAIL_STREAM_RENDER", "false")
+        assert Formatter(publish_date="2025-03-15").streams_render is False
+
+    @pytest.mark.parametrize("option", [
+        {"size_budget": 100_000}, {"inline_styles": True}, {"embed_images": True}, {"emit_eml": True},
+    ])
+    def test_whole_document_options_render_whole(self, option):
+        assert Formatter(publish_date="2025-03-15", stream_render=True, **option).streams_render is False
+
+    @pytest.mark.parametrize("count", [0, 1, 60])
+    async def test_iter_markdown_matches_whole_conversion(self, count):
+        from formatter import iter_markdown, md
+        formatter = await self._edition(count=count)
+        chunks = list(formatter.iter_html())
+        assert "".join(iter_markdown(chunks)) == md("".join(chunks))
+
+    async def test_streamed_artifacts_match_whole_render(self):
+        streamed = await self._edition(stream_render=True)
+        whole = await self._edition(stream_render=False)
+        await streamed.publish_async()
+        await whole.publish_async()
+        assert [a.name for a in streamed.artifacts] == [a.name for a in whole.artifacts]
+        assert [a.read() for a in streamed.artifacts] == [a.read() for a in whole.artifacts]
+
+    @pytest.mark.parametrize("stream_render", [True, False])
+    async def test_markdown_can_be_left_out(self, stream_render):
+        formatter = await self._edition(stream_render=stream_render, include_markdown=False)
+        await formatter.publish_async()
+        assert [a.name.rsplit(".", 1)[1] for a in formatter.artifacts] == ["html", "jsonl"]
+        with_markdown = await self._edition(stream_render=stream_render)
+        await with_markdown.publish_async()
+        assert formatter.artifacts[0].read() == with_markdown.artifacts[0].read()
+
+    async def test_streamed_publish_renders_a_section_at_a_time(self):
+        formatter = await self._edition(stream_render=True)
+        with patch.object(formatter, "render_parts") as render_parts:
+            await formatter.publish_async()
+        render_parts.assert_not_called()
+        assert [a.name.rsplit(".", 1)[1] for a in formatter.artifacts] == ["html", "md", "jsonl"]
+
+    async def test_streamed_peak_memory_is_below_whole_render(self):
+        import tracemalloc
+        peaks = {}
+        for stream_render in (True, False):
+            formatter = await self._edition(count=400, summary="A long summary. " * 100, stream_render=stream_render)
+            tracemalloc.start()
+            await formatter.publish_async()
+            peaks[stream_render] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        assert peaks[True] < peaks[False] / 2
+
+
+class TestFormatterEventLoop:
+    @pytest.mark.parametrize("stream_render", [True, False])
+    async def test_event_loop_stays_free_during_a_press(self, stream_render):
+        formatter = await TestFormatterSizeBudget._edition(count=20, stream_render=stream_render)
+        render = formatter.renderer.render
+
+        def slow_render(*args, **kwargs):
+            time.sleep(0.05)
+            return render(*args, **kwargs)
+
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        with patch.object(formatter.renderer, "render", side_effect=slow_render):
+            await formatter.publish_async()
+        ticker.cancel()
+        # Five renders block for 0.25s; on the event loop the ticker would barely run.
+        assert ticks >= 20
+
+
+class TestFormatterParallelRender:
+    @pytest.fixture(autouse=True)
+    def shutdown_pools(self):
+        import renderers
+        yield
+        renderers.shutdown_render_pools()
+
+    @staticmethod
+    async def _edition(count=60, **kwargs):
+        return await TestFormatterSizeBudget._edition(count=count, **kwargs)
+
+    def test_off_by_default(self, monkeypatch):
+        monkeypatch.delenv("SUPPORTMAIL_RENDER_WORKERS", raising=False)
+        assert Formatter(publish_date="2025-03-15").render_workers == 0
+
+    async def test_only_render_workers_turn_it_on(self):
+        assert (await self._edition(count=1, render_workers=1)).renders_in_parallel is False
+        assert (await self._edition(count=1, render_workers=2)).renders_in_parallel is True
+
+    async def test_unshared_renderer_renders_serially(self, tmp_path):
+        from renderers import Jinja2Renderer
+        formatter = await self._edition(render_workers=2, renderer=Jinja2Renderer(cache_dir=str(tmp_path)))
+        assert formatter.renders_in_parallel is False
+
+    @pytest.mark.parametrize("renderer", ["django", "jinja2"])
+    async def test_identical_to_serial_render(self, renderer):
+        parallel = await self._edition(render_workers=2, renderer=renderer)
+        serial = await self._edition(render_workers=0, renderer=renderer)
+        with patch.object(parallel, "render_section", side_effect=AssertionError("rendered serially")):
+            chunks = list(parallel.iter_html())
+        assert chunks == list(serial.iter_html())
+
+    async def test_split_parts_identical_to_serial(self):
+        parallel = await self._edition(size_budget=20_000, render_workers=2)
+        serial = await self._edition(size_budget=20_000, render_workers=0)
+        assert parallel.render_parts() == serial.render_parts()
+
+    async def test_published_artifacts_identical_to_serial(self):
+        parallel = await self._edition(render_workers=2)
+        serial = await self._edition(render_workers=0)
+        await parallel.publish_async()
+        await serial.publish_async()
+        assert [a.read() for a in parallel.artifacts] == [a.read() for a in serial.artifacts]
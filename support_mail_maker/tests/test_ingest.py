@@ -0,0 +1,633 @@
+import io
+import json
+import os
+import tempfile
+import types
+
+import pytest
+from unittest.mock import patch, AsyncMock
+
+import ingest
+from ingest import iter_json_rows, iter_jsonl_rows, iter_upload_rows, normalize_row, CSV_COLUMN_ALIASES
+
+
+@pytest.fixture(params=["streaming", "buffered"])
+def json_backend(request):
+    """Run each JSON test against both the ijson and the fallback decoder."""
+    if request.param == "streaming":
+        if ingest.ijson is None:
+            pytest.skip("ijson is not installed")
+        yield
+    else:
+        with patch.object(ingest, "ijson", None):
+            yield
+
+
+@pytest.fixture
+def schema_edition():
+    return {
+        "publish_date": "2025-03-15",
+        "content": {
+            "issues": [
+                {
+                    "title": "Login timeout",
+                    "domain": "Authentication",
+                    "customer": "Acme Corp",
+                    "summary": "Users experience timeout.",
+                    "item_type": "Issue",
+                    "ticket_url": "https://support.example.com/tickets/1",
+                }
+            ],
+            "oops": [],
+            "wins": [
+                {
+                    "title": "Faster reports",
+                    "domain": "Reports",
+                    "customer": "Beta Inc",
+                    "summary": "Reports load 3x faster.",
+                }
+            ],
+            "news": [],
+        },
+    }
+
+
+@pytest.fixture
+def flat_rows():
+    return [
+        {
+            "ticket_type": "Issue",
+            "add_to_edition?": "TRUE",
+            "customer": "Acme Corp",
+            "link": "https://support.example.com/tickets/100",
+            "Topic/Domain": "Authentication",
+            "title": "Login timeout on SSO",
+            "subject matter/summary": "Users experience timeout.",
+            "owner": "Jane Doe",
+        },
+        {
+            "type": "News",
+            "include": False,
+            "customer": "All Customers",
+            "url": "",
+            "topic_domain": "Platform",
+            "title": "Skipped",
+            "summary": "Not in this edition.",
+        },
+    ]
+
+
+class TestNormalizeRow:
+    def test_schema_item_keys_are_aliases(self):
+        row = normalize_row({"item_type": "Win", "domain": "Reports", "ticket_url": "https://x"})
+        assert row["type"] == "Win"
+        assert row["topic_domain"] == "Reports"
+        assert row["url"] == "https://x"
+
+    def test_output_only_contains_internal_keys(self):
+        row = normalize_row({"title": "T", "owner": "Jane"})
+        assert set(row) == set(CSV_COLUMN_ALIASES)
+
+
+class TestIterJsonRows:
+    def test_returns_lazy_iterator(self, json_backend, flat_rows):
+        rows = iter_json_rows(json.dumps(flat_rows))
+        assert isinstance(rows, types.GeneratorType)
+
+    def test_flat_array_of_rows(self, json_backend, flat_rows):
+        rows = list(iter_json_rows(json.dumps(flat_rows)))
+        assert len(rows) == 2
+        assert rows[0]["type"] == "Issue"
+        assert rows[0]["include"] is True
+        assert rows[0]["topic_domain"] == "Authentication"
+        assert rows[0]["url"] == "https://support.example.com/tickets/100"
+        assert rows[1]["type"] == "News"
+        assert rows[1]["include"] is False
+
+    def test_schema_shaped_edition(self, json_backend, schema_edition):
+        rows = list(iter_json_rows(json.dumps(schema_edition)))
+        assert [r["title"] for r in rows] == ["Login timeout", "Faster reports"]
+        assert all(r["include"] is True for r in rows)
+        assert rows[0]["url"] == "https://support.example.com/tickets/1"
+
+    def test_section_supplies_missing_item_type(self, json_backend, schema_edition):
+        rows = list(iter_json_rows(json.dumps(schema_edition)))
+        assert rows[1]["type"] == "Win"
+
+    def test_explicit_include_in_section_is_respected(self, json_backend, schema_edition):
+        schema_edition["content"]["wins"][0]["include"] = "false"
+        rows = list(iter_json_rows(json.dumps(schema_edition)))
+        assert rows[1]["include"] is False
+
+    def test_placeholder_document_yields_nothing(self, json_backend):
+        from app import PLACEHOLDER_JSON
+        assert list(iter_json_rows(PLACEHOLDER_JSON)) == []
+
+    def test_accepts_binary_file_object(self, json_backend, flat_rows):
+        rows = list(iter_json_rows(io.BytesIO(json.dumps(flat_rows).encode("utf-8"))))
+        assert len(rows) == 2
+
+    def test_non_object_rows_are_skipped(self, json_backend, flat_rows):
+        rows = list(iter_json_rows(json.dumps([flat_rows[0], 42, "text"])))
+        assert len(rows) == 1
+
+    def test_nested_values_survive(self, json_backend, flat_rows):
+        flat_rows[0]["notes"] = {"nested": [1, {"deep": True}]}
+        rows = list(iter_json_rows(json.dumps(flat_rows)))
+        assert rows[0]["title"] == "Login timeout on SSO"
+
+    def test_malformed_json_raises_on_consumption(self, json_backend):
+        with pytest.raises(Exception):
+            list(iter_json_rows('[{"title": "unterminated"'))
+
+    def test_streaming_yields_before_document_ends(self, flat_rows):
+        if ingest.ijson is None:
+            pytest.skip("ijson is not installed")
+        # Truncated after the first row: the first row is still delivered.
+        text = json.dumps(flat_rows)
+        truncated = text[: text.index("}") + 1]
+        rows = iter_json_rows(truncated)
+        assert next(rows)["title"] == "Login timeout on SSO"
+
+
+class TestJsonCollation:
+    async def test_collate_consumes_json_stream(self, formatter, schema_edition):
+        formatter.set_raw_content(iter_json_rows(json.dumps(schema_edition)))
+        assert await formatter.collate_content() is True
+        assert len(formatter.get_items("issues")) == 1
+        assert len(formatter.get_items("wins")) == 1
+        assert formatter.get_items("issues")[0]["domain"] == "Authentication"
+
+    async def test_json_textbox_reaches_collation(self, schema_edition):
+        import app
+
+        edition = app.prepare_edition(json_input=json.dumps(schema_edition), file_input=None, trend_html="")
+        with patch.object(edition, "publish_async", new_callable=AsyncMock):
+            await edition.send_to_press_async()
+        assert [i["title"] for i in edition.get_items("issues")] == ["Login timeout"]
+        assert [i["title"] for i in edition.get_items("wins")] == ["Faster reports"]
+
+
+class TestIterJsonlRows:
+    @pytest.fixture
+    def jsonl_lines(self, flat_rows):
+        return [json.dumps(row) + "\n" for row in flat_rows]
+
+    def test_rows_are_normalised(self, jsonl_lines):
+        rows = list(iter_jsonl_rows(jsonl_lines))
+        assert len(rows) == 2
+        assert rows[0]["type"] == "Issue"
+        assert rows[0]["include"] is True
+        assert rows[0]["topic_domain"] == "Authentication"
+        assert rows[1]["include"] is False
+
+    def test_binary_lines_and_bom(self, jsonl_lines):
+        raw = ("\ufeff" + "".join(jsonl_lines)).encode("utf-8")
+        rows = list(iter_jsonl_rows(io.BytesIO(raw)))
+        assert [r["title"] for r in rows] == ["Login timeout on SSO", "Skipped"]
+
+    def test_blank_lines_are_ignored(self, jsonl_lines):
+        errors = []
+        rows = list(iter_jsonl_rows(["\n", jsonl_lines[0], "   \n"], errors=errors))
+        assert len(rows) == 1
+        assert errors == []
+
+    def test_malformed_lines_reported_by_number_without_aborting(self, jsonl_lines):
+        errors = []
+        lines = [jsonl_lines[0], '{"title": "broken"\n', "[1, 2]\n", jsonl_lines[1]]
+        rows = list(iter_jsonl_rows(lines, errors=errors))
+        assert [r["title"] for r in rows] == ["Login timeout on SSO", "Skipped"]
+        assert [number for number, _ in errors] == [2, 3]
+        assert "invalid JSON" in errors[0][1]
+        assert "expected an object" in errors[1][1]
+
+    def test_undecodable_line_is_skipped(self, jsonl_lines):
+        errors = []
+        lines = [jsonl_lines[0].encode("utf-8"), b'{"title": "caf\xe9"}\n', jsonl_lines[1].encode("utf-8")]
+        rows = list(iter_jsonl_rows(lines, errors=errors))
+        assert [r["title"] for r in rows] == ["Login timeout on SSO", "Skipped"]
+        assert [number for number, _ in errors] == [2]
+        assert "invalid UTF-8" in errors[0][1]
+
+    def test_is_lazy(self, jsonl_lines):
+        consumed = []
+
+        def source():
+            for line in jsonl_lines:
+                consumed.append(line)
+                yield line
+
+        rows = iter_jsonl_rows(source())
+        next(rows)
+        assert len(consumed) == 1
+
+
+class TestIterUploadRows:
+    def test_csv_upload(self, tmp_path):
+        path = tmp_path / "edition.csv"
+        path.write_text(
+            "ticket_type,Topic/Domain,title,customer,subject matter/summary,link,add_to_edition?\n"
+            "Issue,Auth,Login Bug,Acme,Users cannot login,,TRUE\n",
+            encoding="utf-8",
+        )
+        rows = list(iter_upload_rows(str(path)))
+        assert rows[0]["title"] == "Login Bug"
+        assert rows[0]["include"] is True
+
+    @pytest.mark.parametrize("suffix", [".jsonl", ".ndjson", ".JSONL"])
+    def test_jsonl_upload(self, tmp_path, flat_rows, suffix):
+        path = tmp_path / f"edition{suffix}"
+        path.write_text("".join(json.dumps(r) + "\n" for r in flat_rows) + "not json\n")
+        errors = []
+        rows = list(iter_upload_rows(str(path), errors=errors))
+        assert len(rows) == 2
+        assert errors[0][0] == 3
+
+    def test_jsonl_upload_with_invalid_bytes(self, tmp_path, flat_rows):
+        path = tmp_path / "edition.jsonl"
+        lines = [json.dumps(r).encode("utf-8") + b"\n" for r in flat_rows]
+        path.write_bytes(lines[0] + b"\xff\xfe broken\n" + lines[1])
+        errors = []
+        rows = list(iter_upload_rows(str(path), errors=errors))
+        assert len(rows) == 2
+        assert errors[0][0] == 2
+
+    def test_json_upload(self, tmp_path, schema_edition):
+        path = tmp_path / "edition.json"
+        path.write_text(json.dumps(schema_edition))
+        assert len(list(iter_upload_rows(str(path)))) == 2
+
+    def test_unsupported_suffix_raises(self, tmp_path):
+        with pytest.raises(ValueError, match="Unsupported upload type"):
+            iter_upload_rows(str(tmp_path / "edition.txt"))
+
+    def test_file_is_not_opened_until_iterated(self, tmp_path):
+        rows = iter_upload_rows(str(tmp_path / "missing.csv"))
+        with pytest.raises(FileNotFoundError):
+            next(rows)
+
+
+class TestCompressedUploads:
+    CSV_TEXT = (
+        "ticket_type,Topic/Domain,title,customer,subject matter/summary,link,add_to_edition?\n"
+        "Issue,Auth,Login Bug,Acme,Users cannot login,,TRUE\n"
+        "Win,Perf,Faster,Beta,Quicker pages,,FALSE\n"
+    )
+
+    def test_csv_gz(self, tmp_path):
+        import gzip
+        path = tmp_path / "edition.csv.gz"
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write(self.CSV_TEXT)
+        rows = list(iter_upload_rows(str(path)))
+        assert [r["title"] for r in rows] == ["Login Bug", "Faster"]
+        assert [r["include"] for r in rows] == [True, False]
+
+    def test_jsonl_gz(self, tmp_path, flat_rows):
+        import gzip
+        path = tmp_path / "edition.jsonl.gz"
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r) + "\n" for r in flat_rows))
+        assert len(list(iter_upload_rows(str(path)))) == 2
+
+    def test_csv_zst(self, tmp_path):
+        zstandard = pytest.importorskip("zstandard")
+        path = tmp_path / "edition.csv.zst"
+        path.write_bytes(zstandard.ZstdCompressor().compress(self.CSV_TEXT.encode("utf-8")))
+        rows = list(iter_upload_rows(str(path)))
+        assert [r["title"] for r in rows] == ["Login Bug", "Faster"]
+
+    def test_zst_without_zstandard_raises(self, tmp_path):
+        path = tmp_path / "edition.csv.zst"
+        path.write_bytes(b"")
+        with patch.object(ingest, "zstandard", None):
+            with pytest.raises(ValueError, match="zstandard"):
+                list(iter_upload_rows(str(path)))
+
+    @pytest.mark.parametrize("member", ["edition.csv", "exports/edition.csv"])
+    def test_single_member_zip(self, tmp_path, member):
+        import zipfile
+        path = tmp_path / "edition.zip"
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr(member, self.CSV_TEXT)
+        rows = list(iter_upload_rows(str(path)))
+        assert [r["title"] for r in rows] == ["Login Bug", "Faster"]
+
+    def test_zip_member_suffix_picks_parser(self, tmp_path, flat_rows):
+        import zipfile
+        path = tmp_path / "edition.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("edition.jsonl", "".join(json.dumps(r) + "\n" for r in flat_rows))
+        assert len(list(iter_upload_rows(str(path)))) == 2
+
+    def test_multi_member_zip_raises(self, tmp_path):
+        import zipfile
+        path = tmp_path / "edition.zip"
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("a.csv", self.CSV_TEXT)
+            archive.writestr("b.csv", self.CSV_TEXT)
+        with pytest.raises(ValueError, match="exactly one file"):
+            list(iter_upload_rows(str(path)))
+
+    def test_unsupported_inner_format_raises_up_front(self, tmp_path):
+        with pytest.raises(ValueError, match="Unsupported upload type"):
+            iter_upload_rows(str(tmp_path / "notes.txt.gz"))
+
+    def test_upload_widget_accepts_compressed_suffixes(self):
+        from ingest import UPLOAD_FILE_TYPES
+        for suffix in (".csv", ".json", ".jsonl", ".gz", ".zst", ".zip"):
+            assert suffix in UPLOAD_FILE_TYPES
+
+
+class TestXlsxUploads:
+    HEADERS = ["ticket_type", "Topic/Domain", "title", "customer", "subject matter/summary", "link", "add_to_edition?"]
+
+    def _workbook(self, path, rows):
+        openpyxl = pytest.importorskip("openpyxl")
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(self.HEADERS)
+        for row in rows:
+            sheet.append(row)
+        workbook.save(path)
+        return path
+
+    def test_native_cells_are_normalised(self, tmp_path):
+        path = self._workbook(tmp_path / "edition.xlsx", [
+            ["Issue", "Auth", "Login Bug", "Acme", "Users cannot login", None, True],
+            ["Win", "Perf", 2026, "Beta", "Quicker pages", None, False],
+        ])
+        rows = list(iter_upload_rows(str(path)))
+        assert [r["include"] for r in rows] == [True, False]
+        assert rows[0]["title"] == "Login Bug"
+        assert rows[0]["url"] == ""
+        assert rows[1]["title"] == "2026"
+        assert set(rows[0]) == set(CSV_COLUMN_ALIASES)
+
+    def test_string_flags_and_blank_rows(self, tmp_path):
+        path = self._workbook(tmp_path / "edition.xlsx", [
+            ["Issue", "Auth", "Login Bug", "Acme", "Summary", None, "TRUE"],
+            [None] * 7,
+            ["Oops", "Auth", "Typo", "Acme", "Summary", None, "no"],
+        ])
+        rows = list(iter_upload_rows(str(path)))
+        assert [r["title"] for r in rows] == ["Login Bug", "Typo"]
+        assert [r["include"] for r in rows] == [True, False]
+
+    def test_xlsx_inside_zst(self, tmp_path):
+        zstandard = pytest.importorskip("zstandard")
+        workbook = self._workbook(tmp_path / "edition.xlsx", [
+            ["Issue", "Auth", "Login Bug", "Acme", "Summary", None, True],
+        ])
+        path = tmp_path / "edition.xlsx.zst"
+        path.write_bytes(zstandard.ZstdCompressor().compress(workbook.read_bytes()))
+        assert [r["title"] for r in iter_upload_rows(str(path))] == ["Login Bug"]
+
+    @pytest.mark.parametrize("suffix", [".gz", ".zip"])
+    def test_xlsx_inside_gzip_or_zip(self, tmp_path, suffix):
+        import gzip
+        import zipfile
+        workbook = self._workbook(tmp_path / "edition.xlsx", [
+            ["Issue", "Auth", "Login Bug", "Acme", "Summary", None, True],
+        ])
+        path = tmp_path / f"edition.xlsx{suffix}"
+        if suffix == ".gz":
+            path.write_bytes(gzip.compress(workbook.read_bytes()))
+        else:
+            with zipfile.ZipFile(path, "w") as archive:
+                archive.write(workbook, "edition.xlsx")
+        with patch.object(ingest.openpyxl, "load_workbook", wraps=ingest.openpyxl.load_workbook) as load:
+            assert [r["title"] for r in iter_upload_rows(str(path))] == ["Login Bug"]
+        # openpyxl gets a spooled copy, not the decompressing stream.
+        assert isinstance(load.call_args.args[0], tempfile.SpooledTemporaryFile)
+
+    def test_xlsx_without_openpyxl_raises(self, tmp_path):
+        path = tmp_path / "edition.xlsx"
+        path.write_bytes(b"")
+        with patch.object(ingest, "openpyxl", None):
+            with pytest.raises(ValueError, match="openpyxl"):
+                list(iter_upload_rows(str(path)))
+
+
+class TestEncodingAwareCsv:
+    HEADER = "ticket_type,Topic/Domain,title,customer,subject matter/summary,link,add_to_edition?"
+    ROWS = [
+        "Issue,Auth,Café login,Acme,\"Users can’t login,\nsee notes\",,TRUE",
+        "Win,Perf,Faster,Beta,Quicker pages,,FALSE",
+    ]
+
+    def _text(self, delimiter=",", newline="\r\n"):
+        lines = [self.HEADER] + self.ROWS
+        return newline.join(line.replace(",", delimiter) for line in lines) + newline
+
+    def _upload(self, tmp_path, data):
+        path = tmp_path / "edition.csv"
+        path.write_bytes(data)
+        return list(iter_upload_rows(str(path)))
+
+    @pytest.mark.parametrize("encoding", ["utf-8", "utf-8-sig", "utf-16", "utf-16-le", "utf-32", "cp1252"])
+    def test_encodings(self, tmp_path, encoding):
+        rows = self._upload(tmp_path, self._text().encode(encoding))
+        assert [r["title"] for r in rows] == ["Café login", "Faster"]
+        assert rows[0]["summary"] == "Users can’t login,\nsee notes"
+        assert [r["include"] for r in rows] == [True, False]
+
+    def test_stray_cp1252_byte_in_utf8(self, tmp_path):
+        data = self._text().encode("utf-8").replace("Faster".encode(), b"Faster\x92s")
+        rows = self._upload(tmp_path, data)
+        assert rows[1]["title"] == "Faster’s"
+
+    @pytest.mark.parametrize("delimiter", [";", "\t", "|"])
+    def test_sniffed_delimiter(self, tmp_path, delimiter):
+        text = self._text(delimiter=delimiter).replace(f"login{delimiter}\n", "login,\n")
+        rows = self._upload(tmp_path, text.encode("utf-8"))
+        assert [r["customer"] for r in rows] == ["Acme", "Beta"]
+
+    @pytest.mark.parametrize("newline", ["\n", "\r"])
+    def test_line_endings(self, tmp_path, newline):
+        rows = self._upload(tmp_path, self._text(newline=newline).encode("utf-8"))
+        assert [r["title"] for r in rows] == ["Café login", "Faster"]
+
+    def test_rows_span_chunk_boundaries(self, tmp_path):
+        body = "".join(f"Issue,Auth,Tïtle {i},Acme,Summary,,TRUE\n" for i in range(500))
+        with patch.object(ingest, "_CSV_CHUNK_BYTES", 7), patch.object(ingest, "_CSV_SNIFF_BYTES", 64):
+            rows = self._upload(tmp_path, (self.HEADER + "\n" + body).encode("utf-16"))
+        assert [r["title"] for r in rows] == [f"Tïtle {i}" for i in range(500)]
+
+    def test_empty_file(self, tmp_path):
+        assert self._upload(tmp_path, b"") == []
+
+    @pytest.mark.parametrize("head, expected", [
+        (b"\xef\xbb\xbfa,b", ("utf-8", 3)),
+        (b"\xff\xfe\x00\x00a\x00\x00\x00", ("utf-32-le", 4)),
+        (b"\xff\xfea\x00", ("utf-16-le", 2)),
+        ("a,b\n".encode("utf-16-be"), ("utf-16-be", 0)),
+        ("café au lait".encode("cp1252"), ("cp1252", 0)),
+        ("café".encode("utf-8")[:-1], ("utf-8", 0)),
+    ])
+    def test_sniff_encoding(self, head, expected):
+        assert ingest.sniff_encoding(head) == expected
+
+
+@pytest.fixture
+def alias_config(tmp_path, monkeypatch):
+    """A writable alias config file; the built-in table is restored afterwards."""
+    path = tmp_path / "aliases.json"
+    monkeypatch.setenv(ingest.COLUMN_ALIASES_ENV, str(path))
+    yield path
+    monkeypatch.delenv(ingest.COLUMN_ALIASES_ENV)
+    ingest.load_column_aliases(None)
+    ingest._alias_config_mtime = None
+
+
+class TestHeaderPlan:
+    TEMPLATE = ("ticket_type", "add_to_edition?", "owner", "customer", "link", "Topic/Domain", "title",
+                "subject matter/summary", "notes")
+
+    def test_exact_headers(self):
+        assert ingest.resolve_header_plan(self.TEMPLATE) == (
+            "type", "include", None, "customer", "url", "topic_domain", "title", "summary", None,
+        )
+
+    def test_plan_is_cached_per_signature(self):
+        ingest.resolve_header_plan.cache_clear()
+        rows = [dict.fromkeys(self.TEMPLATE, "TRUE") for _ in range(50)]
+        ingest.normalize_csv_rows(rows)
+        info = ingest.resolve_header_plan.cache_info()
+        assert (info.misses, info.hits) == (1, 49)
+
+    @pytest.mark.parametrize("header, expected", [
+        ("Add to edition ?", "include"),
+        ("TOPIC - DOMAIN", "topic_domain"),
+        ("Ticket Typ", "type"),
+        ("Summary.", "summary"),
+        ("Client Number", None),
+        ("", None),
+    ])
+    def test_near_miss_headers(self, header, expected):
+        assert ingest.resolve_header_plan((header,)) == (expected,)
+
+    def test_fuzzy_match_never_takes_a_claimed_column(self):
+        assert ingest.resolve_header_plan(("customer_id", "Customer")) == (None, "customer")
+
+    @pytest.mark.parametrize("header", ["customer_id", "Customer ID", "title_url", "Summary Key"])
+    def test_identifier_columns_are_not_fuzzy_matched(self, header):
+        assert ingest.resolve_header_plan((header,)) == (None,)
+
+    def test_csv_upload_with_customer_id_column(self, tmp_path):
+        path = tmp_path / "edition.csv"
+        path.write_text("ticket_type,add_to_edition?,customer_id,title\nWin,yes,CUST-0042,Faster\n", encoding="utf-8")
+        rows = list(iter_upload_rows(str(path)))
+        assert (rows[0]["customer"], rows[0]["title"]) == ("", "Faster")
+
+    def test_csv_upload_with_near_miss_headers(self, tmp_path):
+        path = tmp_path / "edition.csv"
+        path.write_text("Ticket Type ,Add to edition ?,Title\nWin,yes,Faster\n", encoding="utf-8")
+        rows = list(iter_upload_rows(str(path)))
+        assert (rows[0]["type"], rows[0]["include"], rows[0]["title"]) == ("Win", True, "Faster")
+
+    def test_aliases_loaded_from_config(self, alias_config):
+        alias_config.write_text(json.dumps({"title": ["Headline"]}), encoding="utf-8")
+        rows = ingest.normalize_csv_rows([{"Headline": "Big news"}])
+        assert rows[0]["title"] == "Big news"
+        assert "Headline" in CSV_COLUMN_ALIASES["title"]
+        assert ingest.resolve_header_plan(("Headline",)) == ("title",)
+
+    def test_config_reloaded_when_modified(self, alias_config):
+        import os
+        alias_config.write_text(json.dumps({"title": ["Headline"]}), encoding="utf-8")
+        ingest.refresh_column_aliases()
+        alias_config.write_text(json.dumps({"summary": ["Blurb"]}), encoding="utf-8")
+        os.utime(alias_config, (1, 1))
+        ingest.refresh_column_aliases()
+        assert ingest.resolve_header_plan(("Headline", "Blurb")) == (None, "summary")
+
+    @pytest.mark.parametrize("content", ['{"owner": ["Assignee"]}', '{"title": "Headline"}', "[", "[]"])
+    def test_invalid_config_keeps_current_table(self, alias_config, content):
+        alias_config.write_text(content, encoding="utf-8")
+        ingest.refresh_column_aliases()
+        assert ingest.resolve_header_plan(self.TEMPLATE)[0] == "type"
+        assert ingest.resolve_header_plan(("Assignee", "Headline")) == (None, None)
+
+
+class TestColumnarUploads:
+    @pytest.fixture
+    def table(self):
+        pa = pytest.importorskip("pyarrow")
+        return pa.table({
+            "ticket_type": ["Issue", "Win", "Oops", "News"],
+            "add_to_edition?": [True, None, True, False],
+            "owner": ["Jane", "John", "Alice", "Bob"],
+            "title": ["Login Bug", "Faster", "Typo", "Launch"],
+            "reopened": [1, 2, 3, 4],
+        })
+
+    def _write_parquet(self, table, path):
+        pytest.importorskip("pyarrow.parquet").write_table(table, path)
+        return path
+
+    def test_parquet_yields_only_included_rows(self, tmp_path, table):
+        path = self._write_parquet(table, tmp_path / "edition.parquet")
+        rows = list(iter_upload_rows(str(path)))
+        assert [(r["title"], r["type"], r["include"]) for r in rows] == [("Login Bug", "Issue", True), ("Typo", "Oops", True)]
+        assert set(rows[0]) == set(CSV_COLUMN_ALIASES)
+
+    def test_parquet_reads_only_mapped_columns(self, tmp_path, table):
+        path = self._write_parquet(table, tmp_path / "edition.parquet")
+        parquet = pytest.importorskip("pyarrow.parquet")
+        with patch.object(parquet.ParquetFile, "read", autospec=True, side_effect=parquet.ParquetFile.read) as read:
+            list(iter_upload_rows(str(path)))
+        assert read.call_args.kwargs["columns"] == ["ticket_type", "add_to_edition?", "title"]
+
+    @pytest.mark.parametrize("flags, expected", [
+        (["TRUE", " yes ", "no", None], ["Login Bug", "Faster"]),
+        ([1, 0, 1, None], ["Login Bug", "Typo"]),
+    ])
+    def test_non_boolean_include_column(self, tmp_path, table, flags, expected):
+        pa = pytest.importorskip("pyarrow")
+        table = table.set_column(1, "add_to_edition?", pa.array(flags))
+        path = self._write_parquet(table, tmp_path / "edition.parquet")
+        assert [r["title"] for r in iter_upload_rows(str(path))] == expected
+
+    def test_missing_include_column_yields_nothing(self, tmp_path, table):
+        path = self._write_parquet(table.drop_columns(["add_to_edition?"]), tmp_path / "edition.parquet")
+        assert list(iter_upload_rows(str(path))) == []
+
+    @pytest.mark.parametrize("writer", ["file", "stream"])
+    def test_arrow_ipc(self, tmp_path, table, writer):
+        pa = pytest.importorskip("pyarrow")
+        path = tmp_path / "edition.arrow"
+        opener = pa.ipc.new_file if writer == "file" else pa.ipc.new_stream
+        with pa.OSFile(str(path), "wb") as sink, opener(sink, table.schema) as ipc:
+            ipc.write_table(table)
+        assert [r["title"] for r in iter_upload_rows(str(path))] == ["Login Bug", "Typo"]
+
+    def test_compressed_parquet(self, tmp_path, table):
+        import gzip
+        plain = self._write_parquet(table, tmp_path / "plain.parquet")
+        path = tmp_path / "edition.parquet.gz"
+        path.write_bytes(gzip.compress(plain.read_bytes()))
+        pa = pytest.importorskip("pyarrow")
+        with patch.object(pa, "BufferReader") as buffer_reader, \
+                patch.object(pa, "memory_map", side_effect=pa.memory_map) as memory_map:
+            assert [r["title"] for r in iter_upload_rows(str(path))] == ["Login Bug", "Typo"]
+        # Spooled to disk and mapped, not decompressed into memory.
+        buffer_reader.assert_not_called()
+        spooled = memory_map.call_args.args[0]
+        assert spooled != str(path) and not os.path.exists(spooled)
+
+    def test_compressed_arrow_ipc(self, tmp_path, table):
+        pa = pytest.importorskip("pyarrow")
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_file(sink, table.schema) as ipc:
+            ipc.write_table(table)
+        path = tmp_path / "edition.arrow.zst"
+        path.write_bytes(pytest.importorskip("zstandard").ZstdCompressor().compress(sink.getvalue().to_pybytes()))
+        assert [r["title"] for r in iter_upload_rows(str(path))] == ["Login Bug", "Typo"]
+
+    def test_parquet_without_pyarrow_raises(self, tmp_path):
+        path = tmp_path / "edition.parquet"
+        path.write_bytes(b"")
+        with patch.object(ingest, "pyarrow", None):
+            with pytest.raises(ValueError, match="pyarrow"):
+                list(iter_upload_rows(str(path)))
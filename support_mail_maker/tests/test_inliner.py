@@ -0,0 +1,94 @@
+import pytest
+from unittest.mock import patch
+
+import inliner
+from inliner import compile_stylesheet, inline_css
+
+
+CSS = """
+/* brand */
+body { color: #00313D; margin: 0; }
+p { margin: 0 0 12px 0; font-size: 11px; }
+.lead { font-size: 13px; }
+p.lead { font-weight: 700; }
+#intro { color: red; }
+.issue-table td { display: block; }
+dt.sr-only { position: absolute; }
+a:hover { color: blue; }
+.loud { color: green !important; }
+@media (min-width: 768px) {
+  .lead { font-size: 15px; }
+}
+"""
+
+
+def _page(body, css=CSS):
+    return f"<!DOCTYPE html><html><head><title>t</title><style>{css}</style></head><body>{body}</body></html>"
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    compile_stylesheet.cache_clear()
+    yield
+
+
+class TestInlineCss:
+    def test_rules_are_copied_onto_elements(self):
+        html = inline_css(_page('<p class="lead">Hi</p>'))
+        assert '<body style="color: #00313D; margin: 0">' in html
+        assert '<p class="lead" style="margin: 0 0 12px 0; font-size: 13px; font-weight: 700">Hi</p>' in html
+
+    def test_id_beats_class_and_existing_style_wins(self):
+        html = inline_css(_page('<p id="intro" class="loud" style="margin: 4px">Hi</p>'))
+        assert 'style="font-size: 11px; color: green !important; margin: 4px"' in html
+
+    def test_descendant_selectors(self):
+        html = inline_css(_page('<table class="issue-table"><tbody><tr><td>a</td></tr></tbody></table><td>b</td>'))
+        assert '<td style="display: block">a</td>' in html
+        assert "<td>b</td>" in html
+
+    def test_residual_css_stays_in_style_block(self):
+        html = inline_css(_page("<p>Hi</p>"))
+        head = html[:html.index("</head>")]
+        assert "a:hover { color: blue; }" in head
+        assert ".lead { font-size: 15px !important }" in head
+        assert "margin: 0 0 12px 0" not in head
+
+    def test_style_block_dropped_when_everything_inlines(self):
+        html = inline_css(_page("<p>Hi</p>", css="p { color: red; }"))
+        assert "<style" not in html
+        assert '<p style="color: red">Hi</p>' in html
+
+    def test_markup_is_otherwise_preserved(self):
+        body = '<!-- note --><div data-x="1">Tom &amp; Jerry &#169; <img src="a.png" alt="x" /><br></div>'
+        assert body in inline_css(_page(body, css="span { color: red; }"))
+
+    def test_attribute_values_are_escaped(self):
+        html = inline_css(_page('<p title="a &quot;b&quot;">Hi</p>', css='p { font-family: "Gilroy", Arial; }'))
+        assert '<p title="a &quot;b&quot;" style="font-family: &quot;Gilroy&quot;, Arial">' in html
+
+    def test_stylesheet_parsed_once_per_template_version(self):
+        page = _page("<p>Hi</p>")
+        with patch.object(inliner, "Stylesheet", wraps=inliner.Stylesheet) as stylesheet:
+            inline_css(page)
+            inline_css(page)
+            inline_css(_page("<p>Hi</p>", css="p { color: red; }"))
+        assert stylesheet.call_count == 2
+
+    def test_matches_computed_once_per_element_path(self):
+        rows = "".join(f'<table class="issue-table"><tr><td><p class="lead">{i}</p></td></tr></table>' for i in range(500))
+        inline_css(_page(rows))
+        info = compile_stylesheet(CSS).style_for.cache_info()
+        assert info.misses <= 6
+        assert info.hits >= 1000
+
+    def test_rendered_edition(self, formatter, raw_content_data):
+        import asyncio
+        from django.template.loader import render_to_string
+        formatter.set_raw_content(raw_content_data)
+        asyncio.run(formatter.collate_content())
+        html = inline_css(render_to_string("support_mail_template.html", formatter.context))
+        assert '<dd class="issue-title" style="' in html
+        assert "font-weight: 700; font-size: 12px" in html
+        assert "@media (min-width: 768px)" in html
+        assert "Login timeout on SSO" in html
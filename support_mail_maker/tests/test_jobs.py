@@ -0,0 +1,188 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import jobs
+from jobs import JobQueue, JobStatus, QueueFullError, describe_job, router
+from state import MemoryStateStore
+
+
+async def _returns(value, delay=0.0):
+    await asyncio.sleep(delay)
+    return value
+
+
+async def _raises():
+    raise ValueError("bad rows")
+
+
+class TestJobQueue:
+    async def test_submit_returns_before_the_job_runs(self):
+        queue = JobQueue(workers=1, max_queued=4)
+        job = await queue.submit(lambda: _returns("done", delay=0.05))
+        # Saving the record yields, so a free worker may already have started it.
+        assert job.status in (JobStatus.QUEUED, JobStatus.RUNNING)
+        assert queue.get(job.id) is job
+        assert await job.wait(1)
+        assert job.status is JobStatus.SUCCEEDED and job.result == "done"
+        assert job.queue_wait >= 0 and job.run_time >= 0
+        await queue.shutdown()
+
+    async def test_failures_are_recorded(self):
+        queue = JobQueue(workers=1, max_queued=4)
+        job = await queue.submit(_raises)
+        await job.wait(1)
+        assert job.status is JobStatus.FAILED
+        assert job.error == "bad rows"
+        assert "failed: bad rows" in job.describe()
+        assert queue.completed[JobStatus.FAILED] == 1
+        await queue.shutdown()
+
+    async def test_workers_bound_concurrency(self):
+        queue = JobQueue(workers=2, max_queued=8)
+        active, peak = 0, 0
+
+        async def tracked():
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+        submitted = [await queue.submit(tracked) for _ in range(6)]
+        await asyncio.gather(*(job.wait(2) for job in submitted))
+        assert peak == 2
+        assert all(job.status is JobStatus.SUCCEEDED for job in submitted)
+        await queue.shutdown()
+
+    async def test_admission_control(self):
+        queue = JobQueue(workers=1, max_queued=2)
+        release = asyncio.Event()
+
+        async def blocked():
+            await release.wait()
+
+        await queue.submit(blocked)
+        await asyncio.sleep(0)  # let the worker take the first job
+        await queue.submit(blocked)
+        await queue.submit(blocked)
+        with pytest.raises(QueueFullError):
+            await queue.submit(blocked)
+        assert queue.rejected == 1 and queue.queued == 2
+        release.set()
+        await queue.shutdown()
+
+    async def test_history_is_bounded(self):
+        queue = JobQueue(workers=1, max_queued=8, history=2)
+        submitted = []
+        for value in range(4):
+            job = await queue.submit(lambda value=value: _returns(value))
+            await job.wait(1)
+            submitted.append(job)
+        assert queue.get(submitted[0].id) is None
+        assert queue.get(submitted[-1].id) is submitted[-1]
+        await queue.shutdown()
+
+    async def test_metrics_include_queue_wait(self):
+        queue = JobQueue(workers=1, max_queued=4)
+        await (await queue.submit(lambda: _returns(1, delay=0.01))).wait(1)
+        text = queue.render_metrics()
+        assert "supportmail_jobs_submitted_total 1" in text
+        assert 'supportmail_jobs_completed_total{status="succeeded"} 1' in text
+        assert 'supportmail_job_queue_wait_seconds{quantile="0.95"}' in text
+        assert "supportmail_job_queue_wait_seconds_count 1" in text
+        assert "supportmail_job_run_seconds_count 1" in text
+        await queue.shutdown()
+
+
+    async def test_cancelled_job_leaves_the_worker_running(self):
+        queue = JobQueue(workers=1, max_queued=4)
+        slow = await queue.submit(lambda: _returns("slow", delay=10))
+        await asyncio.sleep(0.05)
+        assert slow.cancel()
+        assert await slow.wait(1)
+        assert slow.status is JobStatus.FAILED and slow.error == "cancelled"
+        after = await queue.submit(lambda: _returns("after"))
+        assert await after.wait(1) and after.result == "after"
+        assert not after.cancel()
+        await queue.shutdown()
+
+    async def test_cancelled_queued_job_never_runs(self):
+        queue = JobQueue(workers=1, max_queued=4)
+        ran = []
+        blocker = await queue.submit(lambda: _returns("blocker", delay=0.1))
+        queued = await queue.submit(lambda: _returns(ran.append("ran")))
+        queued.cancel()
+        assert await queued.wait(1) and await blocker.wait(1)
+        assert queued.error == "cancelled" and ran == []
+        await queue.shutdown()
+
+
+class TestJobRecords:
+    async def test_records_are_shared_through_the_state_store(self):
+        shared = MemoryStateStore()
+        worker, other_worker = JobQueue(workers=1, state=shared), JobQueue(workers=1, state=shared)
+        job = await worker.submit(lambda: _returns({"answer": 42}), summarize=lambda result: {"answer": result["answer"]})
+        assert (await other_worker.lookup(job.id))["status"] in ("queued", "running")
+        await job.wait(1)
+        record = await other_worker.lookup(job.id)
+        assert record["status"] == "succeeded"
+        assert record["result"] == {"answer": 42}
+        assert "finished in" in describe_job(record)
+        assert await other_worker.lookup("missing") is None
+        await worker.shutdown()
+
+    async def test_records_are_written_off_the_event_loop(self):
+        class SlowStore(MemoryStateStore):
+            def set(self, *args, **kwargs):
+                time.sleep(0.05)
+                super().set(*args, **kwargs)
+
+        queue = JobQueue(workers=1, state=SlowStore())
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        ticker = asyncio.ensure_future(tick())
+        job = await queue.submit(lambda: _returns(None))
+        await job.wait(1)
+        ticker.cancel()
+        # Three 50ms writes (queued, running, finished) would otherwise stall the loop.
+        assert ticks >= 15
+        assert queue.state.get(f"job:{job.id}")["status"] == "succeeded"
+        await queue.shutdown()
+
+    async def test_summarized_result_is_not_kept(self):
+        queue = JobQueue(workers=1, state=MemoryStateStore())
+        job = await queue.submit(lambda: _returns({"edition": "x" * 1000}), summarize=lambda result: {"size": len(result["edition"])})
+        await job.wait(1)
+        assert job.summary == {"size": 1000}
+        assert job.result is None
+        await queue.shutdown()
+
+    async def test_failed_summary_fails_the_job(self):
+        queue = JobQueue(workers=1, state=MemoryStateStore())
+        job = await queue.submit(lambda: _returns(None), summarize=lambda result: result["missing"])
+        await job.wait(1)
+        assert job.status is JobStatus.FAILED
+        assert (await queue.lookup(job.id))["status"] == "failed"
+        await queue.shutdown()
+
+
+class TestMetricsRoute:
+    def test_serves_prometheus_text(self, monkeypatch):
+        monkeypatch.setattr(jobs, "_default_queue", JobQueue(workers=3, max_queued=5))
+        app = FastAPI()
+        app.include_router(router)
+        response = TestClient(app).get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert "supportmail_job_workers 3" in response.text
+        assert "supportmail_jobs_queued 0" in response.text
@@ -0,0 +1,119 @@
+import os
+from datetime import datetime
+
+import pytest
+
+from formatter import Formatter, SECTION_KEYS
+from renderers import (
+    DjangoRenderer,
+    Jinja2Renderer,
+    format_date,
+    get_renderer,
+    regroup,
+)
+
+_TRICKY = "Quotes \"double\" & 'single' <b>tags</b> — ünïcode"
+_MARKDOWN = " See **the runbook** [here](https://docs.example.com/?a=1&b=2).\n- Restart\n- Retry"
+
+
+async def _edition(rows=None, trend_html="<ul><li>Trend one</li></ul>", **kwargs):
+    formatter = Formatter(publish_date="2025-01-07", dedup="off", **kwargs)
+    formatter.set_raw_content(rows if rows is not None else [
+        {
+            "title": f"{_TRICKY} {i}",
+            "topic_domain": ("Auth & SSO", "Player", "Auth & SSO")[i % 3],
+            "summary": f"Summary {i} with <script>alert('x')</script>" + (_MARKDOWN if i % 3 == 0 else ""),
+            "customer": "O'Brien & Sons",
+            "type": ("Issue", "Oops", "Win", "News")[i % 4],
+            "url": f"https://support.example.com/tickets?id={i}&ref=\"mail\"" if i % 5 else "",
+            "include": True,
+        }
+        for i in range(24)
+    ])
+    formatter.context["content"]["trend_html"] = trend_html
+    await formatter.collate_content()
+    return formatter
+
+
+@pytest.fixture(scope="module")
+def django_renderer():
+    return get_renderer("django")
+
+
+@pytest.fixture(scope="module")
+def jinja_renderer(tmp_path_factory):
+    renderer = Jinja2Renderer(cache_dir=str(tmp_path_factory.mktemp("jinja_cache")))
+    renderer.precompile()
+    return renderer
+
+
+class TestParity:
+    async def test_full_document_identical(self, django_renderer, jinja_renderer):
+        formatter = await _edition()
+        expected = django_renderer.render("support_mail_template.html", formatter.context)
+        assert jinja_renderer.render("support_mail_template.html", formatter.context) == expected
+        assert "O&#x27;Brien &amp; Sons" in expected
+        assert '<a href="https://docs.example.com/?a=1&amp;b=2">here</a>' in expected
+
+    @pytest.mark.parametrize("section", SECTION_KEYS)
+    async def test_sections_identical(self, django_renderer, jinja_renderer, section):
+        formatter = await _edition()
+        name = f"sections/{section}.html"
+        assert jinja_renderer.render(name, formatter.context) == django_renderer.render(name, formatter.context)
+
+    async def test_empty_edition_identical(self, django_renderer, jinja_renderer):
+        formatter = await _edition(rows=[], trend_html="")
+        assert (jinja_renderer.render("support_mail_template.html", formatter.context)
+                == django_renderer.render("support_mail_template.html", formatter.context))
+
+    async def test_published_edition_identical(self, jinja_renderer, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        by_django = await _edition(renderer="django")
+        by_jinja = await _edition(renderer=jinja_renderer)
+        assert by_jinja.render_parts() == by_django.render_parts()
+        assert "".join(by_jinja.iter_html()) == "".join(by_django.iter_html())
+
+
+class TestJinja2Renderer:
+    def test_precompile_caches_bytecode(self, tmp_path):
+        renderer = Jinja2Renderer(cache_dir=str(tmp_path))
+        assert renderer.precompile() == 2 + len(SECTION_KEYS)
+        assert len(os.listdir(tmp_path)) == 2 + len(SECTION_KEYS)
+
+    def test_missing_jinja2(self, monkeypatch):
+        import renderers
+        monkeypatch.setattr(renderers, "jinja2", None)
+        with pytest.raises(ValueError, match="jinja2"):
+            Jinja2Renderer()
+
+    def test_selected_by_environment(self, monkeypatch):
+        monkeypatch.setenv("SUPPORTMAIL_RENDERER", "jinja2")
+        assert isinstance(Formatter(publish_date="2025-01-07").renderer, Jinja2Renderer)
+
+    def test_default_is_django(self, monkeypatch):
+        monkeypatch.delenv("SUPPORTMAIL_RENDERER", raising=False)
+        assert isinstance(Formatter(publish_date="2025-01-07").renderer, DjangoRenderer)
+
+    def test_unknown_renderer(self):
+        with pytest.raises(ValueError, match="Unknown renderer"):
+            get_renderer("mako")
+
+
+class TestFilters:
+    @pytest.mark.parametrize("format, expected", [
+        ("F j, Y", "March 5, 2025"),
+        ("F", "March"),
+        ("d/m/y", "05/03/25"),
+        ("D, M n", "Wed, Mar 3"),
+        (r"l \t\h\e j", "Wednesday the 5"),
+    ])
+    def test_format_date(self, format, expected):
+        assert format_date(datetime(2025, 3, 5), format) == expected
+
+    def test_format_date_empty(self):
+        assert format_date(None, "F") == ""
+
+    def test_regroup_keeps_order_and_runs(self):
+        items = [{"domain": "B"}, {"domain": "A"}, {"domain": "A"}, {"domain": "B"}]
+        groups = regroup(items, "domain")
+        assert [(group.grouper, len(group.list)) for group in groups] == [("B", 1), ("A", 2), ("B", 1)]
@@ -0,0 +1,84 @@
+from unittest.mock import patch
+
+import pytest
+
+import sanitizer
+from formatter import Formatter
+from sanitizer import sanitize_html
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    sanitizer.clear_cache()
+    yield
+    sanitizer.clear_cache()
+
+
+class TestSanitizeHtml:
+    @pytest.mark.parametrize("dirty, clean", [
+        ("<p>Ticket volume up 15%</p>", "<p>Ticket volume up 15%</p>"),
+        ("<script>alert(1)</script><p>ok</p><style>p { color: red }</style>", "<p>ok</p>"),
+        ("<svg><script>alert(1)</script></svg>after", "after"),
+        ('<li onclick="steal()">Item</li>', "<li>Item</li>"),
+        ("<!-- note --><font color=red>red</font> text", "red text"),
+        ("<p>unclosed <b>bold", "<p>unclosed <b>bold</b></p>"),
+        ("</section></div><p>stray</p>", "<p>stray</p>"),
+        ("<table><tr><td colspan=2 style='x'>A</td></tr></table>", '<table><tr><td colspan="2">A</td></tr></table>'),
+    ])
+    def test_allow_list(self, dirty, clean):
+        assert sanitize_html(dirty) == clean
+
+    @pytest.mark.parametrize("href", [
+        "javascript:alert(1)", " JaVa\tScript:alert(1)", "data:text/html,<b>x</b>", "vbscript:x", "/relative",
+    ])
+    def test_unsafe_links_lose_their_href(self, href):
+        assert sanitize_html(f'<a href="{href}">link</a>') == "<a>link</a>"
+
+    def test_safe_urls_are_kept_and_escaped(self):
+        html = '<a href="https://example.com/?a=1&b=2" target="_blank">Docs</a> <a href="mailto:x@example.com">Mail</a>'
+        assert sanitize_html(html) == (
+            '<a href="https://example.com/?a=1&amp;b=2">Docs</a> <a href="mailto:x@example.com">Mail</a>'
+        )
+
+    def test_images_need_a_safe_src(self):
+        html = "<img src=x onerror=alert(1)><img src='https://cdn.example.com/a.png' alt='a \"quoted\" alt'>"
+        assert sanitize_html(html) == '<img src="https://cdn.example.com/a.png" alt="a &quot;quoted&quot; alt">'
+
+    def test_whitespace_is_minified(self):
+        html = "\n<ul>\n    <li>One   &amp;\n <b>two</b> </li>\n    <li> Three</li>\n</ul>\n"
+        assert sanitize_html(html) == "<ul><li>One &amp; <b>two</b></li><li>Three</li></ul>"
+
+    def test_preformatted_whitespace_is_kept(self):
+        assert sanitize_html("<pre>  a\n    b</pre>") == "<pre>  a\n    b</pre>"
+
+    def test_entities_are_normalised(self):
+        assert sanitize_html("<p>&lt;tag&gt; &#38; &copy;</p>") == "<p>&lt;tag&gt; &amp; ©</p>"
+
+    def test_empty(self):
+        assert sanitize_html("") == ""
+
+
+class TestCache:
+    def test_repeat_blocks_are_not_reparsed(self):
+        with patch.object(sanitizer, "_SanitizingParser", wraps=sanitizer._SanitizingParser) as parser:
+            first = sanitize_html("<p>Trends</p>" * 100)
+            second = sanitize_html("<p>Trends</p>" * 100)
+        assert first == second
+        assert parser.call_count == 1
+
+    def test_cache_is_bounded(self, monkeypatch):
+        monkeypatch.setattr(sanitizer, "SANITIZE_CACHE_SIZE", 2)
+        for i in range(5):
+            sanitize_html(f"<p>{i}</p>")
+        assert len(sanitizer._cache) == 2
+
+
+class TestFormatterTrends:
+    async def test_collation_sanitizes_trends(self, raw_content_data):
+        formatter = Formatter(publish_date="2025-03-15")
+        formatter.set_raw_content(raw_content_data)
+        formatter.context["content"]["trend_html"] = "<p>Volume up</p><script>alert(1)</script>"
+        await formatter.collate_content()
+        html = "".join(formatter.iter_html())
+        assert "<p>Volume up</p>" in html
+        assert "alert(1)" not in html
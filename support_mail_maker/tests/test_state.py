@@ -0,0 +1,106 @@
+import fakeredis
+import pytest
+
+import state
+from state import MemoryStateStore, RedisStateStore, SQLiteStateStore, get_state_store
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        yield MemoryStateStore()
+    elif request.param == "sqlite":
+        store = SQLiteStateStore(str(tmp_path / "state.sqlite3"))
+        yield store
+        store.close()
+    else:
+        yield RedisStateStore(client=fakeredis.FakeRedis())
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Control time.time() as seen by the stores that expire documents themselves."""
+    now = [1_000_000.0]
+    monkeypatch.setattr(state.time, "time", lambda: now[0])
+    return now
+
+
+class TestStateStore:
+    def test_round_trip(self, store):
+        store.set("job:1", {"status": "queued", "result": None, "nested": {"a": [1, 2]}})
+        assert store.get("job:1") == {"status": "queued", "result": None, "nested": {"a": [1, 2]}}
+
+    def test_missing_key(self, store):
+        assert store.get("job:missing") is None
+
+    def test_overwrite_and_delete(self, store):
+        store.set("draft:x", {"json_input": "a"})
+        store.set("draft:x", {"json_input": "b"})
+        assert store.get("draft:x") == {"json_input": "b"}
+        store.delete("draft:x")
+        store.delete("draft:x")
+        assert store.get("draft:x") is None
+
+    def test_readers_get_a_copy(self, store):
+        document = {"items": [1]}
+        store.set("job:1", document)
+        store.get("job:1")["items"].append(2)
+        document["items"].append(3)
+        assert store.get("job:1") == {"items": [1]}
+
+
+class TestExpiry:
+    @pytest.mark.parametrize("store_factory", [MemoryStateStore, lambda: SQLiteStateStore(":memory:")])
+    def test_documents_expire(self, clock, store_factory):
+        store = store_factory()
+        store.set("job:1", {"status": "done"}, ttl=10)
+        store.set("draft:1", {"json_input": ""})
+        clock[0] += 9
+        assert store.get("job:1") == {"status": "done"}
+        clock[0] += 2
+        assert store.get("job:1") is None
+        assert store.get("draft:1") == {"json_input": ""}
+
+    @pytest.mark.parametrize("store_factory", [MemoryStateStore, lambda: SQLiteStateStore(":memory:")])
+    def test_purge_expired(self, clock, store_factory):
+        store = store_factory()
+        store.set("a", {}, ttl=1)
+        store.set("b", {}, ttl=100)
+        clock[0] += 5
+        assert store.purge_expired() == 1
+        assert store.get("b") == {}
+
+    def test_redis_expiry_is_set_on_the_server(self):
+        client = fakeredis.FakeRedis()
+        RedisStateStore(client=client).set("job:1", {}, ttl=30)
+        assert 0 < client.pttl("supportmail:job:1") <= 30_000
+
+
+class TestSharedSQLite:
+    def test_two_connections_share_documents(self, tmp_path):
+        path = str(tmp_path / "state.sqlite3")
+        first, second = SQLiteStateStore(path), SQLiteStateStore(path)
+        first.set("job:1", {"status": "running"})
+        assert second.get("job:1") == {"status": "running"}
+        first.close()
+        second.close()
+
+
+class TestGetStateStore:
+    def test_default_is_memory(self, monkeypatch):
+        monkeypatch.delenv("SUPPORTMAIL_STATE", raising=False)
+        assert isinstance(get_state_store(), MemoryStateStore)
+        assert get_state_store() is get_state_store("memory")
+
+    def test_sqlite_from_environment(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(state, "_stores", {})
+        monkeypatch.setenv("SUPPORTMAIL_STATE", "sqlite")
+        monkeypatch.setenv("SUPPORTMAIL_STATE_PATH", str(tmp_path / "nested" / "state.sqlite3"))
+        store = get_state_store()
+        assert isinstance(store, SQLiteStateStore)
+        assert (tmp_path / "nested" / "state.sqlite3").exists()
+        store.close()
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            get_state_store("memcached")
@@ -0,0 +1,87 @@
+import os
+from urllib.parse import urlparse
+
+import pytest
+
+import storage
+from artifacts import ArtifactStore
+from storage import LocalStorage, S3Storage, get_storage_backend, local_path
+
+HTML = "<html><body>" + "<p>Login timeout on SSO</p>\n" * 100 + "</body></html>"
+
+
+@pytest.fixture
+def store():
+    store = ArtifactStore()
+    yield store
+    store.clear()
+
+
+class TestLocalStorage:
+    async def test_save_returns_file_url(self, store, tmp_path):
+        artifact = store.put("edition.html", HTML)
+        url = await LocalStorage(tmp_path).save(artifact)
+        assert url == (tmp_path / "edition.html").as_uri()
+        assert local_path(url) == str(tmp_path / "edition.html")
+        assert (tmp_path / "edition.html").read_text(encoding="utf-8") == HTML
+
+    async def test_directory_from_environment(self, store, tmp_path, monkeypatch):
+        monkeypatch.setenv("SUPPORTMAIL_STORAGE_DIR", str(tmp_path / "out"))
+        url = await LocalStorage().save(store.put("edition.md", "# Edition"))
+        assert local_path(url) == str(tmp_path / "out" / "edition.md")
+
+    def test_local_path_ignores_remote_urls(self):
+        assert local_path("https://bucket.example.com/edition.html") is None
+
+
+class TestS3Storage:
+    @pytest.fixture
+    def s3(self, monkeypatch):
+        moto = pytest.importorskip("moto")
+        boto3 = pytest.importorskip("boto3")
+        for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+            monkeypatch.setenv(name, "testing")
+        monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+        with moto.mock_aws():
+            client = boto3.client("s3", region_name="us-east-1")
+            client.create_bucket(Bucket="editions")
+            yield client
+
+    async def test_small_artifact_put_with_presigned_url(self, s3, store):
+        backend = S3Storage("editions", prefix="press/", client=s3)
+        artifact = store.put("edition.html", HTML)
+        url = await backend.save(artifact)
+        key = f"press/{artifact.id}/edition.html"
+        assert urlparse(url).path.endswith(key)
+        assert "Signature" in url
+        stored = s3.get_object(Bucket="editions", Key=key)
+        assert stored["Body"].read() == HTML.encode("utf-8")
+        assert stored["ContentType"] == "text/html; charset=utf-8"
+
+    async def test_large_artifact_uploaded_in_parts(self, s3, store):
+        five_mb = 5 * 1024 * 1024
+        backend = S3Storage("editions", client=s3, multipart_threshold=five_mb, multipart_chunksize=five_mb)
+        data = os.urandom(five_mb + 1024)
+        artifact = store.put("edition.bin", data, media_type="application/octet-stream")
+        await backend.save(artifact)
+        head = s3.head_object(Bucket="editions", Key=backend.key_for(artifact))
+        assert head["ETag"].strip('"').endswith("-2")
+        assert s3.get_object(Bucket="editions", Key=backend.key_for(artifact))["Body"].read() == data
+
+    def test_requires_bucket(self, monkeypatch):
+        monkeypatch.delenv("SUPPORTMAIL_S3_BUCKET", raising=False)
+        with pytest.raises(ValueError, match="SUPPORTMAIL_S3_BUCKET"):
+            S3Storage.from_environment()
+
+
+class TestGetStorageBackend:
+    def test_none_without_a_name(self):
+        assert get_storage_backend(None) is None
+
+    def test_shared_instance(self, monkeypatch):
+        monkeypatch.setattr(storage, "_backends", {})
+        assert get_storage_backend("local") is get_storage_backend("LOCAL")
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError, match="Unknown storage backend"):
+            get_storage_backend("ftp")
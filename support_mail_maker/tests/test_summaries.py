@@ -0,0 +1,62 @@
+import pytest
+
+import summaries
+from formatter import Formatter, iter_markdown
+from summaries import render_summary
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    render_summary.cache_clear()
+    yield
+    render_summary.cache_clear()
+
+
+class TestRenderSummary:
+    @pytest.mark.parametrize("summary, html", [
+        ("Plain text, 2 * 3 = 6.", "Plain text, 2 * 3 = 6."),
+        ("Users can't <b>log in</b> & retry", "Users can&#x27;t &lt;b&gt;log in&lt;/b&gt; &amp; retry"),
+        ("A **bold** fix", "A <strong>bold</strong> fix"),
+        ("**unclosed bold", "**unclosed bold"),
+        ("See [the guide](https://example.com/?a=1&b=2)",
+         'See <a href="https://example.com/?a=1&amp;b=2">the guide</a>'),
+        ("Mail [us](mailto:support@example.com)", 'Mail <a href="mailto:support@example.com">us</a>'),
+        ("Steps:\n- Restart\n* Clear **cache**\nThen retry",
+         "Steps:\n<ul><li>Restart</li><li>Clear <strong>cache</strong></li></ul>\nThen retry"),
+        ("- only\n- bullets", "<ul><li>only</li><li>bullets</li></ul>"),
+        ("-5 degrees\n*not a bullet*", "-5 degrees\n*not a bullet*"),
+    ])
+    def test_markup(self, summary, html):
+        assert render_summary(summary) == html
+
+    @pytest.mark.parametrize("url", [
+        "javascript:alert`1`", "JaVaScRiPt:void", "data:text/html,x", "/relative", "&#106;avascript:void",
+    ])
+    def test_unsafe_links_keep_only_their_text(self, url):
+        assert render_summary(f"[click]({url})") == "click"
+
+    def test_link_text_cannot_inject_markup(self):
+        html = render_summary('[<img src=x onerror=alert(1)>](https://example.com/"onmouseover="x)')
+        assert "<img" not in html
+        assert 'href="https://example.com/&quot;onmouseover=&quot;x"' in html
+
+    def test_repeated_summaries_are_converted_once(self):
+        for _ in range(3):
+            render_summary("Known issue, see **KB-1**")
+        info = render_summary.cache_info()
+        assert (info.misses, info.hits) == (1, 2)
+        assert info.maxsize == summaries.SUMMARY_CACHE_SIZE
+
+
+class TestEditionSummaries:
+    async def test_formatting_reaches_html_and_markdown(self, raw_content_data):
+        raw_content_data[0]["summary"] = "Timeouts on **SSO**:\n- Okta\n- [Azure AD](https://example.com/azure)"
+        formatter = Formatter(publish_date="2025-03-15", dedup="off")
+        formatter.set_raw_content(raw_content_data)
+        await formatter.collate_content()
+        html = "".join(formatter.iter_html())
+        assert "<strong>SSO</strong>" in html
+        assert '<li><a href="https://example.com/azure">Azure AD</a></li>' in html
+        markdown = "".join(iter_markdown(formatter.iter_html()))
+        assert "**SSO**" in markdown
+        assert "[Azure AD](https://example.com/azure)" in markdown